@@ -0,0 +1,23 @@
+from django.contrib import admin
+
+from .models import Alert, PurchaseLine, Upload
+
+
+@admin.register(Upload)
+class UploadAdmin(admin.ModelAdmin):
+    list_display = ['nome_arquivo', 'criado_em', 'estado', 'linhas_processadas', 'total_alertas']
+    list_filter = ['estado']
+
+
+@admin.register(PurchaseLine)
+class PurchaseLineAdmin(admin.ModelAdmin):
+    list_display = ['sku', 'centro', 'localidade', 'data', 'valor_compra', 'upload']
+    search_fields = ['sku', 'centro']
+    raw_id_fields = ['upload']
+
+
+@admin.register(Alert)
+class AlertAdmin(admin.ModelAdmin):
+    list_display = ['regra', 'severidade', 'mensagem', 'criado_em']
+    list_filter = ['regra', 'severidade']
+    raw_id_fields = ['upload', 'linha']
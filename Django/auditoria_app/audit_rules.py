@@ -1,6 +1,229 @@
+from collections import ChainMap
+from string import Formatter
+
+import numpy as np
+import pandas as pd
+
+from .partitioned import group_codes, iqr_fences, run_partitioned
+
+
+class Regra:
+    """Regra de auditoria declarada uma única vez e avaliada coluna a coluna.
+
+    ``condicao`` recebe um contexto (colunas do DataFrame + parâmetros) e
+    devolve uma máscara booleana; como usa apenas operações NumPy/pandas,
+    a mesma expressão funciona para um lote inteiro ou para uma única linha.
+    ``mensagem`` é um template no formato de ``str.format`` com os nomes das
+    colunas/parâmetros a interpolar no alerta.
+    """
+
+    def __init__(self, nome, condicao, mensagem, severidade='media'):
+        self.nome = nome
+        self.condicao = condicao
+        self.mensagem = mensagem
+        self.severidade = severidade
+        self._partes = list(Formatter().parse(mensagem))
+
+    def formatar(self, contexto):
+        """Monta a coluna de mensagens de alerta concatenando strings em lote."""
+        resultado = None
+        for literal, campo, _, _ in self._partes:
+            partes = [literal] if literal else []
+            if campo is not None:
+                valor = contexto[campo]
+                partes.append(valor.astype(str) if isinstance(valor, pd.Series) else str(valor))
+            for parte in partes:
+                resultado = parte if resultado is None else resultado + parte
+        return resultado
+
+
+class RegraGrupo(Regra):
+    """Regra que compara cada linha com as estatísticas do seu grupo (ex.: SKU/localidade).
+
+    As estatísticas são calculadas uma vez sobre a população inteira (em
+    ``estatisticas``), não sobre cada lote: ``calcular`` recebe arrays com
+    grupos inteiros (``codes`` e as ``colunas``) e devolve arrays por linha
+    com os valores declarados em ``saidas``. A avaliação passa por
+    ``partitioned.run_partitioned``, então ``calcular`` precisa ser uma
+    função de módulo. Depois, a ``condicao`` de cada lote recebe no contexto
+    as estatísticas do grupo de cada linha (ver ``parametros``), também
+    disponíveis no template da mensagem.
+    """
+
+    def __init__(self, nome, chaves, colunas, calcular, saidas, condicao, mensagem, severidade='media'):
+        super().__init__(nome, condicao, mensagem, severidade)
+        self.chaves = chaves
+        self.colunas = colunas
+        self.calcular = calcular
+        self.saidas = saidas
+
+    def aplicavel(self, df):
+        """Se ``df`` tem as colunas de que a regra precisa (chaves e valores)."""
+        return set(self.chaves + self.colunas).issubset(df.columns)
+
+    def estatisticas(self, populacao, workers=1):
+        """Uma linha por grupo de ``populacao``, indexada pelas ``chaves``, com as ``saidas``."""
+        chaves = chaves_texto(populacao, self.chaves)
+        colunas = {coluna: pd.to_numeric(populacao[coluna], errors='coerce').to_numpy(dtype=float)
+                   for coluna in self.colunas}
+        saidas = run_partitioned(self.calcular, group_codes(chaves, self.chaves), colunas,
+                                 self.saidas, workers)
+        tabela = pd.DataFrame(saidas, index=pd.MultiIndex.from_frame(chaves))
+        return tabela[~tabela.index.duplicated()]
+
+    def parametros(self, df, estatisticas):
+        """Estatísticas do grupo de cada linha de ``df``; grupos ausentes ficam com NaN/False."""
+        posicoes = estatisticas.index.get_indexer(pd.MultiIndex.from_frame(chaves_texto(df, self.chaves)))
+        encontrada = posicoes >= 0
+        parametros = {}
+        for nome, dtype in self.saidas.items():
+            valores = estatisticas[nome].to_numpy(dtype=dtype)[np.where(encontrada, posicoes, 0)]
+            parametros[nome] = np.where(encontrada, valores, False if dtype is bool else np.nan)
+        return parametros
+
+
+def chaves_texto(df, chaves):
+    """Colunas de chave como texto, como são gravadas em ``PurchaseLine`` (vazio para nulos)."""
+    return pd.DataFrame({chave: df[chave].astype(str).where(df[chave].notna(), '').to_numpy()
+                         for chave in chaves}, index=pd.RangeIndex(len(df)))
+
+
+def _valor_acima_mercado(c):
+    return c['valor_compra'] > c['valor_mercado'] * (1 + c['impostos'] / 100)
+
+
+REGRA_VALOR_VS_MERCADO = Regra(
+    'valor_acima_mercado',
+    _valor_acima_mercado,
+    'Valor acima do mercado ({valor_compra} > {valor_mercado})',
+    severidade='alta',
+)
+
+# Grupos menores que isso não têm histórico suficiente para definir uma faixa
+MIN_COMPRAS_GRUPO = 5
+
+
+def _faixa_do_grupo(dados):
+    faixa = iqr_fences(dados, 'valor_compra')
+    compras = pd.Series(dados['valor_compra']).groupby(dados['codes']).transform('count')
+    return {
+        'limite_inferior': faixa['lower'].round(2),
+        'limite_superior': faixa['upper'].round(2),
+        'suficiente': (compras >= MIN_COMPRAS_GRUPO).to_numpy(),
+    }
+
+
+def _valor_fora_da_faixa(c):
+    valores = pd.to_numeric(c['valor_compra'], errors='coerce')
+    return c['suficiente'] & ((valores < c['limite_inferior']) | (valores > c['limite_superior']))
+
+
+REGRA_FAIXA_SKU_LOCALIDADE = RegraGrupo(
+    'valor_fora_da_faixa',
+    ['sku', 'localidade'],
+    ['valor_compra'],
+    _faixa_do_grupo,
+    {'limite_inferior': float, 'limite_superior': float, 'suficiente': bool},
+    _valor_fora_da_faixa,
+    'Valor fora da faixa do SKU na localidade ({valor_compra} fora de {limite_inferior} a {limite_superior})',
+)
+
+REGRAS = [REGRA_VALOR_VS_MERCADO, REGRA_FAIXA_SKU_LOCALIDADE]
+
+
+def _fatiar(parametros, posicoes):
+    # Parâmetros por linha (Series/arrays) acompanham o recorte do DataFrame;
+    # escalares são propagados por broadcasting.
+    fatiados = {}
+    for nome, valor in parametros.items():
+        if isinstance(valor, pd.Series):
+            valor = valor.iloc[posicoes].reset_index(drop=True)
+        elif isinstance(valor, np.ndarray):
+            valor = pd.Series(valor[posicoes])
+        fatiados[nome] = valor
+    return fatiados
+
+
+def regras_grupo(df, regras=None):
+    """As regras por grupo de ``regras`` que se aplicam às colunas de ``df``."""
+    regras = REGRAS if regras is None else regras
+    return [regra for regra in regras if isinstance(regra, RegraGrupo) and regra.aplicavel(df)]
+
+
+def _disparos(df, regras, parametros, workers, estatisticas):
+    # Para cada regra que disparou: posições (no DataFrame) e mensagens
+    regras = REGRAS if regras is None else regras
+    for regra in regras:
+        valores = parametros
+        if isinstance(regra, RegraGrupo):
+            # Como uma tabela de referência ausente, colunas ausentes não
+            # interrompem a auditoria: a regra apenas não é avaliada
+            if not regra.aplicavel(df):
+                continue
+            tabela = estatisticas.get(regra.nome) if estatisticas is not None else None
+            if tabela is None:
+                tabela = regra.estatisticas(df, workers)
+            valores = {**parametros, **regra.parametros(df, tabela)}
+        disparou = np.asarray(regra.condicao(ChainMap(valores, df)), dtype=bool)
+        posicoes = np.flatnonzero(disparou)
+        if len(posicoes) == 0:
+            continue
+        recorte = df.iloc[posicoes].reset_index(drop=True)
+        mensagens = regra.formatar(ChainMap(_fatiar(valores, posicoes), recorte))
+        if isinstance(mensagens, pd.Series):
+            mensagens = mensagens.to_numpy(dtype=object)
+        else:
+            mensagens = np.full(len(posicoes), mensagens, dtype=object)
+        yield regra, posicoes, mensagens
+
+
+def avaliar_regras(df, regras=None, workers=1, estatisticas=None, **parametros):
+    """Avalia todas as regras sobre o DataFrame inteiro de uma só vez.
+
+    ``workers`` é o número de processos usados pelas regras por grupo.
+    ``estatisticas`` mapeia o nome de cada regra por grupo à tabela de
+    ``RegraGrupo.estatisticas`` calculada sobre uma população maior (ex.: o
+    upload inteiro); sem ela, a população é o próprio ``df``.
+    Retorna ``(mascara, alertas)``: uma Series booleana indicando as linhas
+    com pelo menos um alerta e uma Series de mensagens (``None`` nas linhas
+    sem alerta; mensagens de várias regras são unidas por ``"; "``).
+    """
+    mascara = np.zeros(len(df), dtype=bool)
+    alertas = np.full(len(df), None, dtype=object)
+
+    for _, posicoes, mensagens in _disparos(df, regras, parametros, workers, estatisticas):
+        repetidas = mascara[posicoes]
+        if repetidas.any():
+            mensagens[repetidas] = alertas[posicoes[repetidas]] + '; ' + mensagens[repetidas]
+        alertas[posicoes] = mensagens
+        mascara[posicoes] = True
+
+    return pd.Series(mascara, index=df.index), pd.Series(alertas, index=df.index, dtype=object)
+
+
+def listar_alertas(df, regras=None, workers=1, estatisticas=None, **parametros):
+    """Um alerta por (linha, regra) disparada, com nome da regra e severidade.
+
+    ``estatisticas`` como em ``avaliar_regras``. Retorna um DataFrame com as
+    colunas ``posicao`` (posição da linha em ``df``), ``regra``,
+    ``severidade`` e ``mensagem``.
+    """
+    partes = [
+        pd.DataFrame({
+            'posicao': posicoes,
+            'regra': regra.nome,
+            'severidade': regra.severidade,
+            'mensagem': mensagens,
+        })
+        for regra, posicoes, mensagens in _disparos(df, regras, parametros, workers, estatisticas)
+    ]
+    if not partes:
+        return pd.DataFrame(columns=['posicao', 'regra', 'severidade', 'mensagem'])
+    return pd.concat(partes, ignore_index=True)
+
+
 def verificar_valor_vs_mercado(linha, valor_mercado, impostos):
-    valor_real = linha['valor_compra']
-    localidade = linha['localidade']
-    if valor_real > valor_mercado * (1 + impostos / 100):
-        return f"Valor acima do mercado ({valor_real} > {valor_mercado})"
+    contexto = ChainMap({'valor_mercado': valor_mercado, 'impostos': impostos}, linha)
+    if REGRA_VALOR_VS_MERCADO.condicao(contexto):
+        return REGRA_VALOR_VS_MERCADO.formatar(contexto)
     return None
@@ -0,0 +1,184 @@
+import base64
+import binascii
+import csv
+import json
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+from .models import Alert
+
+# Parâmetro de ordenação -> campo da consulta; "id" desempata e fecha a chave
+ORDENACOES = {
+    'id': 'id',
+    'linha': 'linha__numero_linha',
+    'regra': 'regra',
+    'severidade': 'severidade',
+    'sku': 'linha__sku',
+    'centro': 'linha__centro',
+    'localidade': 'linha__localidade',
+    'data': 'linha__data',
+    'valor_compra': 'linha__valor_compra',
+}
+FILTROS = {
+    'regra': 'regra',
+    'severidade': 'severidade',
+    'sku': 'linha__sku',
+    'centro': 'linha__centro',
+    'localidade': 'linha__localidade',
+    'data_inicio': 'linha__data__gte',
+    'data_fim': 'linha__data__lte',
+}
+# Filtros de data: texto ISO (AAAA-MM-DD) convertido antes da consulta
+FILTROS_DATA = {'data_inicio', 'data_fim'}
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+# Linhas buscadas por ida ao banco durante a exportação
+TAMANHO_BLOCO_EXPORTACAO = 2000
+
+_CAMPOS = ['id', 'regra', 'severidade', 'mensagem', 'linha__dados']
+
+
+class ConsultaInvalida(ValueError):
+    pass
+
+
+def _data(nome, valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ConsultaInvalida(f'Data inválida em {nome}: {valor}')
+
+
+def filtrar_alertas(upload_id, parametros):
+    """Alertas do upload com os filtros de ``FILTROS`` presentes em ``parametros``."""
+    filtros = {campo: _data(nome, parametros[nome]) if nome in FILTROS_DATA else parametros[nome]
+               for nome, campo in FILTROS.items() if parametros.get(nome)}
+    return Alert.objects.filter(upload_id=upload_id, **filtros)
+
+
+def _ordenacao(ordenar):
+    descendente = ordenar.startswith('-')
+    nome = ordenar.lstrip('-')
+    if nome not in ORDENACOES:
+        raise ConsultaInvalida(f'Ordenação inválida: {ordenar}')
+    return ORDENACOES[nome], descendente
+
+
+def ordenar_alertas(consulta, ordenar='id'):
+    campo, descendente = _ordenacao(ordenar)
+    # Nulos sempre ao final, nos dois sentidos, para a chave do cursor ser estável
+    chave = F(campo).desc(nulls_last=True) if descendente else F(campo).asc(nulls_last=True)
+    desempate = '-id' if descendente else 'id'
+    if campo == 'id':
+        return consulta.order_by(desempate)
+    return consulta.order_by(chave, desempate)
+
+
+def codificar_cursor(valor, id_):
+    texto = json.dumps([valor, id_], cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+def _campo_modelo(campo):
+    modelo = Alert
+    *relacoes, nome = campo.split('__')
+    for relacao in relacoes:
+        modelo = modelo._meta.get_field(relacao).related_model
+    return modelo._meta.get_field(nome)
+
+
+def decodificar_cursor(cursor, campo='id'):
+    """``(valor, id)`` do cursor, com o valor convertido para o tipo de ``campo``.
+
+    Um cursor bem formado com um valor do tipo errado (texto para
+    ``valor_compra``, por exemplo) é tão inválido quanto um corrompido.
+    """
+    try:
+        valor, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if valor is not None:
+            valor = _campo_modelo(campo).to_python(valor)
+        return valor, int(id_)
+    except (binascii.Error, ValidationError, ValueError, TypeError):
+        raise ConsultaInvalida('Cursor inválido')
+
+
+def _anulavel(campo):
+    return _campo_modelo(campo).null
+
+
+def _apos(campo, descendente, valor, id_):
+    """Condição de "depois de (valor, id)" na ordem de ``ordenar_alertas`` (keyset)."""
+    maior = 'lt' if descendente else 'gt'
+    if campo == 'id':
+        return Q(**{f'id__{maior}': id_})
+    if valor is None:
+        return Q(**{f'{campo}__isnull': True, f'id__{maior}': id_})
+    # O intervalo "campo >= valor" na frente deixa o banco partir do índice
+    # em vez de varrer as páginas anteriores para avaliar o OR
+    condicao = Q(**{f'{campo}__{maior}e': valor}) & (
+        Q(**{f'{campo}__{maior}': valor}) | Q(**{f'id__{maior}': id_}))
+    if _anulavel(campo):
+        condicao |= Q(**{f'{campo}__isnull': True})
+    return condicao
+
+
+def _linha(registro):
+    return {**registro['linha__dados'], 'regra': registro['regra'],
+            'severidade': registro['severidade'], 'alerta': registro['mensagem']}
+
+
+def paginar_alertas(consulta, ordenar='id', cursor=None, limite=LIMITE_PADRAO):
+    """Uma página de alertas por keyset: ``(linhas, próximo cursor ou None)``.
+
+    O cursor guarda o valor ordenado e o id do último alerta; a página
+    seguinte começa logo depois dele pelo índice, então o custo não cresce
+    com a posição da página, ao contrário de ``OFFSET``.
+    """
+    campo, descendente = _ordenacao(ordenar)
+    consulta = ordenar_alertas(consulta, ordenar)
+    if cursor:
+        consulta = consulta.filter(_apos(campo, descendente, *decodificar_cursor(cursor, campo)))
+    registros = list(consulta.values(*_CAMPOS, valor_ordenado=F(campo))[:limite + 1])
+
+    proximo = None
+    if len(registros) > limite:
+        registros = registros[:limite]
+        ultimo = registros[-1]
+        proximo = codificar_cursor(ultimo['valor_ordenado'], ultimo['id'])
+    return [_linha(registro) for registro in registros], proximo
+
+
+def _registros(consulta):
+    return (_linha(registro) for registro in
+            consulta.values(*_CAMPOS).iterator(chunk_size=TAMANHO_BLOCO_EXPORTACAO))
+
+
+class _Eco:
+    """Destino do ``csv.writer`` que só devolve a linha formatada."""
+
+    def write(self, valor):
+        return valor
+
+
+def exportar_csv(consulta):
+    """Gera o CSV linha a linha, sem carregar os alertas em memória."""
+    escritor = csv.writer(_Eco())
+    colunas = None
+    for linha in _registros(consulta):
+        if colunas is None:
+            colunas = list(linha)
+            yield escritor.writerow(colunas)
+        yield escritor.writerow([linha.get(coluna) for coluna in colunas])
+
+
+def exportar_json(consulta):
+    """Gera uma lista JSON, um alerta por vez."""
+    yield '['
+    separador = '\n'
+    for linha in _registros(consulta):
+        yield separador + json.dumps(linha, cls=DjangoJSONEncoder, ensure_ascii=False)
+        separador = ',\n'
+    yield '\n]\n'
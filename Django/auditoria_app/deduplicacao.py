@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+
+from .models import PurchaseLine
+
+# Colunas que identificam uma linha de compra entre extrações diferentes
+COLUNAS_CHAVE = ['Nº Pedido', 'Item']
+
+NOVA = 'nova'
+ALTERADA = 'alterada'
+INALTERADA = 'inalterada'
+
+# Valores por consulta "IN": abaixo do limite de variáveis do SQLite
+TAMANHO_CONSULTA = 10_000
+
+
+def _colunas_chave(lote):
+    colunas = getattr(settings, 'AUDITORIA_COLUNAS_CHAVE', COLUNAS_CHAVE)
+    return colunas if all(coluna in lote.columns for coluna in colunas) else None
+
+
+def _normalizar(lote, colunas):
+    # O mesmo valor pode chegar como int em um lote e float em outro (lotes
+    # com vazios), ou com colunas em outra ordem: números viram float e o
+    # restante texto, em ordem de nome, antes do hash
+    normalizado = {}
+    for coluna in sorted(colunas, key=str):
+        valores = lote[coluna]
+        if pd.api.types.is_numeric_dtype(valores) and not pd.api.types.is_bool_dtype(valores):
+            normalizado[str(coluna)] = valores.astype('float64')
+        else:
+            normalizado[str(coluna)] = valores.astype(str).where(valores.notna(), '')
+    return pd.DataFrame(normalizado, index=lote.index)
+
+
+def impressao(lote, colunas=None):
+    """Hash estável (int64) por linha sobre ``colunas`` (todas, por padrão)."""
+    colunas = list(lote.columns) if colunas is None else colunas
+    hashes = pd.util.hash_pandas_object(_normalizar(lote, colunas), index=False)
+    # BigIntegerField é com sinal: mesmo padrão de bits, reinterpretado
+    return hashes.to_numpy().view(np.int64)
+
+
+def _existentes(campo, valores):
+    """Máscara dos ``valores`` já gravados em ``campo`` (consultas pelo índice, em blocos).
+
+    SQL direto: montar um ``__in`` de milhares de valores pelo ORM custa
+    mais que a própria consulta.
+    """
+    unicos = np.unique(valores).tolist()
+    quote = connection.ops.quote_name
+    tabela = quote(PurchaseLine._meta.db_table)
+    coluna = quote(PurchaseLine._meta.get_field(campo).column)
+    encontrados = []
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(unicos), TAMANHO_CONSULTA):
+            bloco = unicos[inicio:inicio + TAMANHO_CONSULTA]
+            cursor.execute(f'SELECT DISTINCT {coluna} FROM {tabela} WHERE {coluna} IN '
+                           f'({", ".join(["%s"] * len(bloco))})', bloco)
+            encontrados.extend(valor for valor, in cursor.fetchall())
+    return np.isin(valores, np.array(encontrados, dtype=np.int64))
+
+
+def hashes(lote):
+    """``(chaves, impressoes, com_chave)``: hashes das colunas de chave e da linha inteira.
+
+    ``com_chave`` indica se o lote tem as colunas de chave
+    (``COLUNAS_CHAVE``); sem elas, a chave gravada é a própria impressão.
+    """
+    impressoes = impressao(lote)
+    colunas = _colunas_chave(lote)
+    return (impressao(lote, colunas) if colunas else impressoes), impressoes, bool(colunas)
+
+
+def classificar(chaves, impressoes, com_chave=True):
+    """Separa as linhas em novas, alteradas e inalteradas.
+
+    Compara a impressão de cada linha e sua chave (ver ``hashes``) com as
+    linhas já gravadas de qualquer upload: mesma impressão é inalterada;
+    mesma chave com outra impressão, alterada; o restante, nova. Repetições
+    dentro dos próprios arrays contam como inalteradas.
+
+    Sem as colunas de chave nada é tratado como repetido: duas compras do
+    mesmo SKU, localidade, dia e valor são linhas idênticas e legítimas,
+    que a impressão não distingue de um reenvio. Todas são novas.
+
+    Retorna o array de situações, alinhado às linhas.
+    """
+    situacao = np.full(len(impressoes), NOVA, dtype=object)
+    if not com_chave:
+        return situacao
+    inalterada = _existentes('impressao', impressoes) | pd.Series(impressoes).duplicated().to_numpy()
+    situacao[inalterada] = INALTERADA
+    # A chave só é consultada para o que sobrou; em reenvios costuma ser pouco
+    restantes = np.flatnonzero(~inalterada)
+    situacao[restantes[_existentes('chave', chaves[restantes])]] = ALTERADA
+    return situacao
+
+
+def classificar_lote(lote):
+    """``classificar`` as linhas do lote; retorna ``(situacao, chaves, impressoes)``, alinhados ao lote."""
+    chaves, impressoes, com_chave = hashes(lote)
+    return classificar(chaves, impressoes, com_chave), chaves, impressoes
@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from openpyxl import load_workbook
+from pandas.api.types import union_categoricals
+
+from .audit_rules import chaves_texto, listar_alertas, regras_grupo
+from .persistencia import CAMPOS_HISTORICO, linhas_gravadas
+from .referencias import resolver_parametros
+
+TAMANHO_LOTE = 50_000
+
+
+def _workers_regras():
+    # Processos para as regras por grupo; 1 avalia no próprio processo
+    return getattr(settings, 'AUDITORIA_WORKERS_REGRAS', 1)
+
+
+def _lotes_xlsx(caminho, tamanho_lote):
+    # read_only + values_only percorre o XML da planilha em streaming, sem
+    # montar a árvore de células inteira em memória
+    workbook = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = workbook.active.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        colunas = [str(c) if c is not None else f'Unnamed: {i}' for i, c in enumerate(cabecalho)]
+        lote = []
+        for linha in linhas:
+            if all(valor is None for valor in linha):
+                continue
+            lote.append(linha)
+            if len(lote) == tamanho_lote:
+                yield pd.DataFrame.from_records(lote, columns=colunas)
+                lote = []
+        if lote:
+            yield pd.DataFrame.from_records(lote, columns=colunas)
+    finally:
+        workbook.close()
+
+
+def ler_em_lotes(caminho, tamanho_lote=TAMANHO_LOTE):
+    """Lê a planilha (XLSX ou CSV) em DataFrames de no máximo ``tamanho_lote`` linhas."""
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == '.csv':
+        yield from pd.read_csv(caminho, chunksize=tamanho_lote)
+    elif extensao in ('.xlsx', '.xlsm'):
+        yield from _lotes_xlsx(caminho, tamanho_lote)
+    else:
+        # Formatos sem leitura em streaming (ex.: .xls) são lidos de uma vez
+        df = pd.read_excel(caminho)
+        for inicio in range(0, len(df), tamanho_lote):
+            yield df.iloc[inicio:inicio + tamanho_lote]
+
+
+def estimar_linhas(caminho):
+    """Número aproximado de linhas de dados, para exibir o progresso (``None`` se desconhecido)."""
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == '.csv':
+        with open(caminho, 'rb') as arquivo:
+            quebras = sum(bloco.count(b'\n') for bloco in iter(lambda: arquivo.read(1 << 20), b''))
+        return max(quebras - 1, 0)
+    if extensao in ('.xlsx', '.xlsm'):
+        # Em modo read_only, max_row vem da dimensão gravada na planilha
+        workbook = load_workbook(caminho, read_only=True)
+        try:
+            max_row = workbook.active.max_row
+        finally:
+            workbook.close()
+        return max(max_row - 1, 0) if max_row else None
+    return None
+
+
+def populacao_lote(lote, regras=None):
+    """As colunas do lote usadas pelas regras por grupo aplicáveis a ele.
+
+    As chaves ficam como categorias de texto e os valores como float, para
+    que as colunas de um upload inteiro caibam em memória.
+    """
+    chaves, colunas = [], []
+    for regra in regras_grupo(lote, regras):
+        chaves += [chave for chave in regra.chaves if chave not in chaves]
+        colunas += [coluna for coluna in regra.colunas if coluna not in colunas]
+    populacao = chaves_texto(lote, chaves).astype('category')
+    for coluna in colunas:
+        populacao[coluna] = pd.to_numeric(lote[coluna], errors='coerce').to_numpy(dtype=float)
+    return populacao
+
+
+def juntar_populacoes(partes):
+    """Concatena partes de ``populacao_lote`` sem converter as categorias em texto."""
+    colunas = {}
+    for coluna in partes[0].columns:
+        series = [parte[coluna] for parte in partes]
+        if isinstance(series[0].dtype, pd.CategoricalDtype):
+            colunas[coluna] = union_categoricals(series)
+        else:
+            colunas[coluna] = np.concatenate([serie.to_numpy() for serie in series])
+    return pd.DataFrame(colunas, index=pd.RangeIndex(sum(len(parte) for parte in partes)))
+
+
+def populacao_historico(populacao, chaves_alteradas, regras=None):
+    """As linhas já gravadas dos SKUs de ``populacao``, nas mesmas colunas (``None`` se não houver).
+
+    Só vale quando todas as colunas da população são campos de
+    ``PurchaseLine``. De cada chave entra apenas a versão mais recente, e as
+    ``chaves_alteradas`` neste upload ficam de fora: a versão nova já está
+    em ``populacao``.
+    """
+    campos = list(populacao.columns)
+    if 'sku' not in campos or not set(campos).issubset(CAMPOS_HISTORICO):
+        return None
+    historico = linhas_gravadas(campos, populacao['sku'].unique())
+    if historico.empty:
+        return None
+    historico = historico.sort_values('id', kind='stable')
+    ultima = historico.groupby('chave')['impressao'].transform('last')
+    vigente = historico['chave'].isna() | (historico['impressao'] == ultima)
+    historico = historico[vigente & ~historico['chave'].isin(chaves_alteradas)]
+    return populacao_lote(historico, regras)[campos]
+
+
+def estatisticas_grupos(populacao, regras=None):
+    """Estatísticas de cada regra por grupo aplicável, calculadas uma vez sobre ``populacao``."""
+    return {regra.nome: regra.estatisticas(populacao, _workers_regras())
+            for regra in regras_grupo(populacao, regras)}
+
+
+def auditar_lote(lote, estatisticas=None):
+    """Um alerta por (linha, regra) disparada no lote, no formato de ``listar_alertas``.
+
+    ``estatisticas`` vem de ``estatisticas_grupos``; sem ela, as regras por
+    grupo comparam cada linha apenas com as demais do lote.
+    """
+    return listar_alertas(lote, workers=_workers_regras(), estatisticas=estatisticas,
+                          **resolver_parametros(lote))
@@ -0,0 +1,89 @@
+"""Histogramas em memória de tempos, linhas e bytes, expostos no formato texto do Prometheus.
+
+Cada processo mantém seus próprios histogramas (``REGISTRO``). O
+``MetricasMiddleware`` mede cada view (tempo, bytes recebidos e enviados) e
+a auditoria mede suas etapas (leitura, deduplicação, estatísticas dos
+grupos, regras e gravação) no processo do pool. Essas medições
+(``Medicoes``) voltam com o resultado da tarefa e são registradas no
+processo web, que é quem responde em ``/metrics/``.
+
+Com ``AUDITORIA_PERFIL_LENTO_MS`` definido, cada requisição é acompanhada
+por um profiler de amostragem (uma pilha a cada
+``AUDITORIA_PERFIL_INTERVALO_MS``), e as que passam desse tempo têm as
+pilhas gravadas em ``AUDITORIA_PERFIL_DIR`` no formato "folded" (uma pilha
+por linha seguida do número de amostras), lido pelas ferramentas de flame
+graph. Histogramas, registro e profiler vêm de ``metrics_core``, o mesmo
+módulo do dashboard.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+
+from .metrics_core import CONTENT_TYPE, Registry, SamplingProfiler
+
+SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+BYTES = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+LINHAS = (10, 100, 1e3, 1e4, 5e4, 1e5, 1e6, 1e7)
+
+TIPO_CONTEUDO = CONTENT_TYPE
+
+REGISTRO = Registry()
+REGISTRO.histogram('auditoria_view_segundos', 'Tempo de resposta por view.', SEGUNDOS, ['view'])
+REGISTRO.histogram('auditoria_view_bytes', 'Bytes recebidos e enviados por view.', BYTES, ['view', 'sentido'])
+REGISTRO.histogram('auditoria_etapa_segundos', 'Tempo por etapa da auditoria, por lote.', SEGUNDOS, ['etapa'])
+REGISTRO.histogram('auditoria_etapa_linhas', 'Linhas tratadas por etapa da auditoria, por lote.', LINHAS, ['etapa'])
+
+
+class Medicoes:
+    """Observações acumuladas no processo do pool, para ``REGISTRO.register`` no processo web."""
+
+    def __init__(self):
+        self.observacoes = []
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observacoes.append(('auditoria_etapa_segundos', time.perf_counter() - inicio, {'etapa': nome}))
+
+    def linhas(self, etapa, quantidade):
+        self.observacoes.append(('auditoria_etapa_linhas', quantidade, {'etapa': etapa}))
+
+
+class MetricasMiddleware:
+    """Mede tempo e bytes de cada view e, se ativado, grava o perfil das requisições lentas."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        limite_ms = getattr(settings, 'AUDITORIA_PERFIL_LENTO_MS', None)
+        perfil = nullcontext()
+        if limite_ms:
+            intervalo = getattr(settings, 'AUDITORIA_PERFIL_INTERVALO_MS', 5) / 1000
+            perfil = SamplingProfiler(threading.get_ident(), intervalo)
+
+        inicio = time.perf_counter()
+        with perfil:
+            resposta = self.get_response(request)
+        duracao = time.perf_counter() - inicio
+
+        view = request.resolver_match.url_name if request.resolver_match else 'nao_resolvida'
+        REGISTRO.observe('auditoria_view_segundos', duracao, view=view)
+        REGISTRO.observe('auditoria_view_bytes', int(request.META.get('CONTENT_LENGTH') or 0),
+                         view=view, sentido='entrada')
+        # Respostas em streaming são geradas depois daqui; só o tamanho das demais é conhecido
+        if not resposta.streaming:
+            REGISTRO.observe('auditoria_view_bytes', len(resposta.content), view=view, sentido='saida')
+
+        if limite_ms and duracao * 1000 >= limite_ms:
+            diretorio = getattr(settings, 'AUDITORIA_PERFIL_DIR', 'perfis/')
+            os.makedirs(diretorio, exist_ok=True)
+            nome = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{view}-{duracao * 1000:.0f}ms.folded'
+            perfil.write(os.path.join(diretorio, nome))
+        return resposta
@@ -0,0 +1,169 @@
+"""In-process histograms and counters in Prometheus text format, and a sampling profiler.
+
+A ``Registry`` holds named ``Histogram``s (counts per bucket, sum and count,
+per combination of label values) and ``Counter``s, and renders them in the
+text exposition format. Observations made in another process can be
+carried back as ``(name, value, labels)`` tuples and replayed with
+``Registry.register``.
+``SamplingProfiler`` counts the stacks of one thread, sampled at a fixed
+interval, and writes them in the "folded" format (one stack per line
+followed by its sample count) read by flame graph tools.
+
+The Django app uses this module too, through a verbatim copy in
+``Django/auditoria_app/metrics_core.py`` (its tests check that the copy
+matches this file). Edit this file and copy it over.
+"""
+import bisect
+import collections
+import math
+import os
+import sys
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Counts per bucket (``buckets`` upper bounds), sum and count, per label values."""
+
+    def __init__(self, name, help, buckets, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        # "le" bucket: the first bound greater than or equal to the value
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bucket] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            all_series = sorted((key, list(counts), total, count)
+                                for key, (counts, total, count) in self._series.items())
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, counts, total, count in all_series:
+            pairs = list(zip(self.labels, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == math.inf else repr(float(bound))
+                lines.append(f'{self.name}_bucket{_labels(pairs + [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(pairs)} {total!r}')
+            lines.append(f'{self.name}_count{_labels(pairs)} {count}')
+        return lines
+
+
+class Counter:
+    """Running total per label values."""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._totals[key] = self._totals.get(key, 0) + value
+
+    def inc(self, **labels):
+        self.observe(1, **labels)
+
+    def render(self):
+        with self._lock:
+            totals = sorted(self._totals.items())
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        lines.extend(f'{self.name}{_labels(list(zip(self.labels, key)))} {total!r}' for key, total in totals)
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def histogram(self, name, help, buckets, labels=()):
+        if name not in self.metrics:
+            self.metrics[name] = Histogram(name, help, buckets, labels)
+        return self.metrics[name]
+
+    def counter(self, name, help, labels=()):
+        if name not in self.metrics:
+            self.metrics[name] = Counter(name, help, labels)
+        return self.metrics[name]
+
+    def observe(self, name, value, **labels):
+        self.metrics[name].observe(value, **labels)
+
+    def register(self, observations):
+        """Record ``(name, value, labels)`` observations brought from another process."""
+        for name, value, labels in observations:
+            self.observe(name, value, **labels)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread every ``interval`` seconds and counts the stacks seen.
+
+    ``start``/``stop``, or use it as a context manager.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, args=(thread_id, interval),
+                                        name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _sample(self, thread_id, interval):
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, samples in self.samples.most_common():
+                file.write(f'{stack} {samples}\n')
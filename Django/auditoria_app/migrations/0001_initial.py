@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:08
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Upload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nome_arquivo', models.CharField(max_length=255)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('estado', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', max_length=20)),
+                ('linhas_processadas', models.PositiveIntegerField(default=0)),
+                ('total_linhas', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_alertas', models.PositiveIntegerField(default=0)),
+                ('erro', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-criado_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PurchaseLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero_linha', models.PositiveIntegerField()),
+                ('sku', models.CharField(blank=True, max_length=64)),
+                ('centro', models.CharField(blank=True, max_length=64)),
+                ('localidade', models.CharField(blank=True, max_length=64)),
+                ('data', models.DateField(blank=True, null=True)),
+                ('valor_compra', models.FloatField(blank=True, null=True)),
+                ('dados', models.JSONField(default=dict)),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='linhas', to='auditoria_app.upload')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Alert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('regra', models.CharField(max_length=64)),
+                ('severidade', models.CharField(choices=[('baixa', 'Baixa'), ('media', 'Média'), ('alta', 'Alta')], default='media', max_length=10)),
+                ('mensagem', models.TextField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('linha', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='auditoria_app.purchaseline')),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='auditoria_app.upload')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='purchaseline',
+            index=models.Index(fields=['sku', 'centro', 'data'], name='auditoria_a_sku_648d74_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseline',
+            index=models.Index(fields=['upload', 'numero_linha'], name='auditoria_a_upload__decd31_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['regra', 'severidade'], name='auditoria_a_regra_0e24d8_idx'),
+        ),
+    ]
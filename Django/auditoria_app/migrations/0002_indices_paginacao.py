@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['upload', 'id'], name='auditoria_a_upload__3d6d30_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['upload', 'regra', 'id'], name='auditoria_a_upload__06d929_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['upload', 'severidade', 'id'], name='auditoria_a_upload__521ac9_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria_app', '0002_indices_paginacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseline',
+            name='chave',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='purchaseline',
+            name='impressao',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='linhas_alteradas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='linhas_inalteradas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='linhas_novas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseline',
+            index=models.Index(fields=['chave'], name='auditoria_a_chave_76fefe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseline',
+            index=models.Index(fields=['impressao'], name='auditoria_a_impress_0effaf_idx'),
+        ),
+    ]
@@ -0,0 +1,90 @@
+import uuid
+
+from django.db import models
+
+
+class Upload(models.Model):
+    PENDENTE = 'pendente'
+    PROCESSANDO = 'processando'
+    CONCLUIDO = 'concluido'
+    ERRO = 'erro'
+    ESTADOS = [
+        (PENDENTE, 'Pendente'),
+        (PROCESSANDO, 'Processando'),
+        (CONCLUIDO, 'Concluído'),
+        (ERRO, 'Erro'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    nome_arquivo = models.CharField(max_length=255)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDENTE)
+    linhas_processadas = models.PositiveIntegerField(default=0)
+    total_linhas = models.PositiveIntegerField(null=True, blank=True)
+    total_alertas = models.PositiveIntegerField(default=0)
+    # Classificação das linhas contra uploads anteriores; só novas e alteradas são auditadas
+    linhas_novas = models.PositiveIntegerField(default=0)
+    linhas_alteradas = models.PositiveIntegerField(default=0)
+    linhas_inalteradas = models.PositiveIntegerField(default=0)
+    erro = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-criado_em']
+
+    def __str__(self):
+        return f'{self.nome_arquivo} ({self.get_estado_display()})'
+
+
+class PurchaseLine(models.Model):
+    upload = models.ForeignKey(Upload, on_delete=models.CASCADE, related_name='linhas')
+    numero_linha = models.PositiveIntegerField()
+    sku = models.CharField(max_length=64, blank=True)
+    centro = models.CharField(max_length=64, blank=True)
+    localidade = models.CharField(max_length=64, blank=True)
+    data = models.DateField(null=True, blank=True)
+    valor_compra = models.FloatField(null=True, blank=True)
+    dados = models.JSONField(default=dict)
+    # Hashes das colunas de chave (ex.: Nº Pedido/Item) e da linha inteira
+    chave = models.BigIntegerField(null=True, blank=True)
+    impressao = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sku', 'centro', 'data']),
+            models.Index(fields=['upload', 'numero_linha']),
+            models.Index(fields=['chave']),
+            models.Index(fields=['impressao']),
+        ]
+
+    def __str__(self):
+        return f'{self.sku} / {self.centro} (linha {self.numero_linha})'
+
+
+class Alert(models.Model):
+    BAIXA = 'baixa'
+    MEDIA = 'media'
+    ALTA = 'alta'
+    SEVERIDADES = [
+        (BAIXA, 'Baixa'),
+        (MEDIA, 'Média'),
+        (ALTA, 'Alta'),
+    ]
+
+    upload = models.ForeignKey(Upload, on_delete=models.CASCADE, related_name='alertas')
+    linha = models.ForeignKey(PurchaseLine, on_delete=models.CASCADE, related_name='alertas')
+    regra = models.CharField(max_length=64)
+    severidade = models.CharField(max_length=10, choices=SEVERIDADES, default=MEDIA)
+    mensagem = models.TextField()
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['regra', 'severidade']),
+            # Paginação por keyset dentro de um upload (ordem padrão e filtros mais comuns)
+            models.Index(fields=['upload', 'id']),
+            models.Index(fields=['upload', 'regra', 'id']),
+            models.Index(fields=['upload', 'severidade', 'id']),
+        ]
+
+    def __str__(self):
+        return f'{self.regra}: {self.mensagem}'
@@ -0,0 +1,138 @@
+"""Hash-partitioned group-wise evaluation on a process pool.
+
+Rows are assigned to partitions by a hash of their group code, so every group
+lands whole in one partition. The input columns are copied once into shared
+memory, ordered by partition; each task only receives the block names
+and its row range, reads that slice in place and writes its per-row results
+into shared output blocks, so no column data is pickled per task.
+
+``func`` receives a dict of equally long arrays (``codes`` plus the given
+columns) holding whole groups, in no particular order, and must return a dict
+with one array per output, aligned with its input. It runs
+in the worker processes, so it has to be a module-level function.
+
+The Django app uses this module too, through a verbatim copy in
+``Django/auditoria_app/partitioned.py`` (its tests check that the copy
+matches this file). Edit this file and copy it over.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Partitions per worker: more, smaller tasks even out skewed group sizes
+PARTITIONS_PER_WORKER = 4
+
+_executors = {}
+
+
+def default_workers():
+    return int(os.environ.get('PARTITION_WORKERS', 1))
+
+
+def group_codes(df, keys):
+    """Dense integer code per row for the combination of the ``keys`` columns."""
+    return df.groupby(keys, sort=False, dropna=False).ngroup().to_numpy(dtype=np.int64)
+
+
+def _executor(workers):
+    if workers not in _executors:
+        _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _executors[workers]
+
+
+def shutdown_pools():
+    """Shut down the partition pools opened by this process.
+
+    A worker of another process pool does not run the interpreter's normal
+    atexit handlers when it exits; pools created inside it must be shut down
+    explicitly or it waits for their processes forever.
+    """
+    while _executors:
+        _, executor = _executors.popitem()
+        executor.shutdown()
+
+
+def _share(array):
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _run_slice(func, inputs, outputs, start, stop):
+    blocks = {name: shared_memory.SharedMemory(name=spec[0]) for name, spec in {**inputs, **outputs}.items()}
+    try:
+        views = {name: np.ndarray(spec[1], spec[2], buffer=blocks[name].buf)[start:stop]
+                 for name, spec in inputs.items()}
+        result = func(views)
+        for name, spec in outputs.items():
+            np.ndarray(spec[1], spec[2], buffer=blocks[name].buf)[start:stop] = result[name]
+        # Views must be released before the blocks can be closed
+        del views, result
+    finally:
+        for block in blocks.values():
+            block.close()
+
+
+def run_partitioned(func, codes, columns, outputs, workers=None):
+    """Evaluate ``func`` group-wise and return its outputs in the original row order.
+
+    ``outputs`` maps each output name to its dtype. With one worker the
+    partitions are not materialized and ``func`` runs in-process.
+    """
+    workers = default_workers() if workers is None else workers
+    codes = np.asarray(codes, dtype=np.int64)
+    columns = {name: np.asarray(values) for name, values in columns.items()}
+
+    if workers <= 1 or len(codes) == 0:
+        result = func({'codes': codes, **columns})
+        return {name: np.asarray(result[name], dtype=dtype) for name, dtype in outputs.items()}
+
+    n_partitions = workers * PARTITIONS_PER_WORKER
+    partition = pd.util.hash_array(codes) % np.uint64(n_partitions)
+    order = np.argsort(partition, kind='stable')
+    bounds = np.searchsorted(partition[order], np.arange(n_partitions + 1, dtype=np.uint64))
+
+    blocks = []
+    try:
+        inputs = {}
+        for name, values in {'codes': codes, **columns}.items():
+            block, inputs[name] = _share(values[order])
+            blocks.append(block)
+        output_blocks, output_specs = {}, {}
+        for name, dtype in outputs.items():
+            output_blocks[name], output_specs[name] = _share(np.empty(len(codes), dtype=dtype))
+            blocks.append(output_blocks[name])
+
+        tasks = [_executor(workers).submit(_run_slice, func, inputs, output_specs, start, stop)
+                 for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+        for task in tasks:
+            task.result()
+
+        merged = {}
+        for name, (_, shape, dtype) in output_specs.items():
+            merged[name] = np.empty(len(codes), dtype=dtype)
+            merged[name][order] = np.ndarray(shape, dtype, buffer=output_blocks[name].buf)
+        return merged
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def quartiles(data, column='price'):
+    """Per-row Q1, median and Q3 of ``column`` within each group."""
+    grouped = pd.Series(data[column], dtype=float).groupby(data['codes'])
+    values = grouped.quantile([0.25, 0.5, 0.75]).unstack().reindex(columns=[0.25, 0.5, 0.75])
+    # ngroup() numbers the groups in the same (sorted) order as the quantile index
+    group = grouped.ngroup().to_numpy()
+    return {name: values[q].to_numpy()[group] for name, q in [('q1', 0.25), ('median', 0.5), ('q3', 0.75)]}
+
+
+def iqr_fences(data, column='price'):
+    """Per-row Tukey fences (Q1 - 1.5*IQR, Q3 + 1.5*IQR) of ``column`` within each group."""
+    values = quartiles(data, column)
+    iqr = values['q3'] - values['q1']
+    return {'lower': values['q1'] - 1.5 * iqr, 'upper': values['q3'] + 1.5 * iqr}
@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+
+import pandas as pd
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Alert, PurchaseLine
+from .referencias import COLUNA_DATA, COLUNA_LOCALIDADE, COLUNA_SKU
+
+COLUNA_CENTRO = 'centro'
+COLUNA_VALOR = 'valor_compra'
+
+# Linhas por chamada de executemany
+TAMANHO_LOTE_BANCO = 5000
+# Valores por consulta "IN" do histórico: abaixo do limite de variáveis do SQLite
+TAMANHO_CONSULTA = 10_000
+
+# Campos de PurchaseLine que as regras por grupo podem ler do histórico
+CAMPOS_HISTORICO = ['sku', 'centro', 'localidade', 'valor_compra']
+
+
+def _texto(lote, coluna):
+    if coluna not in lote.columns:
+        return [''] * len(lote)
+    valores = lote[coluna]
+    return valores.astype(str).where(valores.notna(), '').tolist()
+
+
+def _datas(lote):
+    if COLUNA_DATA not in lote.columns:
+        return [None] * len(lote)
+    datas = pd.to_datetime(lote[COLUNA_DATA], errors='coerce')
+    return [None if pd.isna(d) else d.date() for d in datas]
+
+
+def _valores(lote):
+    if COLUNA_VALOR not in lote.columns:
+        return [None] * len(lote)
+    valores = pd.to_numeric(lote[COLUNA_VALOR], errors='coerce')
+    return [None if pd.isna(v) else float(v) for v in valores]
+
+
+def _colunas(modelo, campos):
+    return [modelo._meta.get_field(campo).column for campo in campos]
+
+
+def _copiar_postgres(cursor, tabela, colunas, linhas, texto):
+    # COPY ... FROM STDIN: carga em massa sem montar um INSERT por lote
+    bruto = cursor.cursor
+    sql = f'COPY {tabela} ({", ".join(colunas)}) FROM STDIN'
+    if hasattr(bruto, 'copy_expert'):  # psycopg2
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(linhas)
+        buffer.seek(0)
+        # Vazio sem aspas seria NULL no formato CSV; colunas de texto são NOT NULL
+        bruto.copy_expert(f'{sql} WITH (FORMAT csv, FORCE_NOT_NULL ({", ".join(texto)}))', buffer)
+    else:  # psycopg 3
+        with bruto.copy(sql) as copia:
+            for linha in linhas:
+                copia.write_row(linha)
+
+
+def _inserir(modelo, campos, linhas, campos_texto=()):
+    """Insere tuplas já no formato do banco, sem instanciar um model por linha.
+
+    PostgreSQL usa ``COPY``; os demais bancos, ``executemany`` em uma única
+    instrução preparada. Os ids gerados não são retornados.
+    """
+    if not linhas:
+        return
+    quote = connection.ops.quote_name
+    tabela = quote(modelo._meta.db_table)
+    colunas = [quote(c) for c in _colunas(modelo, campos)]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            texto = [quote(c) for c in _colunas(modelo, campos_texto)]
+            _copiar_postgres(cursor, tabela, colunas, linhas, texto)
+        else:
+            marcadores = ', '.join(['%s'] * len(colunas))
+            for inicio in range(0, len(linhas), TAMANHO_LOTE_BANCO):
+                cursor.executemany(
+                    f'INSERT INTO {tabela} ({", ".join(colunas)}) VALUES ({marcadores})',
+                    linhas[inicio:inicio + TAMANHO_LOTE_BANCO],
+                )
+
+
+def _valor_banco(modelo, campo, valor):
+    return modelo._meta.get_field(campo).get_db_prep_save(valor, connection)
+
+
+def salvar_lote(upload_id, lote, alertas, numeros_linha, chaves=None, impressoes=None):
+    """Grava as linhas do lote e seus alertas em carga em massa (sem ``save`` por linha).
+
+    ``numeros_linha`` traz o número (base 0) de cada linha no arquivo;
+    ``alertas`` segue o formato de ``audit_rules.listar_alertas``;
+    ``chaves``/``impressoes`` são os hashes de ``deduplicacao.classificar_lote``.
+    """
+    numeros_linha = [int(numero) for numero in numeros_linha]
+    if not numeros_linha:
+        return 0, 0
+    nulos = [None] * len(numeros_linha)
+    chaves = nulos if chaves is None else [int(chave) for chave in chaves]
+    impressoes = nulos if impressoes is None else [int(valor) for valor in impressoes]
+
+    upload_db = _valor_banco(PurchaseLine, 'upload', upload_id)
+    dados = [json.dumps(registro) for registro in
+             json.loads(lote.to_json(orient='records', date_format='iso', default_handler=str))]
+    datas = [None if d is None else d.isoformat() for d in _datas(lote)]
+    linhas = list(zip(
+        [upload_db] * len(lote), numeros_linha,
+        _texto(lote, COLUNA_SKU), _texto(lote, COLUNA_CENTRO), _texto(lote, COLUNA_LOCALIDADE),
+        datas, _valores(lote), dados, chaves, impressoes,
+    ))
+
+    with transaction.atomic():
+        _inserir(PurchaseLine, ['upload', 'numero_linha', 'sku', 'centro', 'localidade', 'data',
+                                'valor_compra', 'dados', 'chave', 'impressao'], linhas,
+                 campos_texto=['sku', 'centro', 'localidade'])
+
+        if len(alertas):
+            # Ids das linhas recém-gravadas: uma consulta pelo índice (upload, numero_linha)
+            por_numero = dict(PurchaseLine.objects.filter(
+                upload_id=upload_id, numero_linha__gte=min(numeros_linha),
+                numero_linha__lte=max(numeros_linha),
+            ).values_list('numero_linha', 'id'))
+            agora = _valor_banco(Alert, 'criado_em', timezone.now())
+            _inserir(Alert, ['upload', 'linha', 'regra', 'severidade', 'mensagem', 'criado_em'], [
+                (upload_db, por_numero[numeros_linha[int(posicao)]], regra, severidade, mensagem, agora)
+                for posicao, regra, severidade, mensagem in alertas[
+                    ['posicao', 'regra', 'severidade', 'mensagem']].itertuples(index=False)
+            ])
+    return len(linhas), len(alertas)
+
+
+def linhas_gravadas(campos, skus):
+    """Linhas já gravadas dos ``skus`` (de qualquer upload): ``id``, ``chave``, ``impressao`` e ``campos``.
+
+    SQL direto em blocos, pelo índice que começa em ``sku``: o histórico de
+    um SKU popular pode ter milhões de linhas.
+    """
+    quote = connection.ops.quote_name
+    tabela = quote(PurchaseLine._meta.db_table)
+    nomes = ['id', 'chave', 'impressao'] + list(campos)
+    colunas = ', '.join(quote(coluna) for coluna in _colunas(PurchaseLine, nomes))
+    sku = quote(PurchaseLine._meta.get_field('sku').column)
+    skus = list(skus)
+    registros = []
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(skus), TAMANHO_CONSULTA):
+            bloco = skus[inicio:inicio + TAMANHO_CONSULTA]
+            cursor.execute(f'SELECT {colunas} FROM {tabela} WHERE {sku} IN '
+                           f'({", ".join(["%s"] * len(bloco))})', bloco)
+            registros.extend(cursor.fetchall())
+    return pd.DataFrame.from_records(registros, columns=nomes)
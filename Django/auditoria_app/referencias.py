@@ -0,0 +1,129 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+# Colunas esperadas na planilha enviada para auditoria
+COLUNA_SKU = 'sku'
+COLUNA_LOCALIDADE = 'localidade'
+COLUNA_DATA = 'data'
+
+# Valores usados quando não há tabela de referência ou a linha não tem vigência
+VALOR_MERCADO_PADRAO = 1000
+IMPOSTOS_PADRAO = 17
+
+CHAVES = [COLUNA_SKU, COLUNA_LOCALIDADE]
+
+
+class TabelaReferencia:
+    """Tabela de referência por (SKU, localidade) com data de vigência.
+
+    O arquivo (CSV ou XLSX) é lido uma única vez e mantido ordenado por
+    ``data_vigencia``; a busca "as-of" é feita com ``merge_asof`` agrupado
+    pelas chaves, resolvendo um upload inteiro em um único merge. Quando o
+    arquivo de origem é alterado (mtime/tamanho), a tabela é recarregada na
+    próxima consulta, sem reiniciar o worker.
+    """
+
+    def __init__(self, caminho, colunas_valor):
+        self.caminho = caminho
+        self.colunas_valor = list(colunas_valor)
+        self._assinatura = None
+        self._tabela = None
+        self._lock = threading.Lock()
+
+    def _ler(self):
+        if self.caminho.lower().endswith(('.xlsx', '.xls')):
+            tabela = pd.read_excel(self.caminho)
+        else:
+            tabela = pd.read_csv(self.caminho)
+        tabela.columns = [str(c).strip().lower() for c in tabela.columns]
+        tabela = tabela[CHAVES + ['data_vigencia'] + self.colunas_valor].copy()
+        for chave in CHAVES:
+            tabela[chave] = tabela[chave].astype(str).str.strip()
+        tabela['data_vigencia'] = pd.to_datetime(tabela['data_vigencia'], errors='coerce').astype('datetime64[ns]')
+        for coluna in self.colunas_valor:
+            tabela[coluna] = pd.to_numeric(tabela[coluna], errors='coerce')
+        tabela = tabela.dropna(subset=['data_vigencia'])
+        return tabela.sort_values('data_vigencia', kind='stable').reset_index(drop=True)
+
+    def tabela(self):
+        """Retorna a tabela indexada, recarregando se o arquivo mudou."""
+        try:
+            stat = os.stat(self.caminho)
+        except FileNotFoundError:
+            return None
+        assinatura = (stat.st_mtime_ns, stat.st_size)
+        if assinatura != self._assinatura:
+            with self._lock:
+                if assinatura != self._assinatura:
+                    self._tabela = self._ler()
+                    self._assinatura = assinatura
+        return self._tabela
+
+    def resolver(self, df):
+        """Retorna um DataFrame alinhado a ``df`` com as colunas de valor vigentes.
+
+        Linhas sem SKU/localidade/data válidos ou sem vigência anterior à data
+        da compra ficam com ``NaN``.
+        """
+        resultado = pd.DataFrame(np.nan, index=df.index, columns=self.colunas_valor)
+        tabela = self.tabela()
+        if tabela is None or not set(CHAVES + [COLUNA_DATA]).issubset(df.columns):
+            return resultado
+
+        consulta = pd.DataFrame({
+            COLUNA_SKU: df[COLUNA_SKU].astype(str).str.strip().to_numpy(),
+            COLUNA_LOCALIDADE: df[COLUNA_LOCALIDADE].astype(str).str.strip().to_numpy(),
+            'data_vigencia': pd.to_datetime(df[COLUNA_DATA], errors='coerce').astype('datetime64[ns]').to_numpy(),
+            '_posicao': np.arange(len(df)),
+        }).dropna(subset=['data_vigencia'])
+        if consulta.empty:
+            return resultado
+
+        consulta = consulta.sort_values('data_vigencia', kind='stable')
+        vigentes = pd.merge_asof(consulta, tabela, on='data_vigencia', by=CHAVES, direction='backward')
+        for coluna in self.colunas_valor:
+            valores = np.full(len(df), np.nan)
+            valores[vigentes['_posicao'].to_numpy()] = vigentes[coluna].to_numpy(dtype=float)
+            resultado[coluna] = valores
+        return resultado
+
+
+_tabelas = {}
+_tabelas_lock = threading.Lock()
+
+
+def _tabela_configurada(nome_setting, caminho_padrao, colunas_valor):
+    caminho = getattr(settings, nome_setting, caminho_padrao)
+    with _tabelas_lock:
+        tabela = _tabelas.get(nome_setting)
+        if tabela is None or tabela.caminho != caminho:
+            tabela = _tabelas[nome_setting] = TabelaReferencia(caminho, colunas_valor)
+    return tabela
+
+
+def tabela_precos():
+    return _tabela_configurada(
+        'AUDITORIA_TABELA_PRECOS', 'referencias/precos_mercado.csv', ['valor_mercado'])
+
+
+def tabela_impostos():
+    return _tabela_configurada(
+        'AUDITORIA_TABELA_IMPOSTOS', 'referencias/impostos.csv', ['impostos'])
+
+
+def resolver_parametros(df):
+    """Resolve ``valor_mercado`` e ``impostos`` vigentes para cada linha do upload.
+
+    O resultado pode ser passado diretamente para ``avaliar_regras``. Linhas
+    sem referência usam ``VALOR_MERCADO_PADRAO``/``IMPOSTOS_PADRAO``.
+    """
+    precos = tabela_precos().resolver(df)['valor_mercado']
+    impostos = tabela_impostos().resolver(df)['impostos']
+    return {
+        'valor_mercado': precos.fillna(VALOR_MERCADO_PADRAO),
+        'impostos': impostos.fillna(IMPOSTOS_PADRAO),
+    }
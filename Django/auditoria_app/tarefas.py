@@ -0,0 +1,154 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import numpy as np
+import pandas as pd
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+
+from .deduplicacao import ALTERADA, INALTERADA, NOVA, classificar, hashes
+from .ingestao import (TAMANHO_LOTE, auditar_lote, estatisticas_grupos, estimar_linhas, juntar_populacoes, ler_em_lotes,
+                       populacao_historico, populacao_lote)
+from .metricas import REGISTRO, Medicoes
+from .models import Upload
+from .partitioned import shutdown_pools
+from .persistencia import salvar_lote
+
+_executor = None
+
+
+def ler_estado(job_id):
+    estado = Upload.objects.filter(pk=job_id).values(
+        'estado', 'linhas_processadas', 'total_linhas', 'total_alertas', 'linhas_novas',
+        'linhas_alteradas', 'linhas_inalteradas', 'erro').first()
+    if estado is None:
+        return None
+    return {'job_id': str(job_id), **estado}
+
+
+def _inicializar_worker():
+    # Com o método "spawn" o processo filho não herda o Django configurado;
+    # com "fork" as conexões herdadas do processo web não podem ser reutilizadas
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _ler_upload(caminho, diretorio, medicoes, tamanho_lote):
+    """Primeira passada: guarda cada lote em ``diretorio`` e junta os hashes e a população das regras por grupo.
+
+    Retorna ``(arquivos dos lotes, chaves, impressoes, com_chave, populacao)``.
+    """
+    arquivos, chaves, impressoes, populacao = [], [], [], []
+    com_chave = False
+    lotes = ler_em_lotes(caminho, tamanho_lote)
+    while True:
+        with medicoes.etapa('leitura'):
+            lote = next(lotes, None)
+        if lote is None:
+            break
+        medicoes.linhas('leitura', len(lote))
+        with medicoes.etapa('deduplicacao'):
+            chaves_lote, impressoes_lote, com_chave = hashes(lote)
+        chaves.append(chaves_lote)
+        impressoes.append(impressoes_lote)
+        populacao.append(populacao_lote(lote))
+        arquivos.append(os.path.join(diretorio, f'{len(arquivos)}.pkl'))
+        lote.to_pickle(arquivos[-1])
+    if not arquivos:
+        return [], np.array([], dtype=np.int64), np.array([], dtype=np.int64), com_chave, None
+    return arquivos, np.concatenate(chaves), np.concatenate(impressoes), com_chave, juntar_populacoes(populacao)
+
+
+def _estatisticas(populacao, delta, chaves_alteradas):
+    # Linhas novas e alteradas do upload mais o histórico gravado dos mesmos SKUs:
+    # as inalteradas já estão no histórico
+    populacao = populacao[delta].reset_index(drop=True)
+    historico = populacao_historico(populacao, chaves_alteradas) if len(populacao) else None
+    if historico is not None:
+        populacao = juntar_populacoes([historico, populacao])
+    return estatisticas_grupos(populacao)
+
+
+def executar_auditoria(job_id, caminho, tamanho_lote=TAMANHO_LOTE):
+    """Processa um upload no worker, gravando linhas/alertas e o progresso a cada lote.
+
+    O upload passa duas vezes pelos lotes de ``tamanho_lote`` linhas. Na
+    primeira, cada lote lido vai para um arquivo temporário e ficam em
+    memória só os hashes das linhas e as colunas das regras por grupo.
+    Assim as linhas são classificadas contra as já gravadas (ver
+    ``deduplicacao``) e as estatísticas de cada grupo são calculadas uma
+    única vez sobre todo o upload e o histórico gravado dos mesmos SKUs: o
+    alerta de uma linha não depende do lote em que ela caiu nem de quantas
+    linhas do grupo vieram neste envio. Na segunda, só as linhas novas e
+    alteradas de cada lote são auditadas e gravadas. Devolve as medições de
+    cada etapa, registradas no processo web (ver ``metricas``).
+    """
+    uploads = Upload.objects.filter(pk=job_id)
+    medicoes = Medicoes()
+    processadas = total_alertas = 0
+    contagem = {NOVA: 0, ALTERADA: 0, INALTERADA: 0}
+    uploads.update(estado=Upload.PROCESSANDO, total_linhas=estimar_linhas(caminho))
+    try:
+        with tempfile.TemporaryDirectory(prefix='auditoria_') as diretorio:
+            arquivos, chaves, impressoes, com_chave, populacao = _ler_upload(caminho, diretorio, medicoes, tamanho_lote)
+            with medicoes.etapa('deduplicacao'):
+                situacao = classificar(chaves, impressoes, com_chave)
+            delta = situacao != INALTERADA
+            with medicoes.etapa('estatisticas'):
+                estatisticas = _estatisticas(populacao, delta, chaves[situacao == ALTERADA]) if arquivos else {}
+            del populacao
+
+            for arquivo in arquivos:
+                lote = pd.read_pickle(arquivo)
+                fim = processadas + len(lote)
+                delta_lote = delta[processadas:fim]
+                lote_delta = lote[delta_lote].reset_index(drop=True)
+                with medicoes.etapa('regras'):
+                    alertas = auditar_lote(lote_delta, estatisticas)
+                medicoes.linhas('regras', len(lote_delta))
+                with medicoes.etapa('gravacao'):
+                    _, n_alertas = salvar_lote(job_id, lote_delta, alertas,
+                                               processadas + np.flatnonzero(delta_lote),
+                                               chaves[processadas:fim][delta_lote],
+                                               impressoes[processadas:fim][delta_lote])
+                total_alertas += n_alertas
+                for valor in contagem:
+                    contagem[valor] += int((situacao[processadas:fim] == valor).sum())
+                processadas = fim
+                uploads.update(linhas_processadas=processadas, total_alertas=total_alertas,
+                               linhas_novas=contagem[NOVA], linhas_alteradas=contagem[ALTERADA],
+                               linhas_inalteradas=contagem[INALTERADA])
+    except Exception as erro:
+        uploads.update(estado=Upload.ERRO, erro=str(erro))
+        return medicoes.observacoes
+    finally:
+        shutdown_pools()
+    uploads.update(estado=Upload.CONCLUIDO, total_linhas=processadas)
+    return medicoes.observacoes
+
+
+def _registrar_medicoes(tarefa):
+    if tarefa.exception() is None and tarefa.result():
+        REGISTRO.register(tarefa.result())
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'AUDITORIA_WORKERS', None) or os.cpu_count(),
+            initializer=_inicializar_worker,
+        )
+    return _executor
+
+
+def enfileirar_auditoria(caminho, nome_arquivo=None):
+    """Registra o upload e agenda sua auditoria no pool de processos; retorna o id do job."""
+    upload = Upload.objects.create(nome_arquivo=nome_arquivo or os.path.basename(caminho))
+    tarefa = _pool().submit(executar_auditoria, upload.pk, os.path.abspath(caminho))
+    tarefa.add_done_callback(_registrar_medicoes)
+    return upload.pk
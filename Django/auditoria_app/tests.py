@@ -0,0 +1,266 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from . import ingestao
+from .audit_rules import (REGRA_FAIXA_SKU_LOCALIDADE, REGRA_VALOR_VS_MERCADO, avaliar_regras, listar_alertas,
+                          verificar_valor_vs_mercado)
+from .consultas import (ConsultaInvalida, codificar_cursor, decodificar_cursor, filtrar_alertas, ordenar_alertas,
+                        paginar_alertas)
+from .deduplicacao import ALTERADA, INALTERADA, NOVA, classificar_lote
+from .models import Alert, PurchaseLine, Upload
+from .persistencia import salvar_lote
+from .referencias import TabelaReferencia
+from .tarefas import executar_auditoria
+
+
+# Módulos do dashboard copiados sem alteração para cá
+DASHBOARD = os.path.join(os.path.dirname(__file__), '..', '..', 'dashboard_complete')
+MODULOS_COPIADOS = ['metrics_core.py', 'partitioned.py']
+
+
+def compras(valores, sku='00-000001', localidade='MG', data='2024-01-10', primeiro_item=1):
+    itens = range(primeiro_item, primeiro_item + len(valores))
+    return pd.DataFrame({'Nº Pedido': 4500000001, 'Item': itens, 'sku': sku, 'localidade': localidade,
+                         'data': data, 'valor_compra': valores})
+
+
+class AuditoriaTestCase(TestCase):
+    """Roda ``executar_auditoria`` sobre um CSV temporário, com lotes de ``tamanho_lote`` linhas."""
+
+    def auditar(self, df, tamanho_lote=ingestao.TAMANHO_LOTE):
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'upload.csv')
+            df.to_csv(caminho, index=False)
+            upload = Upload.objects.create(nome_arquivo='upload.csv')
+            executar_auditoria(upload.pk, caminho, tamanho_lote)
+        upload.refresh_from_db()
+        self.assertEqual(upload.estado, Upload.CONCLUIDO, upload.erro)
+        return upload
+
+    def alertas(self, upload, regra=None):
+        consulta = Alert.objects.filter(upload=upload)
+        if regra:
+            consulta = consulta.filter(regra=regra)
+        return sorted(consulta.values_list('linha__numero_linha', flat=True))
+
+
+@unittest.skipUnless(os.path.isdir(DASHBOARD), 'dashboard_complete ausente')
+class ModulosCopiadosTests(SimpleTestCase):
+    def test_copias_iguais_ao_original_do_dashboard(self):
+        for nome in MODULOS_COPIADOS:
+            with open(os.path.join(DASHBOARD, nome), 'rb') as original, \
+                    open(os.path.join(os.path.dirname(__file__), nome), 'rb') as copia:
+                self.assertEqual(copia.read(), original.read(), f'{nome} difere de dashboard_complete/{nome}')
+
+
+class RegrasGrupoTests(SimpleTestCase):
+    def test_regra_grupo_sem_colunas_nao_e_avaliada(self):
+        # Upload sem a coluna "sku": a regra de faixa é ignorada e as demais seguem
+        df = pd.DataFrame({'localidade': ['MG', 'SP'], 'valor_compra': [100.0, 2000.0]})
+        alertas = listar_alertas(df, [REGRA_VALOR_VS_MERCADO, REGRA_FAIXA_SKU_LOCALIDADE],
+                                 valor_mercado=1000, impostos=17)
+        self.assertEqual(alertas['regra'].tolist(), ['valor_acima_mercado'])
+        self.assertEqual(alertas['posicao'].tolist(), [1])
+
+
+class RegrasVetorizadasTests(SimpleTestCase):
+    def test_mesmo_resultado_da_verificacao_linha_a_linha(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({'valor_compra': rng.uniform(800, 1400, 200).round(2)})
+        df.loc[[3, 50], 'valor_compra'] = np.nan
+        # Parâmetros por linha, como os resolvidos pela tabela de referência
+        valor_mercado = pd.Series(rng.choice([1000, 1100], len(df)), index=df.index)
+        impostos = pd.Series(rng.choice([12, 17], len(df)), index=df.index)
+
+        mascara, alertas = avaliar_regras(df, [REGRA_VALOR_VS_MERCADO],
+                                          valor_mercado=valor_mercado, impostos=impostos)
+        esperado = [verificar_valor_vs_mercado(linha, valor_mercado[i], impostos[i])
+                    for i, linha in zip(df.index, df.to_dict('records'))]
+        self.assertEqual(alertas.tolist(), esperado)
+        self.assertEqual(mascara.tolist(), [mensagem is not None for mensagem in esperado])
+        self.assertTrue(0 < mascara.sum() < len(df))
+
+
+class TabelaReferenciaTests(SimpleTestCase):
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.caminho = os.path.join(diretorio.name, 'precos.csv')
+        self.escrever([('00-000001', 'MG', '2024-01-01', 1000), ('00-000001', 'MG', '2024-03-01', 1200),
+                       ('00-000001', 'SP', '2024-01-01', 900)])
+
+    def escrever(self, vigencias):
+        pd.DataFrame(vigencias, columns=['SKU', 'Localidade', 'Data_Vigencia', 'Valor_Mercado']).to_csv(
+            self.caminho, index=False)
+
+    def test_valor_vigente_na_data_da_compra(self):
+        tabela = TabelaReferencia(self.caminho, ['valor_mercado'])
+        df = pd.DataFrame({
+            'sku': ['00-000001'] * 5 + ['00-000002'],
+            'localidade': ['MG', 'MG', 'MG', 'MG', 'SP', 'MG'],
+            'data': ['2023-12-31', '2024-01-01', '2024-02-29', '2024-03-15', '2024-02-01', '2024-02-01'],
+        }, index=[10, 11, 12, 13, 14, 15])
+        valores = tabela.resolver(df)['valor_mercado']
+        self.assertEqual(valores.index.tolist(), df.index.tolist())
+        # Antes da primeira vigência e SKU sem tabela ficam sem valor
+        np.testing.assert_array_equal(valores.to_numpy(), [np.nan, 1000, 1000, 1200, 900, np.nan])
+
+    def test_recarrega_quando_o_arquivo_muda(self):
+        tabela = TabelaReferencia(self.caminho, ['valor_mercado'])
+        df = pd.DataFrame({'sku': ['00-000001'], 'localidade': ['MG'], 'data': ['2024-05-01']})
+        self.assertEqual(tabela.resolver(df)['valor_mercado'].tolist(), [1200])
+        self.escrever([('00-000001', 'MG', '2024-01-01', 1000), ('00-000001', 'MG', '2024-04-01', 1500.5)])
+        self.assertEqual(tabela.resolver(df)['valor_mercado'].tolist(), [1500.5])
+
+    def test_sem_arquivo(self):
+        tabela = TabelaReferencia(self.caminho + '.inexistente', ['valor_mercado'])
+        df = pd.DataFrame({'sku': ['00-000001'], 'localidade': ['MG'], 'data': ['2024-05-01']})
+        self.assertTrue(tabela.resolver(df)['valor_mercado'].isna().all())
+
+
+class DeduplicacaoLoteTests(TestCase):
+    def test_novas_alteradas_e_inalteradas(self):
+        gravadas = compras([100.0, 200.0, 300.0])
+        _, chaves, impressoes = classificar_lote(gravadas)
+        upload = Upload.objects.create(nome_arquivo='upload.csv')
+        salvar_lote(upload.pk, gravadas, listar_alertas(gravadas, []), range(3), chaves, impressoes)
+
+        # Item 1 igual, item 2 com outro valor, item 4 novo e repetido dentro do lote
+        reenvio = pd.concat([compras([100.0, 250.0]), compras([400.0, 400.0], primeiro_item=4)],
+                            ignore_index=True)
+        reenvio.loc[3, 'Item'] = 4
+        situacao, _, _ = classificar_lote(reenvio)
+        self.assertEqual(situacao.tolist(), [INALTERADA, ALTERADA, NOVA, INALTERADA])
+
+
+class PaginacaoAlertasTests(TestCase):
+    def setUp(self):
+        self.upload = Upload.objects.create(nome_arquivo='upload.csv', estado=Upload.CONCLUIDO)
+        rng = np.random.default_rng(0)
+        lote = pd.DataFrame({
+            'n': range(60),
+            'sku': rng.choice(['00-000001', '00-000002', '00-000003'], 60),
+            'localidade': rng.choice(['MG', 'SP'], 60),
+            'data': rng.choice(['2024-01-10', '2024-02-10', None], 60),
+            # Valores repetidos e nulos: o desempate por id decide a ordem
+            'valor_compra': rng.choice([100.0, 200.0, np.nan], 60),
+        })
+        alertas = pd.DataFrame({
+            'posicao': np.repeat(np.arange(60), 2),
+            'regra': ['valor_acima_mercado', 'valor_fora_da_faixa'] * 60,
+            'severidade': ['alta', 'media'] * 60,
+            'mensagem': 'alerta',
+        })
+        salvar_lote(self.upload.pk, lote, alertas, range(60))
+
+    def paginas(self, ordenar, parametros=None, limite=7):
+        consulta = filtrar_alertas(self.upload.pk, parametros or {})
+        linhas, cursor = paginar_alertas(consulta, ordenar, limite=limite)
+        while cursor:
+            pagina, cursor = paginar_alertas(consulta, ordenar, cursor, limite)
+            self.assertLessEqual(len(pagina), limite)
+            linhas += pagina
+        return [(linha['n'], linha['regra']) for linha in linhas]
+
+    def test_paginas_cobrem_a_consulta_inteira_na_ordem(self):
+        for ordenar in ['id', '-id', 'valor_compra', '-valor_compra', 'data', '-sku', 'regra', '-linha']:
+            for parametros in [{}, {'regra': 'valor_fora_da_faixa', 'localidade': 'SP'}]:
+                consulta = ordenar_alertas(filtrar_alertas(self.upload.pk, parametros), ordenar)
+                esperado = [(dados['n'], regra) for dados, regra in consulta.values_list('linha__dados', 'regra')]
+                self.assertEqual(self.paginas(ordenar, parametros), esperado, (ordenar, parametros))
+                self.assertEqual(len(set(esperado)), len(esperado))
+
+    def test_ultima_pagina_sem_cursor(self):
+        linhas, cursor = paginar_alertas(filtrar_alertas(self.upload.pk, {}), limite=120)
+        self.assertEqual((len(linhas), cursor), (120, None))
+
+    def test_cursor_invalido(self):
+        consulta = filtrar_alertas(self.upload.pk, {})
+        for cursor in ['!!!', 'bWVpbw==', 'WzEsICJ4Il0=']:
+            with self.assertRaises(ConsultaInvalida):
+                paginar_alertas(consulta, cursor=cursor)
+        with self.assertRaises(ConsultaInvalida):
+            paginar_alertas(consulta, ordenar='dados')
+        resposta = self.client.get(reverse('alertas_auditoria', args=[self.upload.pk]), {'cursor': '!!!'})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_cursor_com_valor_do_tipo_errado(self):
+        consulta = filtrar_alertas(self.upload.pk, {})
+        for ordenar, valor in [('valor_compra', 'abc'), ('-data', 'ontem'), ('data', [1]), ('linha', {})]:
+            with self.assertRaises(ConsultaInvalida):
+                paginar_alertas(consulta, ordenar, codificar_cursor(valor, 1))
+        resposta = self.client.get(reverse('alertas_auditoria', args=[self.upload.pk]),
+                                   {'ordenar': 'valor_compra', 'cursor': codificar_cursor('abc', 1)})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_cursor_de_data_continua_a_paginacao(self):
+        linhas, cursor = paginar_alertas(filtrar_alertas(self.upload.pk, {}), 'data', limite=7)
+        valor, _ = decodificar_cursor(cursor, 'linha__data')
+        self.assertIsInstance(valor, date)
+        pagina, _ = paginar_alertas(filtrar_alertas(self.upload.pk, {}), 'data', cursor, 7)
+        self.assertEqual(len(pagina), 7)
+
+
+class FaixaPorUploadTests(AuditoriaTestCase):
+    def test_alertas_nao_dependem_do_tamanho_do_lote(self):
+        # O valor fora da faixa cai sozinho no último lote de 5 linhas, que
+        # isolado não teria compras suficientes para definir a faixa
+        df = compras([100.0, 102, 104, 106, 108, 110, 101, 103, 105, 107, 109, 500])
+        resultados = []
+        for tamanho_lote in [5, 50]:
+            PurchaseLine.objects.all().delete()
+            upload = self.auditar(df, tamanho_lote)
+            resultados.append(self.alertas(upload, 'valor_fora_da_faixa'))
+        self.assertEqual(resultados, [[11], [11]])
+
+
+class FaixaComHistoricoTests(AuditoriaTestCase):
+    def test_delta_e_comparado_com_o_historico_do_grupo(self):
+        historico = compras([100.0, 102, 104, 106, 108, 110, 101, 103, 105, 107])
+        self.auditar(historico)
+        # Reenvio com uma única linha nova: sozinha ela não teria faixa
+        reenvio = pd.concat([historico, compras([500.0], data='2024-02-01', primeiro_item=11)], ignore_index=True)
+        upload = self.auditar(reenvio)
+        self.assertEqual((upload.linhas_novas, upload.linhas_inalteradas), (1, 10))
+        self.assertEqual(self.alertas(upload, 'valor_fora_da_faixa'), [10])
+
+    def test_reenvio_sem_linhas_novas(self):
+        df = compras([100.0, 102, 104, 106, 108])
+        self.auditar(df)
+        upload = self.auditar(df)
+        self.assertEqual((upload.linhas_novas, upload.linhas_inalteradas, upload.total_alertas), (0, 5, 0))
+
+
+class DeduplicacaoTests(AuditoriaTestCase):
+    def test_sem_colunas_de_chave_linhas_identicas_sao_novas(self):
+        # Duas compras reais do mesmo SKU, local, dia e valor, em dois envios
+        df = compras([100.0, 100.0]).drop(columns=['Nº Pedido', 'Item'])
+        for _ in range(2):
+            upload = self.auditar(df)
+            self.assertEqual((upload.linhas_novas, upload.linhas_inalteradas), (2, 0))
+        self.assertEqual(PurchaseLine.objects.count(), 4)
+
+    def test_repeticao_em_outro_lote_do_mesmo_upload(self):
+        # A classificação é do upload inteiro, não de cada lote
+        df = compras([100.0, 200.0, 300.0])
+        df = pd.concat([df, df.iloc[[0]]], ignore_index=True)
+        upload = self.auditar(df, tamanho_lote=2)
+        self.assertEqual((upload.linhas_novas, upload.linhas_inalteradas), (3, 1))
+        self.assertEqual(PurchaseLine.objects.count(), 3)
+
+
+class ConsultaAlertasTests(TestCase):
+    def setUp(self):
+        self.upload = Upload.objects.create(nome_arquivo='upload.csv', estado=Upload.CONCLUIDO)
+
+    def test_data_invalida_e_erro_400(self):
+        for rota in ['resultado_auditoria', 'alertas_auditoria', 'exportar_auditoria']:
+            resposta = self.client.get(reverse(rota, args=[self.upload.pk]), {'data_inicio': 'xx'})
+            self.assertEqual(resposta.status_code, 400, rota)
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.upload_auditoria, name='upload_auditoria'),
+    path('auditoria/<uuid:job_id>/', views.resultado_auditoria, name='resultado_auditoria'),
+    path('auditoria/<uuid:job_id>/status/', views.status_auditoria, name='status_auditoria'),
+    path('auditoria/<uuid:job_id>/alertas/', views.alertas_auditoria, name='alertas_auditoria'),
+    path('auditoria/<uuid:job_id>/exportar/', views.exportar_auditoria, name='exportar_auditoria'),
+    path('metrics/', views.metricas, name='metricas'),
+]
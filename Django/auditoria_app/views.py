@@ -1,7 +1,11 @@
-from django.shortcuts import render
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect, render
 from django.core.files.storage import FileSystemStorage
-from .audit_rules import verificar_valor_vs_mercado
-import pandas as pd
+from .consultas import (LIMITE_MAXIMO, LIMITE_PADRAO, ORDENACOES, ConsultaInvalida, exportar_csv,
+                        exportar_json, filtrar_alertas, ordenar_alertas, paginar_alertas)
+from .metricas import REGISTRO, TIPO_CONTEUDO
+from .models import Upload
+from .tarefas import enfileirar_auditoria, ler_estado
 
 def upload_auditoria(request):
     if request.method == 'POST' and request.FILES['excel_file']:
@@ -10,12 +14,98 @@ def upload_auditoria(request):
         filename = fs.save(file.name, file)
         file_path = fs.path(filename)
 
-        df = pd.read_excel(file_path)
-        resultados = []
-        for index, row in df.iterrows():
-            alerta = verificar_valor_vs_mercado(row, valor_mercado=1000, impostos=17)
-            if alerta:
-                resultados.append({**row, 'alerta': alerta})
-        return render(request, 'dashboard_auditoria.html', {'resultados': resultados})
+        job_id = enfileirar_auditoria(file_path, nome_arquivo=file.name)
+        return redirect('resultado_auditoria', job_id=job_id)
 
     return render(request, 'upload_auditoria.html')
+
+def status_auditoria(request, job_id):
+    estado = ler_estado(job_id)
+    if estado is None:
+        raise Http404('Auditoria não encontrada')
+    return JsonResponse(estado)
+
+def _limite(request):
+    try:
+        limite = int(request.GET.get('limite', LIMITE_PADRAO))
+    except ValueError:
+        raise ConsultaInvalida('Limite inválido')
+    return min(max(limite, 1), LIMITE_MAXIMO)
+
+def _url_com(request, **parametros):
+    consulta = request.GET.copy()
+    for nome, valor in parametros.items():
+        consulta.pop(nome, None)
+        if valor:
+            consulta[nome] = valor
+    return '?' + consulta.urlencode()
+
+def resultado_auditoria(request, job_id):
+    estado = ler_estado(job_id)
+    if estado is None:
+        raise Http404('Auditoria não encontrada')
+    if estado['estado'] != Upload.CONCLUIDO:
+        return render(request, 'processando_auditoria.html', {'job_id': job_id, 'estado': estado})
+
+    ordenar = request.GET.get('ordenar', 'id')
+    try:
+        resultados, proximo = paginar_alertas(filtrar_alertas(job_id, request.GET), ordenar,
+                                              request.GET.get('cursor'), _limite(request))
+    except ConsultaInvalida as erro:
+        return HttpResponseBadRequest(str(erro))
+
+    # Cabeçalhos clicáveis alternam o sentido da ordenação e voltam à primeira página
+    colunas = [
+        {'nome': coluna,
+         'url': _url_com(request, ordenar=f'-{coluna}' if ordenar == coluna else coluna, cursor=None)
+         if coluna in ORDENACOES else None}
+        for coluna in (resultados[0] if resultados else [])
+    ]
+    return render(request, 'dashboard_auditoria.html', {
+        'job_id': job_id,
+        'estado': estado,
+        'colunas': colunas,
+        'resultados': [list(linha.values()) for linha in resultados],
+        'filtros': {nome: request.GET.get(nome, '') for nome in ['regra', 'severidade', 'sku', 'centro',
+                                                                'localidade', 'data_inicio', 'data_fim']},
+        'ordenar': ordenar,
+        'primeira_pagina': _url_com(request, cursor=None),
+        'proxima_pagina': _url_com(request, cursor=proximo) if proximo else None,
+        'exportar_csv': _url_com(request, formato='csv', cursor=None),
+        'exportar_json': _url_com(request, formato='json', cursor=None),
+    })
+
+def alertas_auditoria(request, job_id):
+    """Página de alertas em JSON; ``proximo`` é o cursor da página seguinte."""
+    if ler_estado(job_id) is None:
+        raise Http404('Auditoria não encontrada')
+    try:
+        resultados, proximo = paginar_alertas(filtrar_alertas(job_id, request.GET),
+                                              request.GET.get('ordenar', 'id'),
+                                              request.GET.get('cursor'), _limite(request))
+    except ConsultaInvalida as erro:
+        return JsonResponse({'erro': str(erro)}, status=400)
+    return JsonResponse({'resultados': resultados, 'proximo': proximo})
+
+def exportar_auditoria(request, job_id):
+    """Exporta todos os alertas filtrados (CSV ou JSON) em streaming."""
+    if ler_estado(job_id) is None:
+        raise Http404('Auditoria não encontrada')
+    formato = request.GET.get('formato', 'csv')
+    if formato not in ('csv', 'json'):
+        return HttpResponseBadRequest('Formato inválido')
+    try:
+        consulta = ordenar_alertas(filtrar_alertas(job_id, request.GET), request.GET.get('ordenar', 'id'))
+    except ConsultaInvalida as erro:
+        return HttpResponseBadRequest(str(erro))
+
+    if formato == 'csv':
+        resposta = StreamingHttpResponse(exportar_csv(consulta), content_type='text/csv; charset=utf-8')
+    else:
+        resposta = StreamingHttpResponse(exportar_json(consulta), content_type='application/json')
+    resposta['Content-Disposition'] = f'attachment; filename="auditoria_{job_id}.{formato}"'
+    return resposta
+
+def metricas(request):
+    """Histogramas deste processo no formato texto do Prometheus."""
+    return HttpResponse(REGISTRO.render(), content_type=TIPO_CONTEUDO)
@@ -0,0 +1,62 @@
+"""Compara o motor de regras vetorizado com o caminho antigo via iterrows.
+
+Uso:
+    python benchmarks/bench_audit_rules.py [--tamanhos 10000 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auditoria_app.audit_rules import REGRA_VALOR_VS_MERCADO, avaliar_regras, verificar_valor_vs_mercado  # noqa: E402
+
+
+def gerar_compras(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'valor_compra': rng.lognormal(mean=6.8, sigma=0.3, size=n).round(2),
+        'localidade': rng.choice(['MG', 'SP', 'RJ', 'BA'], size=n),
+    })
+
+
+def caminho_iterrows(df):
+    resultados = []
+    for _, row in df.iterrows():
+        alerta = verificar_valor_vs_mercado(row, valor_mercado=1000, impostos=17)
+        if alerta:
+            resultados.append({**row, 'alerta': alerta})
+    return resultados
+
+
+def caminho_motor(df):
+    mascara, alertas = avaliar_regras(df, [REGRA_VALOR_VS_MERCADO], valor_mercado=1000, impostos=17)
+    return df[mascara].assign(alerta=alertas[mascara]).to_dict('records')
+
+
+def cronometrar(funcao, df):
+    inicio = time.perf_counter()
+    resultado = funcao(df)
+    return time.perf_counter() - inicio, len(resultado)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'iterrows (s)':>14} {'motor (s)':>10} {'speedup':>9} {'alertas':>8}")
+    for n in args.tamanhos:
+        df = gerar_compras(n)
+        t_iter, n_iter = cronometrar(caminho_iterrows, df)
+        t_motor, n_motor = cronometrar(caminho_motor, df)
+        assert n_iter == n_motor, (n_iter, n_motor)
+        print(f"{n:>10} {t_iter:>14.3f} {t_motor:>10.3f} {t_iter / t_motor:>8.1f}x {n_motor:>8}")
+
+
+if __name__ == '__main__':
+    main()
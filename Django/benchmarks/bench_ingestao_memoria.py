@@ -0,0 +1,180 @@
+"""Pico de memória: leitura completa com pd.read_excel vs. ingestão em lotes.
+
+Gera (uma vez) uma planilha sintética e mede cada caminho em um processo
+separado, reportando o pico de RSS (ru_maxrss), o pico de disco temporário e
+o tempo total. A ingestão em lotes é a da produção
+(``tarefas.executar_auditoria``: leitura em duas passadas, deduplicação e
+gravação), sobre um SQLite temporário.
+
+A ingestão em lotes não tem memória constante no tamanho do arquivo: além
+de um lote por vez, guarda para o upload inteiro os dois hashes de cada
+linha (16 bytes) e as colunas das regras por grupo (códigos de categoria e
+valores em float), e, ao calcular as faixas, o histórico gravado dos SKUs
+do upload. Entre as duas passadas os lotes ficam em disco, então o pico de
+disco é da ordem do próprio arquivo.
+
+Uso:
+    python benchmarks/bench_ingestao_memoria.py [--linhas 1000000] [--arquivo /tmp/compras_1m.xlsx]
+"""
+import argparse
+import datetime
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+COLUNAS = ['sku', 'localidade', 'data', 'valor_compra', 'fornecedor', 'descricao']
+
+
+def gerar_planilha(caminho, linhas, seed=0):
+    from openpyxl import Workbook
+
+    rng = np.random.default_rng(seed)
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet()
+    planilha.append(COLUNAS)
+    bloco = 100_000
+    inicio_periodo = datetime.date(2023, 1, 1)
+    for inicio in range(0, linhas, bloco):
+        n = min(bloco, linhas - inicio)
+        skus = rng.integers(0, 5000, n)
+        localidades = rng.choice(['MG', 'SP', 'RJ', 'BA'], n)
+        dias = rng.integers(0, 730, n)
+        valores = rng.lognormal(6.8, 0.3, n).round(2)
+        fornecedores = rng.integers(0, 300, n)
+        for i in range(n):
+            planilha.append([
+                f'00-{skus[i]:06d}', str(localidades[i]), inicio_periodo + datetime.timedelta(days=int(dias[i])),
+                float(valores[i]), f'FORNECEDOR {fornecedores[i]}', f'PRODUTO {skus[i]} CX 12KG',
+            ])
+    workbook.save(caminho)
+
+
+def _pico_rss_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KiB, macOS em bytes
+    return pico / 1024 if sys.platform != 'darwin' else pico / 1024 ** 2
+
+
+def configurar_django(diretorio):
+    """Django com um banco SQLite novo em ``diretorio``, já migrado."""
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    settings.configure(
+        INSTALLED_APPS=['auditoria_app'],
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3',
+                               'NAME': os.path.join(diretorio, 'auditoria.sqlite3')}},
+        USE_TZ=True,
+    )
+    django.setup()
+    call_command('migrate', verbosity=0)
+
+
+def _tamanho_mb(diretorio):
+    total = 0
+    for raiz, _, arquivos in os.walk(diretorio):
+        for arquivo in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, arquivo))
+            except OSError:
+                pass
+    return total / 1024 ** 2
+
+
+class PicoDisco:
+    """Maior tamanho de ``diretorio`` visto em amostras a cada ``intervalo`` segundos."""
+
+    def __init__(self, diretorio, intervalo=0.2):
+        self.pico = 0.0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, args=(diretorio, intervalo), daemon=True)
+
+    def _amostrar(self, diretorio, intervalo):
+        while not self._parar.wait(intervalo):
+            self.pico = max(self.pico, _tamanho_mb(diretorio))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._parar.set()
+        self._thread.join()
+
+
+def medir(modo, caminho, tamanho_lote):
+    with tempfile.TemporaryDirectory(prefix='bench_ingestao_') as diretorio:
+        configurar_django(diretorio)
+        # Os lotes da primeira passada vão para cá, onde o tamanho é amostrado
+        tempfile.tempdir = os.path.join(diretorio, 'lotes')
+        os.makedirs(tempfile.tempdir)
+        disco = PicoDisco(tempfile.tempdir)
+        inicio = time.perf_counter()
+        if modo == 'read_excel':
+            import pandas as pd
+            from auditoria_app.audit_rules import listar_alertas
+            from auditoria_app.referencias import resolver_parametros
+
+            df = pd.read_excel(caminho)
+            n_alertas, n_linhas = len(listar_alertas(df, **resolver_parametros(df))), len(df)
+        else:
+            from auditoria_app.models import Upload
+            from auditoria_app.tarefas import executar_auditoria
+
+            upload = Upload.objects.create(nome_arquivo=os.path.basename(caminho))
+            with disco:
+                executar_auditoria(upload.pk, caminho, tamanho_lote)
+            upload.refresh_from_db()
+            if upload.estado != Upload.CONCLUIDO:
+                raise RuntimeError(upload.erro)
+            n_alertas, n_linhas = upload.total_alertas, upload.linhas_processadas
+        segundos = time.perf_counter() - inicio
+    print(json.dumps({
+        'modo': modo, 'linhas': n_linhas, 'alertas': n_alertas,
+        'segundos': segundos, 'pico_rss_mb': _pico_rss_mb(), 'pico_disco_mb': disco.pico,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--arquivo', default=None)
+    parser.add_argument('--tamanho-lote', type=int, default=50_000)
+    parser.add_argument('--modo', choices=['read_excel', 'lotes'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    arquivo = args.arquivo or os.path.join('/tmp', f'compras_{args.linhas}.xlsx')
+    if args.modo:
+        medir(args.modo, arquivo, args.tamanho_lote)
+        return
+
+    if not os.path.exists(arquivo):
+        print(f'Gerando {arquivo} ({args.linhas} linhas)...')
+        gerar_planilha(arquivo, args.linhas)
+    print(f'Arquivo: {arquivo} ({os.path.getsize(arquivo) / 1024 ** 2:.1f} MB)\n')
+
+    print(f"{'modo':<12} {'linhas':>9} {'alertas':>8} {'tempo (s)':>10} {'pico RSS (MB)':>14} {'disco (MB)':>11}")
+    for modo in ['read_excel', 'lotes']:
+        saida = subprocess.run(
+            [sys.executable, __file__, '--modo', modo, '--arquivo', arquivo,
+             '--tamanho-lote', str(args.tamanho_lote)],
+            cwd=RAIZ, check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(saida.strip().splitlines()[-1])
+        print(f"{r['modo']:<12} {r['linhas']:>9} {r['alertas']:>8} {r['segundos']:>10.1f} {r['pico_rss_mb']:>14.0f} "
+              f"{r['pico_disco_mb']:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Escalabilidade das regras por grupo (SKU/localidade) com o número de processos.
+
+Uso:
+    python benchmarks/bench_regras_paralelas.py [--linhas 5000000] [--skus 50000] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auditoria_app.audit_rules import REGRA_FAIXA_SKU_LOCALIDADE, listar_alertas  # noqa: E402
+from auditoria_app.partitioned import shutdown_pools  # noqa: E402
+
+
+def gerar_compras(n, skus, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'sku': pd.Series(rng.zipf(1.3, n) % skus).map('00-{:06d}'.format),
+        'localidade': rng.choice(['MG', 'SP', 'RJ', 'BA'], size=n),
+        'valor_compra': rng.lognormal(mean=6.8, sigma=0.3, size=n).round(2),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=5_000_000)
+    parser.add_argument('--skus', type=int, default=50_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    df = gerar_compras(args.linhas, args.skus)
+    regras = [REGRA_FAIXA_SKU_LOCALIDADE]
+    print(f'{args.linhas} linhas, {os.cpu_count()} CPUs\n')
+
+    print(f"{'workers':>7} {'tempo (s)':>10} {'speedup':>8} {'alertas':>8}")
+    base = referencia = None
+    for workers in args.workers:
+        # A primeira chamada inicia o pool e não entra na medição
+        alertas = listar_alertas(df, regras, workers=workers)
+        if referencia is None:
+            referencia = alertas
+        assert alertas['posicao'].equals(referencia['posicao'])
+        tempos = []
+        for _ in range(args.repeticoes):
+            inicio = time.perf_counter()
+            listar_alertas(df, regras, workers=workers)
+            tempos.append(time.perf_counter() - inicio)
+        melhor = min(tempos)
+        base = base or melhor
+        print(f'{workers:>7} {melhor:>10.2f} {base / melhor:>7.1f}x {len(alertas):>8}')
+    shutdown_pools()
+
+
+if __name__ == '__main__':
+    main()
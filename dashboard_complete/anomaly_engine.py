@@ -0,0 +1,165 @@
+"""Multi-detector anomaly scoring of every purchase line within its SKU/Centro.
+
+A single grouped pass computes the statistics all detectors share: quartiles,
+median, MAD and the median of each supplier in the group. Each detector is
+then a vectorized expression over those per-row statistics that yields a
+score, and a flag where the score exceeds its threshold. Groups are
+processed by ``partitioned.run_partitioned``, so the pass can be spread
+across processes (``PARTITION_WORKERS``).
+
+Detectors are pluggable: build a ``Detector`` from a scoring function
+``score(prices, stats)`` and add it with ``register_detector``.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+from pair_key import KEY_COLUMN
+from partitioned import run_partitioned
+
+# Groups with fewer purchases are not scored: their statistics are not reliable
+MIN_GROUP_SIZE = 5
+
+# Consistency constant of the MAD for normal data (Iglewicz & Hoaglin)
+MAD_SCALE = 0.6745
+# Used when more than half of the group has the same price (MAD = 0)
+MEAN_AD_SCALE = 0.7979
+# IQR of the standard normal, to put the mean absolute deviation in IQRs
+# when the middle half of the group has a single price (IQR = 0)
+NORMAL_IQR = 1.349
+
+
+class Detector:
+    def __init__(self, name, label, score, threshold):
+        self.name = name
+        self.label = label
+        self.score = score
+        self.threshold = threshold
+
+
+def _ratio(numerator, denominator):
+    """``numerator / denominator``; a zero denominator gives 0, or inf for a non-zero numerator."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = numerator / denominator
+    return np.where(denominator == 0, np.where(numerator == 0, 0.0, np.inf), ratio)
+
+
+def iqr_score(prices, stats):
+    """Distance beyond the quartiles in IQRs (Tukey fences at 1.5), with the
+    mean absolute deviation standing in when the IQR is zero."""
+    distance = np.maximum(np.maximum(stats['q1'] - prices, prices - stats['q3']), 0)
+    iqr = stats['q3'] - stats['q1']
+    scale = np.where(iqr > 0, iqr, stats['mean_ad'] / MEAN_AD_SCALE * NORMAL_IQR)
+    return _ratio(distance, scale)
+
+
+def robust_z_score(prices, stats):
+    """Modified z-score |0.6745 (x - median) / MAD|, with the mean absolute
+    deviation standing in when the MAD is zero."""
+    deviation = np.abs(prices - stats['median'])
+    scale = np.where(stats['mad'] > 0, stats['mad'] / MAD_SCALE, stats['mean_ad'] / MEAN_AD_SCALE)
+    return _ratio(deviation, scale)
+
+
+def median_deviation_score(prices, stats):
+    """Absolute deviation from the group median, in percent."""
+    return _ratio(np.abs(prices - stats['median']), np.abs(stats['median'])) * 100
+
+
+def supplier_spread_score(prices, stats):
+    """How far the row's supplier median sits from the group median, in percent."""
+    return _ratio(np.abs(stats['supplier_median'] - stats['median']), np.abs(stats['median'])) * 100
+
+
+DETECTORS = {}
+
+
+def register_detector(detector):
+    DETECTORS[detector.name] = detector
+    return detector
+
+
+register_detector(Detector('iqr', 'IQR', iqr_score, 1.5))
+register_detector(Detector('robust_z', 'Z robusto (MAD)', robust_z_score, 3.5))
+register_detector(Detector('median_pct', 'Desvio da mediana (%)', median_deviation_score, 50.0))
+register_detector(Detector('supplier_spread', 'Fornecedor vs. grupo (%)', supplier_spread_score, 30.0))
+
+
+def group_statistics(data):
+    """Per-row statistics of the row's group (``codes``) over ``price``."""
+    codes = data['codes']
+    prices = pd.Series(data['price'], dtype=float)
+    grouped = prices.groupby(codes)
+    # ngroup() numbers the groups in the same (sorted) order as the aggregates
+    group = grouped.ngroup().to_numpy()
+    quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack().reindex(columns=[0.25, 0.5, 0.75])
+    stats = {
+        # Prices only: rows without one do not make a group reliable
+        'count': grouped.count().to_numpy()[group],
+        'q1': quartiles[0.25].to_numpy()[group],
+        'median': quartiles[0.5].to_numpy()[group],
+        'q3': quartiles[0.75].to_numpy()[group],
+    }
+    deviation = pd.Series(np.abs(prices.to_numpy() - stats['median']))
+    by_group = deviation.groupby(codes)
+    stats['mad'] = by_group.median().to_numpy()[group]
+    stats['mean_ad'] = by_group.mean().to_numpy()[group]
+    stats['supplier_median'] = prices.groupby([codes, data['supplier']]).transform('median').to_numpy()
+    return stats
+
+
+def score_rows(data, detectors):
+    """Score and flag per detector for whole groups; runs in the partition workers."""
+    prices = np.asarray(data['price'], dtype=float)
+    stats = group_statistics(data)
+    scored = stats['count'] >= MIN_GROUP_SIZE
+    result = {}
+    for name in detectors:
+        score = np.where(scored, DETECTORS[name].score(prices, stats), 0.0)
+        result[f'score_{name}'] = np.nan_to_num(score, nan=0.0)
+        result[f'flag_{name}'] = result[f'score_{name}'] > DETECTORS[name].threshold
+    return result
+
+
+def detect(df, detectors=None, workers=None, price_column='Preco_Unitario', supplier_column='Fornecedor'):
+    """Anomaly columns for every row of ``df`` (grouped by ``KEY_COLUMN``).
+
+    Returns a frame aligned with ``df`` holding ``score_<name>`` and
+    ``flag_<name>`` per detector, ``anomaly_score`` (the largest score as a
+    multiple of its detector's threshold, so > 1 means flagged) and
+    ``anomaly_flags`` (number of detectors that flagged the row).
+    """
+    detectors = tuple(DETECTORS) if detectors is None else tuple(detectors)
+    supplier = df[supplier_column]
+    if isinstance(supplier.dtype, pd.CategoricalDtype):
+        supplier_codes = supplier.cat.codes.to_numpy()
+    else:
+        supplier_codes = pd.factorize(supplier)[0]
+    outputs = {}
+    for name in detectors:
+        outputs[f'score_{name}'] = 'f8'
+        outputs[f'flag_{name}'] = '?'
+
+    result = run_partitioned(
+        functools.partial(score_rows, detectors=detectors),
+        df[KEY_COLUMN].to_numpy(),
+        {'price': df[price_column].to_numpy(dtype=float), 'supplier': supplier_codes.astype(np.int64)},
+        outputs,
+        workers
+    )
+    frame = pd.DataFrame(result, index=df.index)
+    relative = np.column_stack([frame[f'score_{name}'] / DETECTORS[name].threshold for name in detectors])
+    frame['anomaly_score'] = relative.max(axis=1)
+    frame['anomaly_flags'] = frame[[f'flag_{name}' for name in detectors]].sum(axis=1).astype(np.int8)
+    return frame
+
+
+def flagged_by(frame, detectors=None):
+    """Labels of the detectors that flagged each row, comma separated."""
+    detectors = tuple(DETECTORS) if detectors is None else tuple(detectors)
+    labels = pd.Series('', index=frame.index)
+    for name in detectors:
+        flag = frame[f'flag_{name}']
+        labels = labels.where(~flag, labels + np.where(labels == '', '', ', ') + DETECTORS[name].label)
+    return labels
@@ -1,79 +1,157 @@
 import dash
-from dash import dcc, html, dash_table, Input, Output, State, callback
+from dash import dcc, html, dash_table, Input, Output, State, callback, no_update
+from dash.exceptions import PreventUpdate
+from flask import Response, abort, request
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
+import json
 import os
+import threading
+from urllib.parse import urlencode
+
+from ingest import load_base
+from anomaly_engine import detect, flagged_by
+from box_stats import box_stats, outlier_mask
+from cube import MONTH_COLUMN, AggregateCube, build_cube, group_stats
+import export
+import metrics
+from figure_cache import FigureCache
+from filter_index import FilterIndex
+from pair_key import KEY_COLUMN, PairKey
+from result_store import ResultStore, check_state, normalize_state, state_key
+import table_view
+from time_series import AUTO, AXIS_TITLES, MONTH, RAW, RESOLUTION_LABELS, aggregate_rows, downsample, pick_resolution
+from reference_store import ReferenceStore
+from suspect_engine import SuspectEngine
 
 # --- Configuration ---
-original_file = "/home/ubuntu/upload/Base Dados v2.XLSX"
-suspect_file = "/home/ubuntu/suspect_skus_for_external_check.csv"
+# BASE_FILE/SUSPECT_FILE point the dashboard at other data, e.g. synthetic_data.py output;
+# without a suspects file they are detected from the base at load time
+original_file = os.environ.get('BASE_FILE', "/home/ubuntu/upload/Base Dados v2.XLSX")
+suspect_file = os.environ.get('SUSPECT_FILE', "/home/ubuntu/suspect_skus_for_external_check.csv")
+
+# External price quotes (CSV/Parquet files), matched to the SKUs by description
+reference_path = os.environ.get('REFERENCE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'references'))
+
+# Suspects shown in the comparison chart, largest price gap first
+COMPARISON_LIMIT = 30
 
 # --- Data Loading and Preparation ---
-# Load original data
-df_orig = pd.read_excel(original_file, sheet_name=0)
-df_orig['Quantidade'] = pd.to_numeric(df_orig['Quantidade'], errors='coerce')
-df_orig['Valor Liquido'] = pd.to_numeric(df_orig['Valor Liquido'], errors='coerce')
-df_orig.dropna(subset=['Quantidade', 'Valor Liquido', 'SKU', 'Centro'], inplace=True)
-df_orig = df_orig[df_orig['Quantidade'] > 0]
-df_orig = df_orig[df_orig['Valor Liquido'] >= 0]
-df_orig['Preco_Unitario'] = df_orig['Valor Liquido'] / df_orig['Quantidade']
-df_orig['Data Doc.'] = pd.to_datetime(df_orig['Data Doc.'], errors='coerce')
-
-# Load suspect SKUs data
-df_suspect = pd.read_csv(suspect_file)
-# Sort suspects for relevance
-df_suspect.sort_values(by=['Num_Outliers_IQR', 'CV_Percent'], ascending=False, inplace=True)
-
-# External price comparison data (hardcoded based on external_price_notes.md)
-comparison_data = {
-    'SKU': [
-        '00-060.742',
-        '00-013.991',
-        '00-050.758',
-        '00-013.992'
-    ],
-    'Descrição': [
-        'LINGUICA MINEIRA 0,8KG CX 6,4 KG',
-        '8947 FILE PEITO DESF TEMP 400GCX12KG UNI',
-        '8943 LASANHA A BOLONHESA 600G CX 6KG UNI',
-        '8949 FILE PEITO DESFIADO 4KG CX 16KG UNI'
-    ],
-    'Centro': [
-        'CDF2',
-        'CDUA',
-        'CDUA',
-        'CDUA'
-    ],
-    'Preço Médio Interno (R$)': [
-        10.78,  # R$ 69.02 / 6.4kg
-        268.70,  # Assumed unit, likely incorrect
-        68.56,  # Assumed unit, likely incorrect
-        339.79  # Assumed unit, likely incorrect
-    ],
-    'Referência Externa (R$)': [
-        23.99,  # Paxa 1kg
-        13.99,  # Atacado Vem 400g (lowest found)
-        15.40,  # Paulistao 600g (lowest found)
-        134.25  # Eficaz 4kg
-    ],
-    'Observação': [
-        'Variação interna alta, min R$2.42/kg',
-        'Discrepância ENORME - Verificar unidade/qtd interna',
-        'Discrepância ENORME - Verificar unidade/qtd interna',
-        'Discrepância ENORME - Verificar unidade/qtd interna'
-    ]
+# Everything derived from the base is built by load_data(). By default it runs
+# in a background thread, so the server binds its port right away and /ready
+# reports when the data is available. With DATA_LOAD=eager it runs at import:
+# under ``gunicorn --preload`` the master then loads once and the forked
+# workers share the frames copy-on-write.
+DATA_WAIT_TIMEOUT = float(os.environ.get('DATA_WAIT_TIMEOUT', 120))
+
+# Dropdown id -> base column it filters
+DROPDOWN_COLUMNS = {
+    'centro-filter': 'Centro',
+    'sku-filter': 'SKU',
+    'fornecedor-filter': 'Fornecedor',
+    'grupo-filter': 'Grp. Mercadoria',
+    'desc-grupo-filter': 'Descrição.1'
 }
-df_comp = pd.DataFrame(comparison_data)
 
-# Get unique values for filters
-centros = sorted(df_orig['Centro'].unique())
-skus = sorted(df_orig['SKU'].unique())
-fornecedores = sorted(df_orig['Fornecedor'].unique())
-grupos_servico = sorted(df_orig['Grp. Mercadoria'].dropna().unique())
-descricoes_grupo = sorted(df_orig['Descrição.1'].dropna().unique())
+# Type-ahead dropdowns list at most this many matches
+OPTION_LIMIT = 50
+
+data_ready = threading.Event()
+data_error = None
+
+def load_suspects(path, base):
+    """Suspect SKUs from the CSV at ``path`` or, when there is none, detected
+    in-process from ``base`` (same schema, see suspect_engine.py)."""
+    if os.path.exists(path):
+        return pd.read_csv(path)
+    return SuspectEngine().update(base).suspects()
+
+def load_data():
+    global df_orig, df_suspect, pair_key, suspect_keys, filter_index, aggregate_cube, descricao_by_key
+    global filter_options, date_min, date_max, export_columns, reference_comparison, data_error
+    
+    try:
+        # Load original data (from the columnar cache; the XLSX is only parsed when it changes)
+        df_orig = load_base(original_file, sheet_name=0)
+
+        # Load suspect SKUs data
+        df_suspect = load_suspects(suspect_file, df_orig)
+        # Sort suspects for relevance
+        df_suspect.sort_values(by=['Num_Outliers_IQR', 'CV_Percent'], ascending=False, inplace=True)
+
+        # Shared (SKU, Centro) integer key used for every base <-> suspects join
+        pair_key = PairKey.from_frame(df_orig)
+        df_orig[KEY_COLUMN] = pair_key.encode(df_orig['SKU'], df_orig['Centro'])
+        df_suspect[KEY_COLUMN] = pair_key.encode(df_suspect['SKU'], df_suspect['Centro'])
+        # Membership table of the suspect pairs, probed by every "only suspects" filter
+        suspect_keys = pair_key.key_set(df_suspect[KEY_COLUMN])
+
+        # Score and flag columns of every anomaly detector, for the whole base
+        # (on per-kg prices where the pack sizes are known, see units.py)
+        anomalies = detect(df_orig, price_column='Preco_Comparavel')
+        df_orig[list(anomalies.columns)] = anomalies
+
+        # Posting lists per filter value and a sorted date index, built once
+        filter_index = FilterIndex(
+            df_orig,
+            dimensions={
+                'centros': 'Centro',
+                'skus': 'SKU',
+                'fornecedores': 'Fornecedor',
+                'grupos': 'Grp. Mercadoria',
+                'desc_grupos': 'Descrição.1'
+            },
+            date_column='Data Doc.'
+        )
+
+        # Centro x SKU x Fornecedor x month aggregates for the overview charts
+        aggregate_cube = AggregateCube(df_orig)
+
+        # First description seen for each SKU/Centro, used in chart labels
+        descricao_by_key = df_orig.drop_duplicates(KEY_COLUMN).set_index(KEY_COLUMN)['Descrição']
+
+        # Best external quote of every SKU/Centro, matched in one batched pass,
+        # against the internal median price per kg
+        references = ReferenceStore.from_path(reference_path)
+        reference_comparison = references.best_matches(descricao_by_key).join(
+            df_orig.groupby(KEY_COLUMN)['Preco_Por_Kg'].median().rename('Preco_Interno_Kg'), how='inner'
+        ).dropna(subset=['Preco_Interno_Kg', 'Preco_Por_Kg'])
+        reference_comparison['Diferenca_Percent'] = (
+            reference_comparison['Preco_Interno_Kg'] / reference_comparison['Preco_Por_Kg'] - 1) * 100
+
+        # Sorted values of each filter dropdown, searched by the type-ahead callbacks
+        filter_options = {
+            dropdown_id: pd.Series(sorted(df_orig[column].dropna().unique()), dtype=str)
+            for dropdown_id, column in DROPDOWN_COLUMNS.items()
+        }
+        date_min, date_max = df_orig['Data Doc.'].min(), df_orig['Data Doc.'].max()
+        export_columns = [column for column in df_orig.columns if column != KEY_COLUMN]
+        # Figures cached for earlier data must not be served for this one
+        figure_cache.new_generation()
+    except Exception as exc:
+        data_error = exc
+        raise
+    finally:
+        data_ready.set()
+    
+    if os.environ.get('FIGURE_CACHE_WARM', '1') == '1':
+        warm_figure_cache()
+
+def data_available(timeout=DATA_WAIT_TIMEOUT):
+    """Wait (up to ``timeout`` seconds) for the data; ``False`` if it is not usable."""
+    return data_ready.wait(timeout) and data_error is None
+
+def require_data():
+    # Callbacks arriving while the data loads wait for it, then give up
+    if not data_available():
+        raise PreventUpdate
+
+# Columns of the detailed-data table
+display_cols = ['Nº Pedido', 'Item', 'Data Doc.', 'SKU', 'Descrição', 'UN', 'Centro', 
+                'Quantidade', 'Valor Liquido', 'Preco_Unitario', 'Fornecedor']
 
 # --- Initialize Dash App ---
 app = dash.Dash(__name__, 
@@ -90,6 +168,13 @@ app.layout = html.Div([
                className="text-center text-muted mb-4"),
     ], className="container"),
     
+    # Shown until the base is loaded (see load_data)
+    html.Div([
+        html.Div("Carregando a base de dados...", id='loading-banner', className="alert alert-info"),
+        dcc.Interval(id='data-status', interval=1000),
+        dcc.Store(id='data-loaded')
+    ], className="container"),
+    
     # Filters Section
     html.Div([
         html.Div([
@@ -99,7 +184,7 @@ app.layout = html.Div([
                     html.Label("Centro:"),
                     dcc.Dropdown(
                         id='centro-filter',
-                        options=[{'label': c, 'value': c} for c in centros],
+                        options=[],
                         multi=True,
                         placeholder="Selecione um ou mais Centros"
                     ),
@@ -108,7 +193,7 @@ app.layout = html.Div([
                     html.Label("SKU:"),
                     dcc.Dropdown(
                         id='sku-filter',
-                        options=[{'label': s, 'value': s} for s in skus],
+                        options=[],
                         multi=True,
                         placeholder="Selecione um ou mais SKUs"
                     ),
@@ -117,7 +202,7 @@ app.layout = html.Div([
                     html.Label("Fornecedor:"),
                     dcc.Dropdown(
                         id='fornecedor-filter',
-                        options=[{'label': f, 'value': f} for f in fornecedores],
+                        options=[],
                         multi=True,
                         placeholder="Selecione um ou mais Fornecedores"
                     ),
@@ -128,7 +213,7 @@ app.layout = html.Div([
                     html.Label("Grupo de Mercadoria:"),
                     dcc.Dropdown(
                         id='grupo-filter',
-                        options=[{'label': g, 'value': g} for g in grupos_servico],
+                        options=[],
                         multi=True,
                         placeholder="Selecione um ou mais Grupos"
                     ),
@@ -137,7 +222,7 @@ app.layout = html.Div([
                     html.Label("Descrição do Grupo:"),
                     dcc.Dropdown(
                         id='desc-grupo-filter',
-                        options=[{'label': d, 'value': d} for d in descricoes_grupo],
+                        options=[],
                         multi=True,
                         placeholder="Selecione uma ou mais Descrições"
                     ),
@@ -148,10 +233,6 @@ app.layout = html.Div([
                     html.Label("Período:"),
                     dcc.DatePickerRange(
                         id='date-range',
-                        min_date_allowed=df_orig['Data Doc.'].min(),
-                        max_date_allowed=df_orig['Data Doc.'].max(),
-                        start_date=df_orig['Data Doc.'].min(),
-                        end_date=df_orig['Data Doc.'].max(),
                         display_format='DD/MM/YYYY'
                     ),
                 ], className="col-md-6"),
@@ -188,6 +269,12 @@ app.layout = html.Div([
                     dcc.Graph(id='price-distribution-chart'),
                     
                     html.H4("Evolução de Preço ao Longo do Tempo", className="mt-4 mb-3"),
+                    dcc.RadioItems(
+                        id='price-time-resolution',
+                        options=[{'label': label, 'value': value} for value, label in RESOLUTION_LABELS.items()],
+                        value=AUTO,
+                        inline=True
+                    ),
                     dcc.Graph(id='price-time-chart'),
                 ], className="p-3")
             ]),
@@ -210,13 +297,46 @@ app.layout = html.Div([
             dcc.Tab(label="Dados Detalhados", children=[
                 html.Div([
                     html.H4("Transações Filtradas", className="mt-4 mb-3"),
-                    html.Div(id='filtered-data-container', className="mb-4"),
-                    
                     html.Div([
-                        html.Button("Exportar CSV", id="export-csv", className="btn btn-success")
-                    ], className="text-right mb-3"),
+                        html.Div(id='filtered-data-note', className="text-muted mb-2"),
+                        dash_table.DataTable(
+                            id='filtered-data-table',
+                            columns=[{"name": col, "id": col} for col in display_cols],
+                            data=[],
+                            style_table={'overflowX': 'auto'},
+                            style_cell={
+                                'textAlign': 'left',
+                                'padding': '5px',
+                                'minWidth': '100px', 'width': '150px', 'maxWidth': '300px',
+                                'whiteSpace': 'normal',
+                                'height': 'auto'
+                            },
+                            style_header={
+                                'backgroundColor': 'rgb(230, 230, 230)',
+                                'fontWeight': 'bold'
+                            },
+                            style_data_conditional=[
+                                {
+                                    'if': {'row_index': 'odd'},
+                                    'backgroundColor': 'rgb(248, 248, 248)'
+                                }
+                            ],
+                            # Filter, sort and paging run on the server (table_view)
+                            page_action='custom',
+                            sort_action='custom',
+                            sort_mode='multi',
+                            filter_action='custom',
+                            page_current=0,
+                            page_size=20,
+                            sort_by=[],
+                            filter_query=''
+                        )
+                    ], id='filtered-data-container', className="mb-4"),
                     
-                    html.Div(id='export-notification', className="alert alert-success", style={'display': 'none'})
+                    html.Div([
+                        html.A("Exportar CSV", id="export-csv", href="/export/csv", className="btn btn-success mr-2"),
+                        html.A("Exportar Parquet", id="export-parquet", href="/export/parquet", className="btn btn-success")
+                    ], className="text-right mb-3")
                 ], className="p-3")
             ]),
         ])
@@ -231,6 +351,88 @@ app.layout = html.Div([
 
 # --- Callbacks ---
 
+# Filtered frames live server-side; the browser only keeps {'key', 'state'}
+result_store = ResultStore(
+    max_entries=int(os.environ.get('RESULT_CACHE_ENTRIES', 32)),
+    max_bytes=int(os.environ.get('RESULT_CACHE_MB', 2048)) * 1024 ** 2
+)
+
+# Figures per (chart, filter-state key), so repeated views skip the Plotly build
+figure_cache = FigureCache(
+    max_entries=int(os.environ.get('FIGURE_CACHE_ENTRIES', 256)),
+    # The data only changes on load, which starts a new generation; expiry is opt-in
+    ttl=float(os.environ['FIGURE_CACHE_TTL']) if os.environ.get('FIGURE_CACHE_TTL') else None
+)
+
+def filter_positions(state):
+    """Row positions of ``df_orig`` selected by ``state``, or ``None`` for all rows."""
+    # Intersect the precomputed indexes; rows are only materialized by the caller
+    positions = filter_index.select(
+        {name: state.get(name) for name in filter_index.dimensions},
+        start_date=state.get('start_date'),
+        end_date=state.get('end_date')
+    )
+
+    # Filter for only suspect SKUs if selected
+    if state.get('only_suspects') == 'yes':
+        if positions is None:
+            positions = np.arange(len(df_orig))
+        keys = df_orig[KEY_COLUMN].to_numpy()[positions]
+        positions = positions[suspect_keys.contains(keys)]
+
+    return positions
+
+def apply_filters(state):
+    return filter_index.take(filter_positions(state))
+
+def get_filtered(data):
+    """Resolve the ``filtered-data`` store to the cached frame (read-only).
+
+    On a cache miss (evicted entry, or a request served by another worker)
+    the frame is rebuilt from the filter state kept alongside the key.
+    """
+    if not data:
+        return None
+    require_data()
+    df = result_store.get(data['key'])
+    if df is None:
+        with metrics.timed('filter_rebuild'):
+            df = result_store.put(data['key'], apply_filters(data['state']))
+    metrics.count_rows(len(df))
+    return df
+
+def get_cube(data):
+    """Aggregates for the current filters: a slice of the precomputed cube
+    when the filters allow it, otherwise built from the filtered rows."""
+    if not data:
+        return None
+    require_data()
+    with metrics.timed('cube_slice'):
+        cube = aggregate_cube.slice(data['state'], suspect_keys=suspect_keys)
+    if cube is None:
+        cube_key = data['key'] + ':cube'
+        cube = result_store.get(cube_key)
+        if cube is None:
+            df = get_filtered(data)
+            with metrics.timed('cube_build'):
+                cube = result_store.put(cube_key, build_cube(df))
+    return cube
+
+def get_box_stats(data):
+    """Quartiles, fences and whiskers per SKU/Centro for the current filters,
+    computed once per result and shared by the box plots and outlier details."""
+    stats_key = data['key'] + ':box'
+    stats = result_store.get(stats_key)
+    if stats is None:
+        df = get_filtered(data)
+        with metrics.timed('box_stats'):
+            stats = result_store.put(stats_key, box_stats(df[KEY_COLUMN].to_numpy(), df['Preco_Unitario'].to_numpy()))
+    return stats
+
+def short_description(key, length):
+    desc = descricao_by_key.get(key, '')
+    return desc[:length] + '...' if len(desc) > length else desc
+
 # Filter data based on user selections
 @app.callback(
     Output('filtered-data', 'data'),
@@ -246,36 +448,27 @@ app.layout = html.Div([
     prevent_initial_call=True
 )
 def filter_data(n_clicks, centros, skus, fornecedores, grupos, desc_grupos, start_date, end_date, only_suspects):
-    # Start with the original dataframe
-    filtered_df = df_orig.copy()
-    
-    # Apply filters
-    if centros and len(centros) > 0:
-        filtered_df = filtered_df[filtered_df['Centro'].isin(centros)]
-    
-    if skus and len(skus) > 0:
-        filtered_df = filtered_df[filtered_df['SKU'].isin(skus)]
-    
-    if fornecedores and len(fornecedores) > 0:
-        filtered_df = filtered_df[filtered_df['Fornecedor'].isin(fornecedores)]
-    
-    # Apply new group filters
-    if grupos and len(grupos) > 0:
-        filtered_df = filtered_df[filtered_df['Grp. Mercadoria'].isin(grupos)]
-    
-    if desc_grupos and len(desc_grupos) > 0:
-        filtered_df = filtered_df[filtered_df['Descrição.1'].isin(desc_grupos)]
-    
-    if start_date and end_date:
-        filtered_df = filtered_df[(filtered_df['Data Doc.'] >= start_date) & 
-                                 (filtered_df['Data Doc.'] <= end_date)]
-    
-    # Filter for only suspect SKUs if selected
-    if only_suspects == 'yes':
-        suspect_skus_centros = [(row['SKU'], row['Centro']) for _, row in df_suspect.iterrows()]
-        filtered_df = filtered_df[filtered_df.apply(lambda row: (row['SKU'], row['Centro']) in suspect_skus_centros, axis=1)]
-    
-    return filtered_df.to_dict('records')
+    require_data()
+    state = {
+        'centros': centros,
+        'skus': skus,
+        'fornecedores': fornecedores,
+        'grupos': grupos,
+        'desc_grupos': desc_grupos,
+        'start_date': start_date,
+        'end_date': end_date,
+        'only_suspects': only_suspects
+    }
+    # A range covering the whole base is the same view as no date filter
+    if start_date and end_date and pd.Timestamp(start_date) <= date_min and pd.Timestamp(end_date) >= date_max:
+        state['start_date'] = state['end_date'] = None
+    key = state_key(state)
+    df = result_store.get(key)
+    if df is None:
+        with metrics.timed('filter'):
+            df = result_store.put(key, apply_filters(state))
+    metrics.count_rows(len(df))
+    return {'key': key, 'state': state}
 
 # Clear filters
 @app.callback(
@@ -291,20 +484,67 @@ def filter_data(n_clicks, centros, skus, fornecedores, grupos, desc_grupos, star
     prevent_initial_call=True
 )
 def clear_filters(n_clicks):
-    return None, None, None, None, None, df_orig['Data Doc.'].min(), df_orig['Data Doc.'].max(), 'no'
+    require_data()
+    return None, None, None, None, None, date_min, date_max, 'no'
+
+# Loading banner and date range, filled in once the base is loaded
+@app.callback(
+    [Output('loading-banner', 'children'),
+     Output('loading-banner', 'style'),
+     Output('data-status', 'disabled'),
+     Output('data-loaded', 'data'),
+     Output('date-range', 'min_date_allowed'),
+     Output('date-range', 'max_date_allowed'),
+     Output('date-range', 'start_date'),
+     Output('date-range', 'end_date')],
+    Input('data-status', 'n_intervals')
+)
+def update_data_status(n_intervals):
+    if not data_ready.is_set():
+        return "Carregando a base de dados...", {'display': 'block'}, False, no_update, no_update, no_update, no_update, no_update
+    if data_error is not None:
+        return (f"Erro ao carregar a base de dados: {data_error}", {'display': 'block'}, True,
+                no_update, no_update, no_update, no_update, no_update)
+    return "", {'display': 'none'}, True, True, date_min, date_max, date_min, date_max
+
+def search_options(values, search_value, selected):
+    """Up to OPTION_LIMIT values containing ``search_value`` (case-insensitive),
+    plus the selected ones, which the dropdown needs to keep displaying them."""
+    if search_value:
+        values = values[values.str.contains(search_value, case=False, regex=False)]
+    matches = values.iloc[:OPTION_LIMIT].tolist()
+    extra = [value for value in selected or [] if value not in matches]
+    return [{'label': value, 'value': value} for value in extra + matches]
+
+def register_option_search(dropdown_id):
+    @app.callback(
+        Output(dropdown_id, 'options'),
+        Input(dropdown_id, 'search_value'),
+        Input('data-loaded', 'data'),
+        State(dropdown_id, 'value')
+    )
+    def update_options(search_value, loaded, selected):
+        if not loaded:
+            raise PreventUpdate
+        return search_options(filter_options[dropdown_id], search_value, selected)
+
+# Type-ahead options: only matches of what is typed are sent to the browser
+for dropdown_id in DROPDOWN_COLUMNS:
+    register_option_search(dropdown_id)
 
 # Update Centro Spending Chart
 @app.callback(
     Output('centro-spending-chart', 'figure'),
     Input('filtered-data', 'data')
 )
+@figure_cache.memoize('centro_spending')
 def update_centro_spending(data):
-    if not data:
+    cube = get_cube(data)
+    if cube is None or cube.empty:
         # Return empty figure if no data
         return go.Figure()
     
-    df = pd.DataFrame(data)
-    centro_spending = df.groupby('Centro')['Valor Liquido'].sum().reset_index().sort_values('Valor Liquido', ascending=False)
+    centro_spending = group_stats(cube, 'Centro').sort_values('Valor Liquido', ascending=False)
     
     fig = px.bar(
         centro_spending, 
@@ -330,34 +570,55 @@ def update_centro_spending(data):
     Output('price-distribution-chart', 'figure'),
     Input('filtered-data', 'data')
 )
+@figure_cache.memoize('price_distribution')
 def update_price_distribution(data):
-    if not data:
+    cube = get_cube(data)
+    if cube is None or cube.empty:
         # Return empty figure if no data
         return go.Figure()
     
-    df = pd.DataFrame(data)
-    
-    # Group by SKU and Centro
-    grouped = df.groupby(['SKU', 'Centro'])
-    
     # Get top 10 SKU/Centro combinations by number of transactions
-    top_groups = grouped.size().reset_index(name='count').sort_values('count', ascending=False).head(10)
+    top_groups = group_stats(cube, [KEY_COLUMN, 'SKU', 'Centro']).sort_values('count', ascending=False).head(10)
+    
+    # Only the summary statistics and the outlier points go to the browser
+    stats = get_box_stats(data)
+    df = get_filtered(data)
+    top_rows = df[pair_key.semi_join(df[KEY_COLUMN], top_groups[KEY_COLUMN])]
+    top_rows = top_rows[outlier_mask(stats, top_rows[KEY_COLUMN], top_rows['Preco_Unitario'])]
+    outlier_prices = top_rows['Preco_Unitario'].groupby(top_rows[KEY_COLUMN]).apply(np.asarray)
     
     # Create box plots for these top groups
     fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
     
-    for _, row in top_groups.iterrows():
-        sku, centro = row['SKU'], row['Centro']
-        group_data = df[(df['SKU'] == sku) & (df['Centro'] == centro)]
+    for i, (_, row) in enumerate(top_groups.iterrows()):
+        sku, centro, key = row['SKU'], row['Centro'], row[KEY_COLUMN]
+        box = stats.loc[key]
         
         # Get a short description (first 20 chars)
-        desc = group_data['Descrição'].iloc[0][:20] + '...' if len(group_data['Descrição'].iloc[0]) > 20 else group_data['Descrição'].iloc[0]
+        desc = short_description(key, 20)
+        name = f"{sku} ({centro})<br>{desc}"
+        color = colors[i % len(colors)]
         
         fig.add_trace(go.Box(
-            y=group_data['Preco_Unitario'],
-            name=f"{sku} ({centro})<br>{desc}",
-            boxpoints='outliers'
+            x=[name],
+            q1=[box['q1']],
+            median=[box['median']],
+            q3=[box['q3']],
+            lowerfence=[box['lowerfence']],
+            upperfence=[box['upperfence']],
+            name=name,
+            marker_color=color
         ))
+        outliers = outlier_prices.get(key)
+        if outliers is not None:
+            fig.add_trace(go.Scatter(
+                x=[name] * len(outliers),
+                y=outliers,
+                mode='markers',
+                name=name,
+                marker_color=color
+            ))
     
     fig.update_layout(
         title='Distribuição de Preço Unitário (Top 10 SKU/Centro por volume)',
@@ -371,46 +632,62 @@ def update_price_distribution(data):
 # Update Price Time Chart
 @app.callback(
     Output('price-time-chart', 'figure'),
-    Input('filtered-data', 'data')
+    Input('filtered-data', 'data'),
+    Input('price-time-resolution', 'value')
 )
-def update_price_time_chart(data):
-    if not data:
+@figure_cache.memoize('price_time_chart')
+def update_price_time_chart(data, resolution):
+    cube = get_cube(data)
+    if cube is None or cube.empty:
         # Return empty figure if no data
         return go.Figure()
     
-    df = pd.DataFrame(data)
-    
-    # Ensure data is sorted by date
-    df = df.sort_values('Data Doc.')
-    
-    # Group by SKU, Centro and Date
-    df['Mês'] = df['Data Doc.'].dt.to_period('M').astype(str)
+    # Resolution follows the selected range: days, weeks, then months
+    if resolution == AUTO:
+        state = data['state']
+        resolution = pick_resolution(state.get('start_date') or date_min, state.get('end_date') or date_max)
     
     # Get top 5 SKU/Centro combinations by number of transactions
-    top_groups = df.groupby(['SKU', 'Centro']).size().reset_index(name='count').sort_values('count', ascending=False).head(5)
+    top_groups = group_stats(cube, [KEY_COLUMN, 'SKU', 'Centro']).sort_values('count', ascending=False).head(5)
+    
+    if resolution == MONTH:
+        # Monthly average price per SKU/Centro straight from the cube
+        top_cube = cube[pair_key.semi_join(cube[KEY_COLUMN], top_groups[KEY_COLUMN])]
+        series = group_stats(top_cube.dropna(subset=[MONTH_COLUMN]), [KEY_COLUMN, MONTH_COLUMN]).sort_values(MONTH_COLUMN)
+        series = series.rename(columns={MONTH_COLUMN: 'period'})
+    else:
+        # Only the rows of the plotted pairs are read
+        df = get_filtered(data)
+        top_rows = df[pair_key.semi_join(df[KEY_COLUMN], top_groups[KEY_COLUMN])].dropna(subset=['Data Doc.'])
+        if resolution == RAW:
+            series = top_rows[[KEY_COLUMN, 'Data Doc.', 'Preco_Unitario']].sort_values('Data Doc.', kind='stable')
+            series.columns = [KEY_COLUMN, 'period', 'price_mean']
+        else:
+            series = aggregate_rows(top_rows, resolution)
+    series_by_key = dict(list(series.groupby(KEY_COLUMN)))
     
     fig = go.Figure()
     
     for _, row in top_groups.iterrows():
-        sku, centro = row['SKU'], row['Centro']
-        group_data = df[(df['SKU'] == sku) & (df['Centro'] == centro)]
-        
-        # Calculate monthly average price
-        monthly_avg = group_data.groupby('Mês')['Preco_Unitario'].mean().reset_index()
+        sku, centro, key = row['SKU'], row['Centro'], row[KEY_COLUMN]
+        points = series_by_key.get(key)
+        if points is None:
+            continue
         
         # Get a short description
-        desc = group_data['Descrição'].iloc[0][:15] + '...' if len(group_data['Descrição'].iloc[0]) > 15 else group_data['Descrição'].iloc[0]
+        desc = short_description(key, 15)
         
+        x, y = downsample(points['period'], points['price_mean'])
         fig.add_trace(go.Scatter(
-            x=monthly_avg['Mês'],
-            y=monthly_avg['Preco_Unitario'],
+            x=x,
+            y=y,
             mode='lines+markers',
             name=f"{sku} ({centro}) - {desc}"
         ))
     
     fig.update_layout(
-        title='Evolução do Preço Unitário Médio Mensal (Top 5 SKU/Centro por volume)',
-        xaxis_title='Mês',
+        title=f'Evolução do Preço Unitário Médio ({RESOLUTION_LABELS[resolution]}, Top 5 SKU/Centro por volume)',
+        xaxis_title=AXIS_TITLES[resolution],
         yaxis_title='Preço Unitário Médio (R$)',
         legend_title='SKU (Centro)',
         height=500
@@ -424,16 +701,12 @@ def update_price_time_chart(data):
     Input('filtered-data', 'data')
 )
 def update_suspect_table(data):
-    if not data:
+    df = get_filtered(data)
+    if df is None or df.empty:
         return html.Div("Nenhum dado disponível com os filtros atuais.")
     
-    df = pd.DataFrame(data)
-    
-    # Get unique SKU/Centro combinations in filtered data
-    filtered_sku_centro = set(zip(df['SKU'], df['Centro']))
-    
     # Filter suspect dataframe to only show those in the filtered data
-    filtered_suspects = df_suspect[df_suspect.apply(lambda row: (row['SKU'], row['Centro']) in filtered_sku_centro, axis=1)]
+    filtered_suspects = df_suspect[pair_key.semi_join(df_suspect[KEY_COLUMN], df[KEY_COLUMN])]
     
     if len(filtered_suspects) == 0:
         return html.Div("Nenhum SKU/Centro suspeito encontrado com os filtros atuais.")
@@ -480,49 +753,60 @@ def update_suspect_table(data):
         page_size=10
     )
 
-# Update Internal vs External Comparison
+# Update Internal vs. External Comparison
 @app.callback(
     Output('internal-external-comparison', 'figure'),
     Input('filtered-data', 'data')
 )
+@figure_cache.memoize('comparison')
 def update_comparison_chart(data):
-    # This chart uses the hardcoded comparison data
+    df = get_filtered(data)
+    if df is None or df.empty:
+        return go.Figure()
+
+    # Every suspect in the filtered data with a matched quote (see load_data)
+    filtered_suspects = df_suspect[pair_key.semi_join(df_suspect[KEY_COLUMN], df[KEY_COLUMN])]
+    keys = reference_comparison.index.intersection(filtered_suspects[KEY_COLUMN])
+    if len(keys) == 0:
+        fig = go.Figure()
+        fig.add_annotation(text="Nenhum suspeito com referência externa correspondente.",
+                           showarrow=False, font=dict(size=14))
+        fig.update_layout(xaxis_visible=False, yaxis_visible=False, height=300)
+        return fig
+
+    comparison = reference_comparison.loc[keys].sort_values('Diferenca_Percent', ascending=False)
+    shown = comparison.head(COMPARISON_LIMIT)
+    skus, centros = pair_key.decode(shown.index)
+    labels = [f'{sku}/{centro} - {short_description(key, 20)}' for sku, centro, key in zip(skus, centros, shown.index)]
+    quotes = [f"{desc} ({source}, similaridade {score:.2f})"
+              for desc, source, score in zip(shown['Descrição'], shown['Fonte'].fillna('-'), shown['Similaridade'])]
+
     fig = go.Figure(data=[
-        go.Bar(name='Preço Médio Interno', x=df_comp['SKU'] + ' - ' + df_comp['Descrição'].str[:20], 
-               y=df_comp['Preço Médio Interno (R$)'], 
-               text=df_comp['Preço Médio Interno (R$)'].apply(lambda x: f'R$ {x:,.2f}'), 
-               textposition='auto'),
-        go.Bar(name='Referência Externa', x=df_comp['SKU'] + ' - ' + df_comp['Descrição'].str[:20], 
-               y=df_comp['Referência Externa (R$)'], 
-               text=df_comp['Referência Externa (R$)'].apply(lambda x: f'R$ {x:,.2f}'), 
-               textposition='auto')
+        go.Bar(name='Preço Mediano Interno', x=labels, y=shown['Preco_Interno_Kg'],
+               text=[f'R$ {x:,.2f}/kg' for x in shown['Preco_Interno_Kg']], textposition='auto',
+               customdata=shown['Diferenca_Percent'],
+               hovertemplate='%{x}<br>R$ %{y:,.2f}/kg (%{customdata:+.0f}%)<extra></extra>'),
+        go.Bar(name='Referência Externa', x=labels, y=shown['Preco_Por_Kg'],
+               text=[f'R$ {x:,.2f}/kg' for x in shown['Preco_Por_Kg']], textposition='auto',
+               customdata=quotes,
+               hovertemplate='%{customdata}<br>R$ %{y:,.2f}/kg<extra></extra>')
     ])
-    
+
+    if len(comparison) > len(shown):
+        title = (f'Comparação por kg: {len(shown)} maiores diferenças entre '
+                 f'{len(comparison)} suspeitos com referência externa')
+    else:
+        title = f'Comparação por kg: {len(comparison)} suspeitos com referência externa'
     fig.update_layout(
         barmode='group',
-        title='Comparação: Preço Médio Interno vs. Referência Externa',
-        xaxis_title='SKU - Descrição',
-        yaxis_title='Preço (R$)',
+        title=title,
+        xaxis_title='SKU/Centro - Descrição',
+        yaxis_title='Preço (R$/kg)',
         legend_title='Fonte do Preço',
-        height=500
+        height=500,
+        margin=dict(b=150)
     )
-    
-    # Add annotations for observations
-    annotations = []
-    for i, obs in enumerate(df_comp['Observação']):
-        annotations.append(dict(
-            x=df_comp['SKU'][i] + ' - ' + df_comp['Descrição'][i][:20],
-            y=-30,  # Position below x-axis
-            xref='x',
-            yref='y',
-            text=f"Obs: {obs}",
-            showarrow=False,
-            font=dict(size=10),
-            align='center'
-        ))
-    
-    fig.update_layout(annotations=annotations, margin=dict(b=150))
-    
+
     return fig
 
 # Update Outlier Details
@@ -531,16 +815,12 @@ def update_comparison_chart(data):
     Input('filtered-data', 'data')
 )
 def update_outlier_details(data):
-    if not data:
+    df = get_filtered(data)
+    if df is None or df.empty:
         return html.Div("Nenhum dado disponível com os filtros atuais.")
     
-    df = pd.DataFrame(data)
-    
-    # Get unique SKU/Centro combinations in filtered data
-    filtered_sku_centro = set(zip(df['SKU'], df['Centro']))
-    
     # Filter suspect dataframe to only show those in the filtered data
-    filtered_suspects = df_suspect[df_suspect.apply(lambda row: (row['SKU'], row['Centro']) in filtered_sku_centro, axis=1)]
+    filtered_suspects = df_suspect[pair_key.semi_join(df_suspect[KEY_COLUMN], df[KEY_COLUMN])]
     
     if len(filtered_suspects) == 0:
         return html.Div("Nenhum SKU/Centro suspeito encontrado com os filtros atuais.")
@@ -550,24 +830,30 @@ def update_outlier_details(data):
     
     outlier_details = []
     
+    # Flags precomputed over the whole base by the anomaly engine (load_data)
+    top_rows = df[pair_key.semi_join(df[KEY_COLUMN], top_suspects[KEY_COLUMN])]
+    keys = top_rows[KEY_COLUMN].to_numpy()
+    is_outlier = top_rows['anomaly_flags'].to_numpy() > 0
+    # Quartiles and fences of the box plots, already computed for this result
+    stats = get_box_stats(data)
+    outside_box = outlier_mask(stats, keys, top_rows['Preco_Unitario'])
+    
     for _, suspect in top_suspects.iterrows():
         sku, centro = suspect['SKU'], suspect['Centro']
         
         # Get data for this SKU/Centro
-        sku_data = df[(df['SKU'] == sku) & (df['Centro'] == centro)]
+        in_group = keys == suspect[KEY_COLUMN]
         
-        if len(sku_data) == 0:
+        if not in_group.any():
             continue
         
-        # Calculate IQR for outlier detection
-        Q1 = sku_data['Preco_Unitario'].quantile(0.25)
-        Q3 = sku_data['Preco_Unitario'].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        # Identify outliers
-        outliers = sku_data[(sku_data['Preco_Unitario'] < lower_bound) | (sku_data['Preco_Unitario'] > upper_bound)]
+        # Identify outliers, strongest first
+        outliers = top_rows[in_group & is_outlier].assign(
+            outside_box=np.where(outside_box[in_group & is_outlier], 'Sim', 'Não'))
+        outliers = outliers.sort_values('anomaly_score', ascending=False)
+        outliers = outliers.assign(anomaly_score=outliers['anomaly_score'].round(2),
+                                   detectors=flagged_by(outliers))
+        box = stats.loc[suspect[KEY_COLUMN]]
         
         if len(outliers) == 0:
             continue
@@ -575,7 +861,9 @@ def update_outlier_details(data):
         # Create a section for this SKU/Centro
         section = html.Div([
             html.H5(f"SKU: {sku} | Centro: {centro} | {suspect['Descrição'][:30]}..."),
-            html.P(f"Preço Médio: R$ {suspect['Preco_Medio']:.2f} | Outliers: {len(outliers)} de {len(sku_data)} transações"),
+            html.P(f"Preço Médio: R$ {suspect['Preco_Medio']:.2f} | Anomalias: {len(outliers)} de {int(in_group.sum())} transações"),
+            html.P(f"Q1: R$ {box['q1']:.2f} | Mediana: R$ {box['median']:.2f} | Q3: R$ {box['q3']:.2f} | "
+                   f"Limites IQR: R$ {box['fence_low']:.2f} a R$ {box['fence_high']:.2f}"),
             
             # Table with outlier details
             dash_table.DataTable(
@@ -585,9 +873,14 @@ def update_outlier_details(data):
                     {"name": "Fornecedor", "id": "Fornecedor"},
                     {"name": "Quantidade", "id": "Quantidade"},
                     {"name": "Valor Líquido", "id": "Valor Liquido"},
-                    {"name": "Preço Unitário", "id": "Preco_Unitario"}
+                    {"name": "Preço Unitário", "id": "Preco_Unitario"},
+                    {"name": "Preço/kg", "id": "Preco_Por_Kg"},
+                    {"name": "Score", "id": "anomaly_score"},
+                    {"name": "Detectores", "id": "detectors"},
+                    {"name": "Fora do box plot", "id": "outside_box"}
                 ],
-                data=outliers[['Nº Pedido', 'Data Doc.', 'Fornecedor', 'Quantidade', 'Valor Liquido', 'Preco_Unitario']].to_dict('records'),
+                data=outliers[['Nº Pedido', 'Data Doc.', 'Fornecedor', 'Quantidade', 'Valor Liquido', 'Preco_Unitario',
+                               'Preco_Por_Kg', 'anomaly_score', 'detectors', 'outside_box']].round({'Preco_Por_Kg': 2}).to_dict('records'),
                 style_table={'overflowX': 'auto'},
                 style_cell={
                     'textAlign': 'left',
@@ -614,93 +907,142 @@ def update_outlier_details(data):
         outlier_details.append(section)
     
     if not outlier_details:
-        return html.Div("Nenhum outlier encontrado nos SKUs/Centros filtrados.")
+        return html.Div("Nenhuma anomalia encontrada nos SKUs/Centros filtrados.")
     
     return html.Div(outlier_details)
 
+# Back to the first page of the detailed table when the filters change
+@app.callback(
+    Output('filtered-data-table', 'page_current'),
+    Input('filtered-data', 'data'),
+    Input('filtered-data-table', 'filter_query')
+)
+def reset_table_page(data, filter_query):
+    return 0
+
 # Update Filtered Data Table
 @app.callback(
-    Output('filtered-data-container', 'children'),
-    Input('filtered-data', 'data')
+    [Output('filtered-data-table', 'data'),
+     Output('filtered-data-table', 'page_count'),
+     Output('filtered-data-note', 'children')],
+    Input('filtered-data', 'data'),
+    Input('filtered-data-table', 'page_current'),
+    Input('filtered-data-table', 'page_size'),
+    Input('filtered-data-table', 'sort_by'),
+    Input('filtered-data-table', 'filter_query')
 )
-def update_filtered_data_table(data):
-    if not data:
-        return html.Div("Nenhum dado disponível com os filtros atuais.")
+def update_filtered_data_table(data, page_current, page_size, sort_by, filter_query):
+    df = get_filtered(data)
+    if df is None or df.empty:
+        return [], 1, "Nenhum dado disponível com os filtros atuais."
     
-    df = pd.DataFrame(data)
+    # The table's own filter/sort resolve to row positions once per result;
+    # each page then only takes its rows
+    positions = None
+    if filter_query or sort_by:
+        view_key = f"{data['key']}:table:{table_view.view_key(filter_query, sort_by)}"
+        positions = result_store.get(view_key)
+        if positions is None:
+            with metrics.timed('table_view'):
+                positions = table_view.view_positions(df, filter_query, sort_by)
+            if positions is not None:
+                result_store.put(view_key, positions)
     
-    # Limit to 1000 rows for performance
-    if len(df) > 1000:
-        df = df.sample(1000)
-        note = html.Div("Nota: Mostrando uma amostra aleatória de 1000 linhas para melhor performance.", 
-                       className="text-muted mb-2")
+    rows, page_count, total = table_view.page(df, positions, page_current, page_size)
+    if total == len(df):
+        note = f"Mostrando {len(df)} transações."
     else:
-        note = html.Div(f"Mostrando {len(df)} transações.", className="text-muted mb-2")
-    
-    # Select columns to display
-    display_cols = ['Nº Pedido', 'Item', 'Data Doc.', 'SKU', 'Descrição', 'UN', 'Centro', 
-                   'Quantidade', 'Valor Liquido', 'Preco_Unitario', 'Fornecedor']
-    
-    table = dash_table.DataTable(
-        columns=[{"name": col, "id": col} for col in display_cols],
-        data=df[display_cols].to_dict('records'),
-        style_table={'overflowX': 'auto'},
-        style_cell={
-            'textAlign': 'left',
-            'padding': '5px',
-            'minWidth': '100px', 'width': '150px', 'maxWidth': '300px',
-            'whiteSpace': 'normal',
-            'height': 'auto'
-        },
-        style_header={
-            'backgroundColor': 'rgb(230, 230, 230)',
-            'fontWeight': 'bold'
-        },
-        style_data_conditional=[
-            {
-                'if': {'row_index': 'odd'},
-                'backgroundColor': 'rgb(248, 248, 248)'
-            }
-        ],
-        sort_action='native',
-        filter_action='native',
-        page_size=20
-    )
+        note = f"Mostrando {total} de {len(df)} transações."
     
-    return html.Div([note, table])
+    return rows[display_cols].to_dict('records'), page_count, note
 
-# Export CSV callback
+# Export links carry the filter state, so any worker can rebuild the result
 @app.callback(
-    Output('export-notification', 'style'),
-    Input('export-csv', 'n_clicks'),
-    State('filtered-data', 'data'),
-    prevent_initial_call=True
+    [Output('export-csv', 'href'),
+     Output('export-parquet', 'href')],
+    Input('filtered-data', 'data')
 )
-def export_csv(n_clicks, data):
-    if not data:
-        return {'display': 'none'}
-    
-    df = pd.DataFrame(data)
+def update_export_links(data):
+    query = f"?{urlencode({'state': json.dumps(normalize_state(data['state']))})}" if data else ''
+    return f'/export/csv{query}', f'/export/parquet{query}'
+
+# Timing, rows and payload sizes of every callback and route (see metrics.py)
+server.before_request(metrics.start_request)
+server.after_request(metrics.record_response)
+server.teardown_request(metrics.finish_request)
+
+@server.route('/metrics')
+def metrics_endpoint():
+    """Histograms of this worker in Prometheus text format."""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@server.route('/ready')
+def ready():
+    """Readiness probe for the load balancer: 200 once the base is loaded."""
+    if not data_ready.is_set():
+        return {'status': 'loading'}, 503
+    if data_error is not None:
+        return {'status': 'error', 'error': str(data_error)}, 503
+    return {'status': 'ready', 'rows': len(df_orig)}, 200
+
+@server.route('/export/<fmt>')
+def export_download(fmt):
+    """Stream the filter result in chunks; nothing is written on the server."""
+    if fmt not in export.FORMATS:
+        abort(404)
+    if not data_available():
+        abort(503)
+    try:
+        state = check_state(json.loads(request.args.get('state', '{}')), filter_index.dimensions)
+        state = normalize_state(state)
+    except (TypeError, ValueError):
+        abort(400)
     
-    # Export to CSV
-    export_path = os.path.join('/home/ubuntu', 'exported_data.csv')
-    df.to_csv(export_path, index=False, encoding='utf-8-sig')
+    # A cached result is streamed as is; otherwise rows are taken from the
+    # base chunk by chunk, without materializing the whole result
+    df = result_store.get(state_key(state))
+    if df is not None:
+        chunks = export.iter_chunks(df, columns=export_columns)
+    else:
+        chunks = export.iter_chunks(df_orig, filter_positions(state), columns=export_columns)
     
-    return {'display': 'block'}
+    return Response(
+        export.stream(fmt, chunks),
+        mimetype=export.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename=dados_filtrados.{fmt}'}
+    )
 
-# Store filtered data
-app.clientside_callback(
-    """
-    function(data) {
-        return data;
-    }
-    """,
-    Output('filtered-data', 'data'),
-    Input('filtered-data', 'data')
-)
+# Store holding only the key/filter state of the current result
+app.layout.children.append(dcc.Store(id='filtered-data'))
+
+def warm_figure_cache():
+    """Build the figures of the most common views (whole base, last 90 days) up front."""
+    states = [{'only_suspects': 'no'},
+              {'start_date': date_max - pd.Timedelta(days=89), 'end_date': date_max, 'only_suspects': 'no'}]
+    for state in states:
+        state = normalize_state(state)
+        data = {'key': state_key(state), 'state': state}
+        update_centro_spending(data)
+        update_price_distribution(data)
+        update_price_time_chart(data, AUTO)
+        update_comparison_chart(data)
+
+def start_data_loader():
+    threading.Thread(target=load_data, name='data-loader', daemon=True).start()
+
+def restart_data_loader_in_child():
+    # A fork does not carry the loader thread over: a worker forked before
+    # the load finished starts its own (the Event may be held by the dead thread)
+    global data_ready
+    if not data_ready.is_set():
+        data_ready = threading.Event()
+        start_data_loader()
 
-# Add a hidden div to store filtered data
-app.layout.children.append(html.Div(id='filtered-data', style={'display': 'none'}))
+if os.environ.get('DATA_LOAD', 'background') == 'eager':
+    load_data()
+else:
+    os.register_at_fork(after_in_child=restart_data_loader_in_child)
+    start_data_loader()
 
 # --- Run the app ---
 if __name__ == '__main__':
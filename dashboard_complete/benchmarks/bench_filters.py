@@ -0,0 +1,99 @@
+"""Compares FilterIndex.select + take with the chained ``.isin()`` scans it replaces.
+
+Usage:
+    python benchmarks/bench_filters.py [--rows 5000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filter_index import FilterIndex  # noqa: E402
+
+DIMENSIONS = {
+    'centros': 'Centro',
+    'skus': 'SKU',
+    'fornecedores': 'Fornecedor',
+    'grupos': 'Grp. Mercadoria',
+    'desc_grupos': 'Descrição.1'
+}
+
+
+def make_base(n, seed=0):
+    rng = np.random.default_rng(seed)
+    skus = np.array([f'00-{i:03d}.{i * 7 % 1000:03d}' for i in range(20000)])
+    return pd.DataFrame({
+        'Centro': pd.Categorical(rng.choice([f'CD{i:02d}' for i in range(40)], n)),
+        'SKU': pd.Categorical(skus[rng.zipf(1.3, n) % len(skus)]),
+        'Fornecedor': pd.Categorical(rng.choice([f'FORNECEDOR {i}' for i in range(2000)], n)),
+        'Grp. Mercadoria': rng.choice([f'G{i}' for i in range(60)], n),
+        'Descrição.1': rng.choice([f'GRUPO {i}' for i in range(60)], n),
+        'Data Doc.': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1800, n), unit='D'),
+        'Preco_Unitario': rng.lognormal(3, 0.4, n)
+    })
+
+
+def scan_filter(df, state):
+    filtered_df = df.copy()
+    for name, column in DIMENSIONS.items():
+        if state.get(name):
+            filtered_df = filtered_df[filtered_df[column].isin(state[name])]
+    if state.get('start_date') and state.get('end_date'):
+        filtered_df = filtered_df[(filtered_df['Data Doc.'] >= state['start_date']) &
+                                  (filtered_df['Data Doc.'] <= state['end_date'])]
+    return filtered_df
+
+
+def index_filter(index, state):
+    positions = index.select({name: state.get(name) for name in DIMENSIONS},
+                             state.get('start_date'), state.get('end_date'))
+    return index.take(positions)
+
+
+SCENARIOS = {
+    'one Centro': {'centros': ['CD01']},
+    'Centro + 5 SKUs': {'centros': ['CD01', 'CD02'], 'skus': ['00-001.007', '00-002.014', '00-003.021',
+                                                            '00-004.028', '00-005.035']},
+    'Fornecedor + 90 days': {'fornecedores': ['FORNECEDOR 7'], 'start_date': '2023-01-01',
+                             'end_date': '2023-03-31'},
+    'last 90 days': {'start_date': '2024-10-01', 'end_date': '2024-12-31'},
+    'Grupo + Centro + year': {'grupos': ['G3'], 'centros': ['CD05'], 'start_date': '2022-01-01',
+                              'end_date': '2022-12-31'},
+}
+
+
+def best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    df = make_base(args.rows)
+    start = time.perf_counter()
+    index = FilterIndex(df, DIMENSIONS, date_column='Data Doc.')
+    print(f'{args.rows} rows, index built in {time.perf_counter() - start:.2f}s\n')
+
+    print(f"{'scenario':<24} {'rows':>9} {'scan (ms)':>10} {'index (ms)':>11} {'speedup':>8}")
+    for name, state in SCENARIOS.items():
+        t_scan, expected = best_of(lambda: scan_filter(df, state))
+        t_index, result = best_of(lambda: index_filter(index, state))
+        assert len(result) == len(expected)
+        print(f'{name:<24} {len(result):>9} {t_scan * 1000:>10.1f} {t_index * 1000:>11.1f} '
+              f'{t_scan / t_index:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Scaling of the partitioned per-(SKU, Centro) IQR fences with the number of worker processes.
+
+Usage:
+    python benchmarks/bench_partitioned_iqr.py [--rows 5000000] [--groups 200000] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from partitioned import iqr_fences, run_partitioned  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--groups', type=int, default=200_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    keys = rng.zipf(1.3, args.rows) % args.groups
+    prices = rng.lognormal(3, 0.5, args.rows)
+    print(f'{args.rows} rows, {len(np.unique(keys))} groups, {os.cpu_count()} CPUs\n')
+
+    print(f"{'workers':>7} {'time (s)':>10} {'speedup':>8}")
+    baseline = reference = None
+    for workers in args.workers:
+        # First call warms the pool up; it is not part of the timing
+        fences = run_partitioned(iqr_fences, keys, {'price': prices}, {'lower': 'f8', 'upper': 'f8'}, workers)
+        if reference is None:
+            reference = fences
+        assert np.allclose(fences['lower'], reference['lower'], equal_nan=True)
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run_partitioned(iqr_fences, keys, {'price': prices}, {'lower': 'f8', 'upper': 'f8'}, workers)
+            times.append(time.perf_counter() - start)
+        best = min(times)
+        baseline = baseline or best
+        print(f'{workers:>7} {best:>10.2f} {baseline / best:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Reference matching over synthetic descriptions: batched sparse product vs. one query at a time.
+
+The per-query baseline matches each SKU description separately, like a
+lookup per suspect would, and is only timed on ``--loop-queries`` queries
+and extrapolated to all of them.
+
+Usage:
+    python benchmarks/bench_reference_match.py [--quotes 20000] [--skus 50000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reference_store import ReferenceStore  # noqa: E402
+
+CONSONANTS = list('BCDFGHJLMNPRSTVXZ')
+VOWELS = list('AEIOU')
+SIZES = ['200G', '300G', '400G', '500G', '600G', '800G', '1KG', '2KG', '4KG', '5KG']
+
+
+def make_words(n, rng):
+    # Catalogs have thousands of distinct words; a handful would make every pair of descriptions similar
+    syllables = [c + v for c in CONSONANTS for v in VOWELS]
+    return np.array([''.join(rng.choice(syllables, rng.integers(2, 5))) for _ in range(n)])
+
+
+def make_descriptions(n, words, rng, suffix):
+    words = rng.choice(words, (n, 4))
+    sizes = rng.choice(SIZES, n)
+    return pd.Series([' '.join(row) + f' {size}{suffix}' for row, size in zip(words, sizes)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quotes', type=int, default=20_000)
+    parser.add_argument('--skus', type=int, default=50_000)
+    parser.add_argument('--words', type=int, default=5000)
+    parser.add_argument('--loop-queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    words = make_words(args.words, rng)
+    quotes = pd.DataFrame({'Descrição': make_descriptions(args.quotes, words, rng, ''),
+                           'Preço': rng.uniform(5, 80, args.quotes), 'Fonte': 'SINTETICO'})
+    # Half the SKUs are quoted products, written with one word less and the box size
+    quoted = quotes['Descrição'].sample(args.skus // 2, replace=True, random_state=0).str.split()
+    skus = pd.concat([
+        quoted.map(lambda tokens: ' '.join(tokens[1:]) + ' CX 12KG UNI'),
+        make_descriptions(args.skus - len(quoted), words, rng, ' CX 12KG UNI')
+    ], ignore_index=True)
+
+    start = time.perf_counter()
+    store = ReferenceStore(quotes)
+    print(f'{args.quotes} quotes, {len(store.vocabulary)} n-grams: index built in {time.perf_counter() - start:.2f} s')
+
+    start = time.perf_counter()
+    best = store.best_matches(skus)
+    batched = time.perf_counter() - start
+    print(f'{args.skus} SKU descriptions: {batched:.2f} s batched, {len(best)} matched '
+          f'(median similarity {best["Similaridade"].median():.2f})')
+
+    sample = skus.head(args.loop_queries)
+    start = time.perf_counter()
+    for description in sample:
+        store.match([description], top_k=1)
+    per_query = (time.perf_counter() - start) / len(sample)
+    print(f'one query at a time: {per_query * 1000:.1f} ms/query, '
+          f'~{per_query * args.skus:.0f} s for all {args.skus} descriptions')
+
+
+if __name__ == '__main__':
+    main()
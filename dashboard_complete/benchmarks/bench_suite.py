@@ -0,0 +1,255 @@
+"""Reproducible benchmark suite: synthetic data at several scales, timed end to end.
+
+For each scale, data is generated with ``synthetic_data`` (fixed seed) and
+the suite times:
+- load, cold (parse, prepare, write the Arrow cache) and warm (memory-mapped cache);
+- the dashboard's ``load_data``;
+- ``filter_data`` and every figure/table callback for a fixed set of filter
+  scenarios, with the figure cache bypassed, plus the JSON size of each output;
+- the anomaly engine, with its recall of the planted overpricing;
+- the Django audit of the same lines (``executar_auditoria``, as for an upload,
+  on a temporary SQLite database), when Django is installed.
+
+Each scale runs in its own process, so the peak RSS reported is its own.
+Results go to a JSON file keyed by scale; ``--compare`` prints every timing
+against an earlier results file.
+
+Usage:
+    python benchmarks/bench_suite.py [--rows 10000 1000000 10000000] [--output bench_suite.json] [--compare previous.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DJANGO_DIR = os.path.join(os.path.dirname(DASHBOARD_DIR), 'Django')
+sys.path.insert(0, DASHBOARD_DIR)
+
+from anomaly_engine import detect  # noqa: E402
+from ingest import load_base  # noqa: E402
+from synthetic_data import audit_frame, generate_base, market_table, suspect_table, write_base  # noqa: E402
+
+NO_FILTERS = {'centros': None, 'skus': None, 'fornecedores': None, 'grupos': None, 'desc_grupos': None,
+              'start_date': None, 'end_date': None, 'only_suspects': 'no'}
+
+# Callbacks fed by the filtered-data store: name -> extra arguments
+CALLBACKS = {
+    'update_centro_spending': (),
+    'update_price_distribution': (),
+    'update_price_time_chart': ('auto',),
+    'update_suspect_table': (),
+    'update_comparison_chart': (),
+    'update_outlier_details': (),
+    'update_filtered_data_table': (0, 20, [], ''),
+}
+
+
+class Timer(dict):
+    @contextmanager
+    def __call__(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self[name] = round(time.perf_counter() - start, 4)
+
+
+def filter_scenarios(app):
+    df = app.df_orig
+    last_day = app.date_max.normalize()
+    return {
+        'all': {},
+        'one_centro': {'centros': [df['Centro'].value_counts().index[0]]},
+        'top_sku': {'skus': [df['SKU'].value_counts().index[0]]},
+        'suspects': {'only_suspects': 'yes'},
+        'last_90_days': {'start_date': (last_day - pd.Timedelta(days=89)).date().isoformat(),
+                         'end_date': last_day.date().isoformat()},
+    }
+
+
+def run_dashboard(workdir, timer, counts, quality, truth):
+    os.environ.update({
+        'BASE_FILE': os.path.join(workdir, 'base.parquet'),
+        'SUSPECT_FILE': os.path.join(workdir, 'suspeitos.csv'),
+        'DATA_LOAD': 'eager',
+        'FIGURE_CACHE_WARM': '0',
+    })
+    with timer('app_load_data'):
+        import app
+    from plotly.io.json import to_json_plotly
+
+    with timer('detect'):
+        anomalies = detect(app.df_orig, price_column='Preco_Comparavel')
+    flagged = anomalies['anomaly_flags'].to_numpy() > 0
+    planted = truth['planted'].to_numpy()
+    quality['detect_recall'] = round(float(flagged[planted].mean()), 4) if planted.any() else None
+    quality['detect_false_positive_rate'] = round(float(flagged[~planted].mean()), 4)
+
+    for scenario, state in filter_scenarios(app).items():
+        with timer(f'filter/{scenario}'):
+            data = app.filter_data(1, **{**NO_FILTERS, **state})
+        counts[f'rows/{scenario}'] = len(app.get_filtered(data))
+        for name, args in CALLBACKS.items():
+            # The undecorated build, so every scenario measures the work and not the figure cache
+            callback = getattr(getattr(app, name), '__wrapped__', getattr(app, name))
+            with timer(f'callback/{scenario}/{name}'):
+                output = callback(data, *args)
+            counts[f'bytes/{scenario}/{name}'] = len(to_json_plotly(output))
+
+
+def run_django_audit(workdir, timer, counts, quality, truth):
+    try:
+        import django
+        from django.conf import settings
+        from django.core.management import call_command
+    except ImportError as error:
+        print(f'skipping the Django audit: {error}', file=sys.stderr)
+        return
+
+    sys.path.insert(0, DJANGO_DIR)
+    settings.configure(
+        INSTALLED_APPS=['auditoria_app'],
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3',
+                               'NAME': os.path.join(workdir, 'auditoria.sqlite3')}},
+        USE_TZ=True,
+        AUDITORIA_TABELA_PRECOS=os.path.join(workdir, 'precos_mercado.csv'),
+        AUDITORIA_TABELA_IMPOSTOS=os.path.join(workdir, 'impostos.csv'),
+    )
+    django.setup()
+    call_command('migrate', verbosity=0)
+    from auditoria_app.models import Alert, Upload
+    from auditoria_app.tarefas import executar_auditoria
+
+    upload = Upload.objects.create(nome_arquivo='auditoria.csv')
+    with timer('django_audit'):
+        executar_auditoria(upload.pk, os.path.join(workdir, 'auditoria.csv'))
+    upload.refresh_from_db()
+    if upload.estado != Upload.CONCLUIDO:
+        print(f'Django audit failed: {upload.erro}', file=sys.stderr)
+        return
+    counts['django_alerts'] = upload.total_alertas
+    flagged = np.fromiter(Alert.objects.filter(upload=upload).values_list('linha__numero_linha', flat=True),
+                          dtype=np.int64)
+    planted = np.flatnonzero(truth['planted'].to_numpy())
+    quality['django_recall'] = round(float(np.isin(planted, flagged).mean()), 4) if len(planted) else None
+
+
+def run_scale(rows, seed, workdir):
+    """Everything timed at one scale; runs in a child process."""
+    timer, counts, quality = Timer(), {'rows': rows}, {}
+    with timer('generate'):
+        base, truth = generate_base(rows, seed=seed)
+    with timer('write'):
+        write_base(base, os.path.join(workdir, 'base.parquet'))
+        audit_frame(base).to_csv(os.path.join(workdir, 'auditoria.csv'), index=False)
+        market_table(base, truth).to_csv(os.path.join(workdir, 'precos_mercado.csv'), index=False)
+    with timer('suspects'):
+        suspects = suspect_table(base)
+    suspects.to_csv(os.path.join(workdir, 'suspeitos.csv'), index=False)
+    counts['suspects'] = len(suspects)
+    counts['planted'] = int(truth['planted'].sum())
+    del base, suspects
+
+    with timer('load_cold'):
+        load_base(os.path.join(workdir, 'base.parquet'))
+    with timer('load_warm'):
+        load_base(os.path.join(workdir, 'base.parquet'))
+
+    run_dashboard(workdir, timer, counts, quality, truth)
+    run_django_audit(workdir, timer, counts, quality, truth)
+    return {
+        'timings': dict(timer),
+        'counts': counts,
+        'quality': quality,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def environment(seed):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=DASHBOARD_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'seed': seed,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def compare(previous, current):
+    print(f"\n{'scale':>9} {'timing':<52} {'before (s)':>11} {'now (s)':>9} {'ratio':>7}")
+    for scale, result in current['scales'].items():
+        before = previous.get('scales', {}).get(scale)
+        if before is None:
+            continue
+        for name, seconds in result['timings'].items():
+            old = before['timings'].get(name)
+            if old:
+                print(f'{scale:>9} {name:<52} {old:>11.3f} {seconds:>9.3f} {seconds / old:>6.2f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_suite.json')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--keep-data', action='store_true', help='Keep the generated files')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_scale(args.child, args.seed, args.workdir)))
+        return
+
+    results = {'environment': environment(args.seed), 'scales': {}}
+    for rows in args.rows:
+        workdir = tempfile.mkdtemp(prefix=f'bench_suite_{rows}_')
+        print(f'{rows} rows ({workdir})', file=sys.stderr)
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', str(rows),
+                                '--seed', str(args.seed), '--workdir', workdir],
+                               stdout=subprocess.PIPE, text=True)
+        if child.returncode == 0:
+            results['scales'][str(rows)] = json.loads(child.stdout.splitlines()[-1])
+        else:
+            results['scales'][str(rows)] = {'error': f'exit code {child.returncode}'}
+        if not args.keep_data:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        scale = results['scales'][str(rows)]
+        if 'timings' in scale:
+            for name, seconds in scale['timings'].items():
+                print(f'{rows:>9} {name:<52} {seconds:>9.3f} s', file=sys.stderr)
+            print(f"{rows:>9} quality {scale['quality']}, peak RSS {scale['peak_rss_mb']} MB", file=sys.stderr)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f'results written to {args.output}', file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
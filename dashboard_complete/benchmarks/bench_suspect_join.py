@@ -0,0 +1,79 @@
+"""Compares the (SKU, Centro) integer-key semi-join with the tuple-list membership test.
+
+Usage:
+    python benchmarks/bench_suspect_join.py [--rows 100000] [--suspects 10 100 1000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pair_key import KEY_COLUMN, PairKey  # noqa: E402
+
+
+def make_base(n, n_skus=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    skus = np.array([f'00-{i:06d}' for i in range(n_skus)])
+    return pd.DataFrame({
+        'SKU': pd.Categorical(skus[rng.zipf(1.3, n) % n_skus]),
+        'Centro': pd.Categorical(rng.choice([f'CD{i:02d}' for i in range(40)], n)),
+    })
+
+
+def make_suspects(df, n, seed=1):
+    pairs = df[['SKU', 'Centro']].astype(str).drop_duplicates()
+    return pairs.sample(min(n, len(pairs)), random_state=seed).reset_index(drop=True)
+
+
+def tuple_filter(df, df_suspect):
+    suspect_skus_centros = [(row['SKU'], row['Centro']) for _, row in df_suspect.iterrows()]
+    return df[df.apply(lambda row: (row['SKU'], row['Centro']) in suspect_skus_centros, axis=1)]
+
+
+def tuple_suspects_in(df, df_suspect):
+    filtered_sku_centro = set(zip(df['SKU'], df['Centro']))
+    return df_suspect[df_suspect.apply(lambda row: (row['SKU'], row['Centro']) in filtered_sku_centro, axis=1)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--suspects', type=int, nargs='+', default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    df = make_base(args.rows)
+    pair_key = PairKey.from_frame(df)
+    df[KEY_COLUMN] = pair_key.encode(df['SKU'], df['Centro'])
+
+    print(f'{args.rows} rows')
+    print(f"{'suspects':>9} | {'only-suspects filter (s)':>26} | {'suspects in result (s)':>24}")
+    print(f"{'':>9} | {'tuples':>8} {'key':>8} {'speedup':>8} | {'tuples':>7} {'key':>7} {'speedup':>8}")
+    for n in args.suspects:
+        df_suspect = make_suspects(df, n)
+        t_old, old = timed(lambda: tuple_filter(df, df_suspect))
+        t_new, new = timed(lambda: df[pair_key.semi_join(
+            df[KEY_COLUMN], pair_key.encode(df_suspect['SKU'], df_suspect['Centro']))])
+        assert len(old) == len(new)
+
+        df_suspect[KEY_COLUMN] = pair_key.encode(df_suspect['SKU'], df_suspect['Centro'])
+        t_old2, old2 = timed(lambda: tuple_suspects_in(df, df_suspect))
+        t_new2, new2 = timed(lambda: df_suspect[pair_key.semi_join(df_suspect[KEY_COLUMN], df[KEY_COLUMN])])
+        assert len(old2) == len(new2)
+
+        print(f'{n:>9} | {t_old:>8.3f} {t_new:>8.4f} {t_old / t_new:>7.0f}x | '
+              f'{t_old2:>7.3f} {t_new2:>7.4f} {t_old2 / t_new2:>7.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Price time series payload and build time as the purchase history grows.
+
+Builds the series of one SKU/Centro pair with ``years`` of history, once with
+every purchase and once at the resolution/point budget used by the chart.
+
+Usage:
+    python benchmarks/bench_time_series.py [--per-day 50] [--years 1 5 10 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pair_key import KEY_COLUMN  # noqa: E402
+from time_series import RAW, aggregate_rows, downsample, pick_resolution  # noqa: E402
+
+
+def make_history(years, per_day, seed=0):
+    rng = np.random.default_rng(seed)
+    n = int(years * 365 * per_day)
+    dates = pd.Timestamp('2000-01-01') + pd.to_timedelta(np.sort(rng.integers(0, years * 365, n)), unit='D')
+    trend = np.linspace(50, 80, n)
+    return pd.DataFrame({
+        KEY_COLUMN: np.zeros(n, dtype=np.int64),
+        'Data Doc.': dates,
+        'Preco_Unitario': trend * rng.lognormal(0, 0.1, n),
+    })
+
+
+def payload(x, y):
+    return len(json.dumps({'x': pd.Series(x).astype(str).tolist(), 'y': np.asarray(y).tolist()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--per-day', type=int, default=50)
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 5, 10, 20])
+    args = parser.parse_args()
+
+    print(f"{'years':>5} {'rows':>10} {'raw KB':>9} {'res':>4} {'points':>7} {'chart KB':>9} {'build (ms)':>11}")
+    for years in args.years:
+        rows = make_history(years, args.per_day)
+        raw_kb = payload(rows['Data Doc.'], rows['Preco_Unitario']) / 1024
+
+        start = time.perf_counter()
+        resolution = pick_resolution(rows['Data Doc.'].min(), rows['Data Doc.'].max())
+        series = aggregate_rows(rows, resolution)
+        x, y = downsample(series['period'], series['price_mean'])
+        elapsed = time.perf_counter() - start
+
+        print(f'{years:>5} {len(rows):>10} {raw_kb:>9.0f} {resolution:>4} {len(x):>7} '
+              f'{payload(x, y) / 1024:>9.1f} {elapsed * 1000:>11.1f}')
+
+    # Individual purchases are capped by LTTB as well
+    rows = make_history(args.years[-1], args.per_day)
+    start = time.perf_counter()
+    x, y = downsample(rows['Data Doc.'], rows['Preco_Unitario'])
+    print(f'\n{RAW}: {len(rows)} purchases -> {len(x)} points in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
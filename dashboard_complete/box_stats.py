@@ -0,0 +1,46 @@
+"""Box-plot statistics per SKU/Centro computed on the server.
+
+A single grouped-quantile pass over the filtered rows (partitioned like the
+IQR fences, see ``partitioned.run_partitioned``) gives Q1, median and Q3 per
+pair. Tukey fences, whisker ends and outlier flags are derived from them, so
+a box plot only needs five numbers plus its outlier points instead of every
+price. The outlier details tab reuses the same table for the quartiles and
+fences it shows next to the lines flagged by the anomaly engine
+(``anomaly_engine``, on per-kg prices), and marks which of those lines lie
+outside the box-plot whiskers.
+"""
+import numpy as np
+import pandas as pd
+
+from pair_key import KEY_COLUMN
+from partitioned import quartiles, run_partitioned
+
+
+def box_stats(keys, prices, workers=None):
+    """Per pair key: ``count``, ``q1``, ``median``, ``q3``, the Tukey fences
+    ``fence_low``/``fence_high`` and the whisker ends ``lowerfence``/``upperfence``
+    (most extreme prices inside the fences, as Plotly draws them)."""
+    keys = np.asarray(keys, dtype=np.int64)
+    prices = np.asarray(prices, dtype=float)
+    rows = run_partitioned(quartiles, keys, {'price': prices}, {'q1': 'f8', 'median': 'f8', 'q3': 'f8'}, workers)
+    iqr = rows['q3'] - rows['q1']
+    rows['fence_low'], rows['fence_high'] = rows['q1'] - 1.5 * iqr, rows['q3'] + 1.5 * iqr
+    inside = (prices >= rows['fence_low']) & (prices <= rows['fence_high'])
+    rows['inside'] = np.where(inside, prices, np.nan)
+
+    grouped = pd.DataFrame(rows).groupby(keys, sort=True)
+    stats = grouped[['q1', 'median', 'q3', 'fence_low', 'fence_high']].first()
+    stats['lowerfence'] = grouped['inside'].min()
+    stats['upperfence'] = grouped['inside'].max()
+    stats.insert(0, 'count', grouped.size())
+    stats.index.name = KEY_COLUMN
+    return stats
+
+
+def outlier_mask(stats, keys, prices):
+    """Rows whose price lies outside the Tukey fences of their pair in ``stats``."""
+    position = stats.index.get_indexer(keys)
+    low = stats['fence_low'].to_numpy()[position]
+    high = stats['fence_high'].to_numpy()[position]
+    prices = np.asarray(prices, dtype=float)
+    return (position >= 0) & ((prices < low) | (prices > high))
@@ -0,0 +1,94 @@
+"""Materialized aggregate cube for the overview charts.
+
+One group-by at load time produces, per (SKU, Centro, Fornecedor, month),
+the total spend, the number of lines and the first two moments of the unit
+price. Charts that only need those aggregates are served from a slice of the
+cube; when the filters cannot be expressed on its dimensions (group filters,
+date ranges that cut through a month) the same aggregates are built from the
+filtered rows instead, so callers always receive a cube-shaped frame.
+"""
+import numpy as np
+import pandas as pd
+
+from filter_index import as_dtype, value_dtype
+from pair_key import KEY_COLUMN
+
+MONTH_COLUMN = 'Mes'
+DIMENSION_FILTERS = {'centros': 'Centro', 'skus': 'SKU', 'fornecedores': 'Fornecedor'}
+UNSUPPORTED_FILTERS = ['grupos', 'desc_grupos']
+
+
+def month_of(dates):
+    return pd.Series(dates.to_numpy().astype('datetime64[M]'), index=dates.index)
+
+
+def build_cube(df):
+    keys = [df[KEY_COLUMN], df['Centro'], df['SKU'], df['Fornecedor'],
+            month_of(df['Data Doc.']).rename(MONTH_COLUMN)]
+    price = df['Preco_Unitario']
+    values = pd.DataFrame({
+        'Valor Liquido': df['Valor Liquido'],
+        'count': np.ones(len(df), dtype=np.int64),
+        'price_sum': price,
+        'price_sq_sum': price * price,
+    }, index=df.index)
+    cube = values.groupby(keys, observed=True, sort=False, dropna=False).sum()
+    return cube.reset_index()
+
+
+class AggregateCube:
+    def __init__(self, df):
+        self.cube = build_cube(df)
+        # Date span of each month actually present in the base, used to decide
+        # whether a date range selects whole months only
+        months = month_of(df['Data Doc.'])
+        spans = df['Data Doc.'].groupby(months).agg(['min', 'max'])
+        self._month_min = spans['min'].to_numpy()
+        self._month_max = spans['max'].to_numpy()
+        self._months = spans.index.to_numpy()
+
+    def _month_mask(self, start_date, end_date):
+        """Months selected by the range, or ``None`` if it splits any month."""
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        inside = (self._month_min >= start) & (self._month_max <= end)
+        outside = (self._month_max < start) | (self._month_min > end)
+        if not np.all(inside | outside):
+            return None
+        return self._months[inside]
+
+    def slice(self, state, suspect_keys=None):
+        """Cube rows matching ``state``, or ``None`` if the cube cannot answer it.
+
+        ``suspect_keys`` is the ``pair_key.KeySet`` of the suspect pairs.
+        """
+        if any(state.get(name) for name in UNSUPPORTED_FILTERS):
+            return None
+
+        cube = self.cube
+        mask = np.ones(len(cube), dtype=bool)
+        for name, column in DIMENSION_FILTERS.items():
+            if state.get(name):
+                # Same value conversion as the filter index, so both agree on numeric codes
+                values = as_dtype(state[name], value_dtype(cube[column]))
+                mask &= cube[column].isin(values).to_numpy()
+
+        if state.get('start_date') and state.get('end_date'):
+            months = self._month_mask(state['start_date'], state['end_date'])
+            if months is None:
+                return None
+            mask &= cube[MONTH_COLUMN].isin(months).to_numpy()
+
+        if state.get('only_suspects') == 'yes' and suspect_keys is not None:
+            mask &= suspect_keys.contains(cube[KEY_COLUMN].to_numpy())
+
+        return cube[mask]
+
+
+def group_stats(cube, by):
+    """Roll the cube up to ``by``: spend, count and unit-price mean/std."""
+    grouped = cube.groupby(by, observed=True, sort=False)
+    stats = grouped[['Valor Liquido', 'count', 'price_sum', 'price_sq_sum']].sum()
+    stats['price_mean'] = stats['price_sum'] / stats['count']
+    variance = (stats['price_sq_sum'] - stats['count'] * stats['price_mean'] ** 2) / (stats['count'] - 1)
+    stats['price_std'] = np.sqrt(variance.clip(lower=0)).where(stats['count'] > 1)
+    return stats.reset_index()
@@ -0,0 +1,85 @@
+"""Memoized chart figures keyed by filter state.
+
+Figure callbacks only depend on the current filter result, whose key is the
+hash of the normalized filter state (see ``result_store.state_key``), so a
+figure built once for a state can be handed out again for as long as the data
+does not change. Keys also carry the data generation: ``new_generation`` is
+called after each data load and drops the figures of the previous data.
+The least recently used entries are dropped beyond ``max_entries``, and with
+``ttl`` set entries also expire after that many seconds. Hits and misses are
+counted per figure, here and in ``/metrics``
+(``dash_figure_cache_lookups_total``).
+"""
+import functools
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import metrics
+
+
+class FigureCache:
+    def __init__(self, max_entries=256, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.generation = 0
+        self.hits = Counter()
+        self.misses = Counter()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name, key):
+        with self._lock:
+            entry = self._entries.get((name, key))
+            if entry is not None and self.ttl is not None and self.clock() - entry[1] > self.ttl:
+                del self._entries[(name, key)]
+                entry = None
+            if entry is None:
+                self.misses[name] += 1
+                metrics.FIGURE_CACHE_LOOKUPS.inc(figure=name, result='miss')
+                return None
+            self._entries.move_to_end((name, key))
+            self.hits[name] += 1
+            metrics.FIGURE_CACHE_LOOKUPS.inc(figure=name, result='hit')
+            return entry[0]
+
+    def put(self, name, key, figure):
+        with self._lock:
+            self._entries[(name, key)] = (figure, self.clock())
+            self._entries.move_to_end((name, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return figure
+
+    def new_generation(self):
+        """Start a new data generation: figures built from the previous data are dropped."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def memoize(self, name):
+        """Decorator for callbacks taking the ``filtered-data`` store, then any
+        other (hashable) inputs, which become part of the key."""
+        def decorator(build):
+            @functools.wraps(build)
+            def wrapper(data, *args):
+                key = (self.generation, data['key'] if data else None) + args
+                figure = self.get(name, key)
+                if figure is None:
+                    with metrics.timed(f'figure:{name}'):
+                        figure = self.put(name, key, build(data, *args))
+                return figure
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': dict(self.hits),
+                'misses': dict(self.misses),
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,139 @@
+"""Precomputed indexes for the dashboard filters.
+
+Built once when the base is loaded. Each filter dimension is factorized into
+integer codes, and the row positions of every value are kept as one sorted
+slice of a single ``argsort`` (an inverted index / posting list). The date
+column gets a sorted copy for range search. A filter request is answered by
+materializing the smallest candidate set (the union of the posting lists of
+one dimension, or a date range) and checking the remaining dimensions with
+O(1) code lookups on those candidates only; the DataFrame is touched once at
+the end to take the selected rows.
+"""
+import numpy as np
+import pandas as pd
+
+
+def as_dtype(values, dtype):
+    """``values`` as an Index of ``dtype`` when they convert (dropdowns send strings)."""
+    values = pd.Index(list(values))
+    if values.dtype != dtype:
+        try:
+            values = values.astype(dtype)
+        except (TypeError, ValueError):
+            pass
+    return values
+
+
+def value_dtype(column):
+    """dtype of the values of ``column`` (of its categories, for a categorical)."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.categories.dtype
+    return column.dtype
+
+
+class _Dimension:
+    def __init__(self, column):
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            codes = column.cat.codes.to_numpy()
+            uniques = pd.Index(column.cat.categories)
+        else:
+            codes, uniques = pd.factorize(column, sort=True)
+            uniques = pd.Index(uniques)
+        self.codes = codes.astype(np.int32, copy=False)
+        self.uniques = uniques
+        valid = self.codes >= 0
+        self.order = np.argsort(self.codes, kind='stable')[np.count_nonzero(~valid):]
+        counts = np.bincount(self.codes[valid], minlength=len(uniques))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def lookup(self, values):
+        codes = self.uniques.get_indexer(as_dtype(values, self.uniques.dtype))
+        return np.unique(codes[codes >= 0])
+
+    def size(self, codes):
+        return int((self.offsets[codes + 1] - self.offsets[codes]).sum())
+
+    def positions(self, codes):
+        if len(codes) == 1:
+            return self.order[self.offsets[codes[0]]:self.offsets[codes[0] + 1]]
+        parts = [self.order[self.offsets[c]:self.offsets[c + 1]] for c in codes]
+        return np.sort(np.concatenate(parts)) if parts else np.array([], dtype=np.intp)
+
+    def member(self, codes):
+        table = np.zeros(len(self.uniques) + 1, dtype=bool)
+        table[codes] = True
+        # code -1 (missing) maps onto the sentinel slot at the end, always False
+        return table
+
+
+class FilterIndex:
+    def __init__(self, df, dimensions, date_column=None):
+        """``dimensions`` maps a filter name to the DataFrame column it filters."""
+        self.df = df
+        self.n_rows = len(df)
+        self.dimensions = {name: _Dimension(df[column]) for name, column in dimensions.items()}
+        self.date_column = date_column
+        if date_column is not None:
+            dates = df[date_column].to_numpy()
+            self._date_dtype = dates.dtype
+            self._dates = dates.view('i8')
+            self._date_order = np.argsort(self._dates, kind='stable')
+            self._sorted_dates = self._dates[self._date_order]
+
+    def _date_value(self, value):
+        return pd.Timestamp(value).to_datetime64().astype(self._date_dtype).view('i8')
+
+    def _date_range(self, start, end):
+        start, end = self._date_value(start), self._date_value(end)
+        lo = np.searchsorted(self._sorted_dates, start, side='left')
+        hi = np.searchsorted(self._sorted_dates, end, side='right')
+        return start, end, lo, max(lo, hi)
+
+    def select(self, filters, start_date=None, end_date=None):
+        """Return the sorted row positions matching every filter, or ``None`` for all rows.
+
+        ``filters`` maps dimension names to selected values; empty selections
+        are ignored, like in the dropdowns.
+        """
+        active = []
+        for name, values in filters.items():
+            if values:
+                dim = self.dimensions[name]
+                codes = dim.lookup(values)
+                if len(codes) == 0:
+                    return np.array([], dtype=np.intp)
+                active.append((dim.size(codes), dim, codes))
+
+        date_range = None
+        if self.date_column is not None and start_date and end_date:
+            date_range = self._date_range(start_date, end_date)
+
+        if not active and date_range is None:
+            return None
+
+        # Start from the most selective structure
+        active.sort(key=lambda item: item[0])
+        if date_range is not None and (not active or date_range[3] - date_range[2] < active[0][0]):
+            _, _, lo, hi = date_range
+            candidates = np.sort(self._date_order[lo:hi])
+            date_range = None
+        else:
+            _, dim, codes = active.pop(0)
+            candidates = dim.positions(codes)
+
+        for _, dim, codes in active:
+            if len(candidates) == 0:
+                break
+            candidates = candidates[dim.member(codes)[dim.codes[candidates]]]
+
+        if date_range is not None and len(candidates):
+            start, end, _, _ = date_range
+            dates = self._dates[candidates]
+            candidates = candidates[(dates >= start) & (dates <= end)]
+
+        return candidates
+
+    def take(self, positions):
+        if positions is None:
+            return self.df
+        return self.df.take(positions)
@@ -0,0 +1,144 @@
+"""Ingest step for the purchase base: XLSX (or CSV/Parquet) -> typed, memory-mappable Arrow cache.
+
+Parsing the source workbook with openpyxl is by far the slowest part of
+starting the dashboard, so the prepared frame is written once to an
+uncompressed Arrow IPC file next to the source. The cache is keyed on the
+source file's content hash; a sidecar JSON records the mtime/size that hash
+was computed for, so an unchanged file is detected with a single ``stat``.
+
+Usage:
+    python ingest.py "/home/ubuntu/upload/Base Dados v2.XLSX"
+"""
+import hashlib
+import json
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+
+from units import comparable_price, normalize_prices
+
+CACHE_VERSION = 2
+CATEGORICAL_COLUMNS = ['Centro', 'SKU', 'Fornecedor']
+
+
+def prepare_base(df):
+    """Numeric coercion, cleaning and derived columns shared by every consumer."""
+    df['Quantidade'] = pd.to_numeric(df['Quantidade'], errors='coerce')
+    df['Valor Liquido'] = pd.to_numeric(df['Valor Liquido'], errors='coerce')
+    df = df.dropna(subset=['Quantidade', 'Valor Liquido', 'SKU', 'Centro'])
+    df = df[(df['Quantidade'] > 0) & (df['Valor Liquido'] >= 0)].copy()
+    df['Preco_Unitario'] = df['Valor Liquido'] / df['Quantidade']
+    df['Data Doc.'] = pd.to_datetime(df['Data Doc.'], errors='coerce')
+    # Prices per kg / per piece from the pack sizes in the description
+    df = df.join(normalize_prices(df))
+
+    # Excel columns frequently mix numbers and text; store them as strings so
+    # they have a single Arrow type.
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype('category')
+    df['Preco_Comparavel'] = comparable_price(df)
+    return df.reset_index(drop=True)
+
+
+def read_source(source, sheet_name=0):
+    """Raw purchase lines from an XLSX, CSV or Parquet file."""
+    extension = os.path.splitext(source)[1].lower()
+    if extension == '.parquet':
+        return pd.read_parquet(source)
+    if extension == '.csv':
+        return pd.read_csv(source)
+    return pd.read_excel(source, sheet_name=sheet_name)
+
+
+def _file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(source, cache_dir):
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(source)), '.cache')
+    stem = os.path.splitext(os.path.basename(source))[0].replace(' ', '_')
+    return cache_dir, os.path.join(cache_dir, f'{stem}.meta.json')
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(path, write):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_meta(meta_path, meta):
+    def write(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+    _write_atomic(meta_path, write)
+
+
+def _write_arrow(df, path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    def write(tmp):
+        with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    _write_atomic(path, write)
+
+
+def read_cache(path):
+    """Memory-map an Arrow cache file and expose it as a DataFrame."""
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def load_base(source, sheet_name=0, cache_dir=None):
+    """Return the prepared purchase base, re-parsing ``source`` only when it changed."""
+    cache_dir, meta_path = _cache_paths(source, cache_dir)
+    stat = os.stat(source)
+    meta = _read_meta(meta_path)
+
+    same_stat = (meta.get('version') == CACHE_VERSION
+                 and meta.get('mtime_ns') == stat.st_mtime_ns
+                 and meta.get('size') == stat.st_size)
+    source_hash = meta.get('sha256') if same_stat else _file_hash(source)
+    cache_file = os.path.join(cache_dir, f'base_{source_hash[:16]}_v{CACHE_VERSION}.arrow')
+
+    if os.path.exists(cache_file):
+        if not same_stat:
+            # Touched but identical content: just refresh the recorded stat.
+            _write_meta(meta_path, {'version': CACHE_VERSION, 'mtime_ns': stat.st_mtime_ns,
+                                    'size': stat.st_size, 'sha256': source_hash})
+        return read_cache(cache_file)
+
+    df = prepare_base(read_source(source, sheet_name=sheet_name))
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_arrow(df, cache_file)
+    _write_meta(meta_path, {'version': CACHE_VERSION, 'mtime_ns': stat.st_mtime_ns,
+                            'size': stat.st_size, 'sha256': source_hash})
+    previous = meta.get('sha256')
+    if previous and previous != source_hash:
+        stale = os.path.join(cache_dir, f'base_{previous[:16]}_v{CACHE_VERSION}.arrow')
+        if os.path.exists(stale):
+            os.remove(stale)
+    return read_cache(cache_file)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    base = load_base(sys.argv[1])
+    print(f'{len(base)} linhas em cache para {sys.argv[1]}')
@@ -0,0 +1,109 @@
+"""In-process histograms of callback timings, rows and payload sizes, in Prometheus text format.
+
+Every request to the Dash server is timed by ``start_request``,
+``record_response`` and ``finish_request`` (Flask hooks registered by the
+app; ``finish_request`` is a teardown hook, so it also runs for requests
+whose view raised), labeled by the
+callback outputs (``output`` of ``/_dash-update-component``) or by the route.
+Bytes in and out are the request and response bodies: for the callbacks
+reading ``filtered-data`` that is the JSON round-trip of the store. Stages
+inside a callback (index lookups, cube slices, figure builds) are timed with
+``timed(stage)``, and ``count_rows`` records the rows a callback worked on.
+
+Each worker process keeps its own histograms; ``/metrics`` shows the ones of
+the worker that answers, so a scraper should reach every worker.
+
+With ``PROFILE_SLOW_MS`` set, every request is followed by a sampling
+profiler (one stack every ``PROFILE_INTERVAL_MS``), and the stacks of the
+requests slower than that are written to ``PROFILE_DIR`` in the "folded"
+format (one stack per line followed by its sample count) read by flame
+graph tools. The histograms and the profiler come from ``metrics_core``.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+from metrics_core import CONTENT_TYPE, Registry, SamplingProfiler  # noqa: F401
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+ROWS = (10, 100, 1e3, 1e4, 1e5, 1e6, 1e7)
+
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.histogram(
+    'dash_request_duration_seconds', 'Wall time per callback or route.', SECONDS, ['callback'])
+PAYLOAD_BYTES = REGISTRY.histogram(
+    'dash_payload_bytes', 'Request and response body size per callback or route.', BYTES, ['callback', 'direction'])
+CALLBACK_ROWS = REGISTRY.histogram(
+    'dash_callback_rows', 'Rows of the filtered result a callback worked on.', ROWS, ['callback'])
+STAGE_SECONDS = REGISTRY.histogram(
+    'dash_stage_duration_seconds', 'Wall time per stage inside the callbacks.', SECONDS, ['stage'])
+FIGURE_CACHE_LOOKUPS = REGISTRY.counter(
+    'dash_figure_cache_lookups_total', 'Figure cache lookups per figure, by result (hit or miss).',
+    ['figure', 'result'])
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def count_rows(rows):
+    # Outside a request (e.g. cache warm-up) there is no callback to attribute them to
+    if has_request_context():
+        g.metrics_rows = rows
+
+
+def _callback_label():
+    if request.path.endswith('/_dash-update-component'):
+        body = request.get_json(silent=True) or {}
+        return body.get('output', 'unknown')
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def start_request():
+    g.metrics_start = time.perf_counter()
+    if PROFILE_SLOW_MS:
+        g.metrics_profiler = SamplingProfiler(threading.get_ident(), PROFILE_INTERVAL)
+        g.metrics_profiler.start()
+
+
+def record_response(response):
+    # Streamed responses (exports) are generated after this point: size unknown
+    g.metrics_out = response.calculate_content_length()
+    return response
+
+
+def finish_request(exc=None):
+    """Record the request; runs on teardown, after errors too (``after_request`` hooks do not)."""
+    if 'metrics_start' not in g:
+        return
+    elapsed = time.perf_counter() - g.pop('metrics_start')
+    label = _callback_label()
+    REQUEST_SECONDS.observe(elapsed, callback=label)
+    PAYLOAD_BYTES.observe(request.content_length or 0, callback=label, direction='in')
+    length = g.pop('metrics_out', None)
+    if length is not None:
+        PAYLOAD_BYTES.observe(length, callback=label, direction='out')
+    if 'metrics_rows' in g:
+        CALLBACK_ROWS.observe(g.metrics_rows, callback=label)
+
+    profiler = g.pop('metrics_profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        if elapsed * 1000 >= PROFILE_SLOW_MS:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)[:80]
+            profiler.write(os.path.join(
+                PROFILE_DIR, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{name}-{elapsed * 1000:.0f}ms.folded'))
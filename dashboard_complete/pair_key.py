@@ -0,0 +1,90 @@
+"""Interned (SKU, Centro) composite key.
+
+Every (SKU, Centro) pair is encoded as a single int64,
+``sku_code * n_centros + centro_code``, using the categories of the base.
+Joins between the base, filtered results and the suspects table then become
+integer hash/array lookups instead of per-row tuple comparisons.
+"""
+import numpy as np
+import pandas as pd
+
+KEY_COLUMN = 'SKU_Centro'
+
+# Above this key space a dense lookup table gets too large; fall back to np.isin
+_MAX_TABLE_SIZE = 50_000_000
+
+
+class PairKey:
+    def __init__(self, sku_categories, centro_categories):
+        self.skus = pd.Index(sku_categories)
+        self.centros = pd.Index(centro_categories)
+        self.size = len(self.skus) * len(self.centros)
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(_categories(df['SKU']), _categories(df['Centro']))
+
+    def encode(self, sku, centro):
+        """Key per row; pairs with a SKU or Centro unknown to the base get -1."""
+        sku_codes = _codes(sku, self.skus)
+        centro_codes = _codes(centro, self.centros)
+        keys = sku_codes * len(self.centros) + centro_codes
+        keys[(sku_codes < 0) | (centro_codes < 0)] = -1
+        return keys
+
+    def decode(self, keys):
+        keys = np.asarray(keys)
+        return self.skus[keys // len(self.centros)], self.centros[keys % len(self.centros)]
+
+    def key_set(self, keys):
+        """A ``KeySet`` of ``keys``, to probe many times without rebuilding it."""
+        return KeySet(keys, self.size)
+
+    def semi_join(self, keys, other_keys):
+        """Boolean mask of ``keys`` that also appear in ``other_keys`` (keys or a ``KeySet``)."""
+        if not isinstance(other_keys, KeySet):
+            other_keys = self.key_set(other_keys)
+        return other_keys.contains(keys)
+
+
+class KeySet:
+    """Membership test for a fixed set of pair keys.
+
+    Built once per key set (e.g. the suspects, per data load): a dense
+    lookup table over the key space, or the sorted unique keys when the key
+    space is too large for one.
+    """
+
+    def __init__(self, keys, size):
+        keys = np.asarray(keys)
+        keys = keys[keys >= 0]
+        if size <= _MAX_TABLE_SIZE:
+            self._table = np.zeros(size + 1, dtype=bool)
+            self._table[keys] = True
+            self._keys = None
+        else:
+            self._table = None
+            self._keys = np.unique(keys)
+
+    def contains(self, keys):
+        """Boolean mask of ``keys`` in the set; -1 (unknown pair) never is."""
+        keys = np.asarray(keys)
+        if self._table is not None:
+            # -1 lands on the sentinel slot at the end
+            return self._table[keys]
+        return np.isin(keys, self._keys, assume_unique=False) & (keys >= 0)
+
+
+def _categories(column):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.categories
+    return pd.Index(column.dropna().unique()).sort_values()
+
+
+def _codes(values, categories):
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype) \
+            and values.cat.categories.equals(categories):
+        codes = values.cat.codes.to_numpy()
+    else:
+        codes = categories.get_indexer(pd.Index(values))
+    return codes.astype(np.int64)
@@ -0,0 +1,182 @@
+"""Local store of external price quotes, matched to SKUs by description.
+
+Quotes are read from CSV or Parquet files (a directory is read whole) with
+the columns ``Descrição`` and ``Preço`` and, optionally, ``Embalagem`` (the
+pack the price refers to, e.g. "1KG"; taken from the description when
+missing), ``Fonte`` and ``Data``. Each quote gets a price per kg.
+
+Descriptions are indexed as TF-IDF vectors of character n-grams taken
+inside words ("FILE" -> " FI", "FIL", "ILE", "LE "), so abbreviations and
+glued pack sizes still share most of their n-grams. The vectors of all
+quotes form one L2-normalized sparse matrix, whose transpose is the
+inverted index n-gram -> quotes. Matching a batch of descriptions is a
+single sparse product giving their cosine similarity to every quote; only
+quotes sharing an n-gram are ever touched.
+"""
+import glob
+import os
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from units import pack_sizes
+
+NGRAM = 3
+# Descriptions matched per sparse product; bounds the size of the result
+MATCH_BLOCK = 2000
+# N-grams in more than this share of the quotes (and at least MIN_PRUNED_COUNT of
+# them) are left out: they barely weigh in the similarity, but would put
+# almost every quote in the candidates of every description
+MAX_DOCUMENT_FRACTION = 0.05
+MIN_PRUNED_COUNT = 50
+# Cosine similarity below which a quote is not taken as the same product
+MIN_SIMILARITY = 0.5
+
+REQUIRED_COLUMNS = ['Descrição', 'Preço']
+
+_NON_ALNUM = re.compile(r'[^A-Z0-9]+')
+
+
+def normalize_text(text):
+    """Uppercase, no accents, only letters/digits separated by single spaces."""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    return _NON_ALNUM.sub(' ', text.upper()).strip()
+
+
+def ngrams(text, n=NGRAM):
+    grams = []
+    for word in normalize_text(text).split():
+        padded = f' {word} '
+        grams.extend(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+    return grams
+
+
+def read_quotes(path):
+    """Quotes from a CSV/Parquet file, or from every such file in a directory."""
+    if os.path.isfile(path):
+        files = [path]
+    else:
+        # A missing directory is an empty store
+        files = sorted(glob.glob(os.path.join(path, '*.csv')) + glob.glob(os.path.join(path, '*.parquet')))
+    frames = []
+    for file in files:
+        if file.endswith('.parquet'):
+            frame = pd.read_parquet(file)
+        else:
+            frame = pd.read_csv(file, encoding='utf-8-sig')
+        missing = [column for column in REQUIRED_COLUMNS if column not in frame.columns]
+        if missing:
+            raise ValueError(f'{file}: colunas ausentes: {", ".join(missing)}')
+        frame['Arquivo'] = os.path.basename(file)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS + ['Embalagem', 'Fonte', 'Data', 'Arquivo'])
+    return pd.concat(frames, ignore_index=True)
+
+
+class ReferenceStore:
+    """The quotes (``quotes``) and the TF-IDF matrix of their descriptions."""
+
+    def __init__(self, quotes):
+        quotes = quotes.reset_index(drop=True).copy()
+        for column in ['Embalagem', 'Fonte', 'Data']:
+            if column not in quotes.columns:
+                quotes[column] = None
+        quotes['Preço'] = pd.to_numeric(quotes['Preço'], errors='coerce')
+        # The quoted pack, or else the piece size in the description
+        pack = quotes['Embalagem'].where(quotes['Embalagem'].notna(), quotes['Descrição'])
+        kg, _ = pack_sizes(pack, ['UN'] * len(quotes))
+        quotes['Preco_Por_Kg'] = quotes['Preço'] / kg
+        self.quotes = quotes
+
+        documents = [ngrams(text) for text in quotes['Descrição']]
+        document_frequency = Counter(gram for grams in documents for gram in set(grams))
+        max_count = max(MAX_DOCUMENT_FRACTION * len(quotes), MIN_PRUNED_COUNT)
+        kept = sorted(gram for gram, count in document_frequency.items() if count <= max_count)
+        self.vocabulary = {gram: column for column, gram in enumerate(kept)}
+        frequency = np.array([document_frequency[gram] for gram in kept], dtype=float)
+        self.idf = np.log((1 + len(quotes)) / (1 + frequency)) + 1
+        self.matrix = self._weigh(self._counts(documents))
+
+    @classmethod
+    def from_path(cls, path):
+        return cls(read_quotes(path))
+
+    def __len__(self):
+        return len(self.quotes)
+
+    def _counts(self, documents):
+        rows, columns = [], []
+        for row, grams in enumerate(documents):
+            for gram in grams:
+                column = self.vocabulary.get(gram)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+        data = np.ones(len(rows))
+        return sparse.csr_matrix((data, (rows, columns)), shape=(len(documents), len(self.vocabulary)))
+
+    def _weigh(self, counts):
+        weighted = counts.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms) @ weighted
+
+    def match(self, descriptions, top_k=3, min_score=MIN_SIMILARITY):
+        """Best quotes for each description: ``query``, ``reference`` (positions
+        in ``descriptions`` and ``quotes``), ``score`` (cosine) and ``rank``."""
+        descriptions = list(descriptions)
+        parts = [pd.DataFrame({'query': np.array([], dtype=np.int64), 'reference': np.array([], dtype=np.int32),
+                               'score': np.array([]), 'rank': np.array([], dtype=np.int64)})]
+        if len(self) == 0:
+            return parts[0]
+        for start in range(0, len(descriptions), MATCH_BLOCK):
+            block = descriptions[start:start + MATCH_BLOCK]
+            similarity = (self._weigh(self._counts([ngrams(text) for text in block])) @ self.matrix.T).tocsr()
+            similarity.data[similarity.data < min_score] = 0
+            similarity.eliminate_zeros()
+            parts.extend(_top_k(similarity, top_k, start))
+        return pd.concat(parts, ignore_index=True).sort_values(['query', 'rank'], ignore_index=True)
+
+    def best_matches(self, descriptions, min_score=MIN_SIMILARITY):
+        """Best quote for each entry of the ``descriptions`` Series, indexed like it.
+
+        Distinct descriptions are matched once. Entries without a quote
+        scoring at least ``min_score`` are left out.
+        """
+        codes, unique = pd.factorize(descriptions)
+        best = self.match(unique, top_k=1, min_score=min_score)
+        quote = self.quotes.take(best['reference'].to_numpy())[['Descrição', 'Preço', 'Embalagem', 'Fonte', 'Preco_Por_Kg']]
+        quote = quote.set_axis(best['query'].to_numpy()).assign(Similaridade=best['score'].to_numpy())
+        positions = np.flatnonzero(np.isin(codes, quote.index))
+        return quote.loc[codes[positions]].set_axis(descriptions.index[positions])
+
+
+def _top_k(similarity, k, offset):
+    """The ``k`` largest entries of each row of a CSR matrix, one frame per rank.
+
+    Each rank takes the row maxima with one ``reduceat`` over the row
+    segments and removes them, so it is linear in the stored entries.
+    """
+    scores = similarity.data.copy()
+    columns = similarity.indices
+    rows = np.repeat(np.arange(similarity.shape[0]), np.diff(similarity.indptr))
+    starts = similarity.indptr[:-1][np.diff(similarity.indptr) > 0]
+    parts = []
+    for rank in range(k):
+        if len(starts) == 0:
+            break
+        best = np.maximum.reduceat(scores, starts)
+        # First position of each row holding its maximum
+        hits = np.flatnonzero(scores == np.repeat(best, np.diff(np.append(starts, len(scores)))))
+        query, first = np.unique(rows[hits], return_index=True)
+        positions = hits[first]
+        positions = positions[scores[positions] > -np.inf]
+        parts.append(pd.DataFrame({'query': rows[positions] + offset, 'reference': columns[positions],
+                                   'score': scores[positions], 'rank': rank}))
+        scores[positions] = -np.inf
+    return parts
@@ -0,0 +1,101 @@
+"""Server-side cache of filtered DataFrames.
+
+The browser only holds the key of a filter result (see ``state_key``); the
+frame itself stays in process memory in an LRU cache bounded both by number
+of entries and by total bytes. Cached frames are handed out as-is, so callers
+must treat them as read-only.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_state(state):
+    """Canonical form of a filter state: empty selections dropped, lists sorted,
+    dates reduced to ``YYYY-MM-DD`` (the date picker may send a time part)."""
+    normalized = {}
+    for name, value in state.items():
+        if value is None or value == [] or value == '':
+            continue
+        if isinstance(value, (list, tuple)):
+            value = sorted(str(v) for v in value)
+        elif name.endswith('_date'):
+            value = pd.Timestamp(value).strftime('%Y-%m-%d')
+        normalized[name] = value
+    return normalized
+
+
+def check_state(state, list_filters):
+    """Raise ``ValueError`` unless ``state`` is a dict whose ``list_filters`` are lists of scalars.
+
+    For states coming from outside the app (e.g. the export URL): a string
+    where a list is expected would otherwise be read character by character.
+    """
+    if not isinstance(state, dict):
+        raise ValueError('filter state must be an object')
+    for name in list_filters:
+        value = state.get(name)
+        if value is None or value == '':
+            continue
+        if not isinstance(value, list) or not all(isinstance(v, (str, int, float)) for v in value):
+            raise ValueError(f'filter {name} must be a list of values')
+    return state
+
+
+def state_key(state):
+    payload = json.dumps(normalize_state(state), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def frame_nbytes(df):
+    # Derived arrays (e.g. row orderings) are cached next to the frames
+    if isinstance(df, np.ndarray):
+        return df.nbytes
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+
+class ResultStore:
+    def __init__(self, max_entries=32, max_bytes=2 * 1024 ** 3):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, df):
+        nbytes = frame_nbytes(df)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (df, nbytes)
+            self._bytes += nbytes
+            # Evict least recently used entries, but always keep the newest one
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries
+                                              or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+        return df
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._bytes
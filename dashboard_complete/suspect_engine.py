@@ -0,0 +1,232 @@
+"""Incremental suspect-SKU detection.
+
+Keeps per-(SKU, Centro) unit-price statistics in memory and updates them one
+batch of purchase lines at a time: count/mean/variance are merged with the
+parallel form of Welford's algorithm (Chan et al.), min/max directly, and a
+small mergeable quantile sketch per group provides the IQR fences. Suspect
+status is refreshed from those statistics without revisiting the history.
+Every group is merged and summarized at once, with grouped array
+operations.
+
+The output has the same schema as ``suspect_skus_for_external_check.csv``,
+so the dashboard consumes it unchanged.
+
+Usage:
+    python suspect_engine.py --state engine.pkl --output suspects.csv novas_compras.xlsx [...]
+
+``--state`` is optional; when given, the statistics are loaded from it
+before the new files are ingested and saved back afterwards.
+"""
+import argparse
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from ingest import prepare_base, read_source
+
+KEYS = ['SKU', 'Centro']
+SUSPECT_COLUMNS = ['SKU', 'Centro', 'Descrição', 'Num_Compras', 'Preco_Medio', 'Preco_Min',
+                   'Preco_Max', 'CV_Percent', 'Num_Outliers_IQR', 'Motivo_Suspeita']
+
+
+def _compress(centroids, capacity):
+    """Sort the (mean, weight) centroids of every group and shrink the groups above ``capacity``.
+
+    Values are kept exactly until a group reaches ``capacity`` centroids;
+    after that neighbouring centroids are merged into ``capacity``
+    equal-weight buckets, bounding memory per group regardless of history
+    length.
+    """
+    centroids = centroids.sort_values(KEYS + ['mean'], kind='stable', ignore_index=True)
+    grouped = centroids.groupby(KEYS, sort=False)['weight']
+    weights = centroids['weight'].to_numpy()
+    cumulative = grouped.cumsum().to_numpy()
+    total = grouped.transform('sum').to_numpy()
+    buckets = np.minimum(((cumulative - weights / 2) / total * capacity).astype(int), capacity - 1)
+    bucket = np.where(grouped.transform('size').to_numpy() > capacity, buckets, grouped.cumcount().to_numpy())
+    merged = pd.DataFrame({
+        KEYS[0]: centroids[KEYS[0]], KEYS[1]: centroids[KEYS[1]], 'bucket': bucket,
+        'weighted': centroids['mean'] * weights, 'weight': weights,
+    }).groupby(KEYS + ['bucket'], sort=False).sum()
+    return pd.DataFrame({
+        KEYS[0]: merged.index.get_level_values(0), KEYS[1]: merged.index.get_level_values(1),
+        'mean': (merged['weighted'] / merged['weight']).to_numpy(), 'weight': merged['weight'].to_numpy(),
+    })
+
+
+def _quantiles(centroids, qs):
+    """Linear-interpolated quantiles ``qs`` of every group, indexed by ``KEYS``.
+
+    Matches ``Series.quantile`` while a group is uncompressed. Each
+    centroid sits at the middle of its weight on the rank axis; the groups
+    are laid end to end on that axis (one rank apart), so a single
+    ``searchsorted`` finds the neighbours of every target rank.
+    """
+    grouped = centroids.groupby(KEYS, sort=False)['weight']
+    means = centroids['mean'].to_numpy()
+    weights = centroids['weight'].to_numpy()
+    positions = grouped.cumsum().to_numpy() - weights + (weights - 1) / 2
+    totals = grouped.sum()
+    sizes = grouped.size().to_numpy()
+    offsets = np.concatenate(([0.0], np.cumsum(totals.to_numpy() + 1)[:-1]))
+    first = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    last = first + sizes - 1
+    axis = positions + np.repeat(offsets, sizes)
+
+    result = {}
+    for q in qs:
+        target = q * (totals.to_numpy() - 1) + offsets
+        # Neighbours of the target rank, clamped to the group like np.interp
+        after = np.searchsorted(axis, target, side='right')
+        hi, lo = np.clip(after, first, last), np.clip(after - 1, first, last)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(hi > lo, (target - axis[lo]) / (axis[hi] - axis[lo]), 0.0)
+        result[q] = means[lo] + fraction * (means[hi] - means[lo])
+    return pd.DataFrame(result, index=totals.index)
+
+
+def _count_outside(centroids, lower, upper):
+    """Weight of the centroids outside [``lower``, ``upper``] of their group (Series indexed by ``KEYS``)."""
+    index = pd.MultiIndex.from_frame(centroids[KEYS])
+    means = centroids['mean'].to_numpy()
+    outside = (means < lower.reindex(index).to_numpy()) | (means > upper.reindex(index).to_numpy())
+    weights = pd.Series(np.where(outside, centroids['weight'].to_numpy(), 0.0), index=index)
+    return weights.groupby(level=KEYS, sort=False).sum().round().astype(int)
+
+
+class SuspectEngine:
+    def __init__(self, cv_threshold=30.0, min_purchases=5, min_outliers=1, sketch_capacity=100):
+        self.cv_threshold = cv_threshold
+        self.min_purchases = min_purchases
+        self.min_outliers = min_outliers
+        self.sketch_capacity = sketch_capacity
+        self.stats = pd.DataFrame(
+            columns=['n', 'mean', 'm2', 'min', 'max', 'Descrição'],
+            index=pd.MultiIndex.from_arrays([[], []], names=KEYS)
+        )
+        # Quantile sketch of every group: (mean, weight) centroids, sorted by group and mean
+        self.centroids = pd.DataFrame({KEYS[0]: [], KEYS[1]: [], 'mean': [], 'weight': []})
+
+    def update(self, batch):
+        """Fold a batch of prepared purchase lines (with ``Preco_Unitario``) into the state."""
+        batch = batch.dropna(subset=KEYS + ['Preco_Unitario'])
+        if batch.empty:
+            return self
+        keys = [batch[k].astype(str) for k in KEYS]
+        prices = batch['Preco_Unitario'].astype(float)
+        grouped = prices.groupby(keys, sort=False)
+        # n and m2 over the same (priced) rows, or the merged moments drift
+        count = grouped.count()
+        b = pd.DataFrame({
+            'n': count,
+            'mean': grouped.mean(),
+            'm2': grouped.var(ddof=0).fillna(0) * count,
+            'min': grouped.min(),
+            'max': grouped.max(),
+            'Descrição': batch['Descrição'].astype(str).groupby(keys, sort=False).last(),
+        })
+        b.index.names = KEYS
+
+        a = self.stats.reindex(b.index)
+        n_a = a['n'].fillna(0).astype(float)
+        mean_a = a['mean'].fillna(0).astype(float)
+        n = n_a + b['n']
+        delta = b['mean'] - mean_a
+        merged = pd.DataFrame({
+            'n': n,
+            'mean': mean_a + delta * b['n'] / n,
+            'm2': a['m2'].fillna(0).astype(float) + b['m2'] + delta ** 2 * n_a * b['n'] / n,
+            'min': np.fmin(a['min'].astype(float), b['min']),
+            'max': np.fmax(a['max'].astype(float), b['max']),
+            'Descrição': b['Descrição'],
+        })
+        self.stats = merged.combine_first(self.stats) if len(self.stats) else merged
+
+        new = pd.DataFrame({KEYS[0]: keys[0].to_numpy(), KEYS[1]: keys[1].to_numpy(),
+                            'mean': prices.to_numpy(), 'weight': 1.0})
+        self.centroids = _compress(pd.concat([self.centroids, new], ignore_index=True), self.sketch_capacity)
+        return self
+
+    def summary(self):
+        """Statistics for every (SKU, Centro) seen so far, in the suspects CSV schema."""
+        stats = self.stats
+        n = stats['n'].astype(float)
+        mean = stats['mean'].astype(float)
+        std = np.sqrt(stats['m2'].astype(float) / (n - 1)).where(n > 1, 0.0)
+        summary = pd.DataFrame({
+            'Descrição': stats['Descrição'],
+            'Num_Compras': n.astype(int),
+            'Preco_Medio': mean,
+            'Preco_Min': stats['min'].astype(float),
+            'Preco_Max': stats['max'].astype(float),
+            'CV_Percent': (std / mean * 100).where(mean != 0, 0.0),
+        }, index=stats.index)
+
+        quartiles = _quantiles(self.centroids, [0.25, 0.75])
+        iqr = quartiles[0.75] - quartiles[0.25]
+        outliers = _count_outside(self.centroids, quartiles[0.25] - 1.5 * iqr, quartiles[0.75] + 1.5 * iqr)
+        summary['Num_Outliers_IQR'] = outliers.reindex(stats.index).to_numpy()
+        return summary.reset_index()
+
+    def suspects(self):
+        summary = self.summary()
+        eligible = summary['Num_Compras'] >= self.min_purchases
+        high_cv = eligible & (summary['CV_Percent'] > self.cv_threshold)
+        has_outliers = eligible & (summary['Num_Outliers_IQR'] >= self.min_outliers)
+
+        cv_text = 'CV alto (' + summary['CV_Percent'].round(1).astype(str) + '%)'
+        outlier_text = summary['Num_Outliers_IQR'].astype(str) + ' outliers IQR'
+        motivo = np.where(high_cv & has_outliers, cv_text + '; ' + outlier_text,
+                          np.where(high_cv, cv_text, outlier_text))
+        summary['Motivo_Suspeita'] = motivo
+
+        suspects = summary[high_cv | has_outliers]
+        suspects = suspects.sort_values(by=['Num_Outliers_IQR', 'CV_Percent'], ascending=False)
+        return suspects[SUSPECT_COLUMNS].reset_index(drop=True)
+
+    def to_csv(self, path):
+        self.suspects().to_csv(path, index=False)
+
+    def save(self, path):
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def _read_lines(path):
+    return prepare_base(read_source(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Atualiza a detecção de SKUs suspeitos com novas compras.')
+    parser.add_argument('inputs', nargs='+', help='Arquivos XLSX/CSV/Parquet com novas linhas de compra')
+    parser.add_argument('--output', required=True, help='CSV de suspeitos (mesmo esquema usado pelo dashboard)')
+    parser.add_argument('--state', help='Arquivo com o estado incremental (carregado e salvo)')
+    parser.add_argument('--cv-threshold', type=float, default=30.0)
+    parser.add_argument('--min-purchases', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.state and os.path.exists(args.state):
+        engine = SuspectEngine.load(args.state)
+    else:
+        engine = SuspectEngine(cv_threshold=args.cv_threshold, min_purchases=args.min_purchases)
+
+    for path in args.inputs:
+        engine.update(_read_lines(path))
+
+    engine.to_csv(args.output)
+    if args.state:
+        engine.save(args.state)
+    print(f'{len(engine.stats)} SKU/Centro acompanhados, suspeitos gravados em {args.output}')
+
+
+if __name__ == '__main__':
+    main()
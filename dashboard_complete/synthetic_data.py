@@ -0,0 +1,226 @@
+"""Synthetic purchase base in the schema of the real spreadsheet, at any scale.
+
+SKU frequencies follow a Zipf-like law (a few SKUs take most purchases),
+each SKU has a pack size written in its description and a purchase unit
+(KG, CX or UN), and prices are a per-kg base price with Centro and supplier
+factors and noise, so the per-kg normalization of ``units.py`` recovers
+comparable prices. A share of the lines is overpriced on purpose; the
+generator returns which ones (``truth``), so detectors can be scored.
+
+Besides the base, the CLI writes what the apps read next to it: the suspects
+CSV (from ``suspect_engine``), the upload in the Django audit schema and a
+market price table for that audit.
+
+Usage:
+    python synthetic_data.py --rows 1000000 --output-dir data/sintetico [--format parquet|csv|xlsx]
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from ingest import prepare_base
+from suspect_engine import SuspectEngine
+
+BASE_COLUMNS = ['Nº Pedido', 'Item', 'Data Doc.', 'SKU', 'Descrição', 'UN', 'Centro', 'Quantidade',
+                'Valor Liquido', 'Fornecedor', 'Grp. Mercadoria', 'Descrição.1']
+
+CENTROS = ['CDF2', 'CDUA', 'CDMG', 'CDSP', 'CDRJ', 'CDBA', 'CDPE', 'CDRS']
+CENTRO_WEIGHTS = [0.25, 0.2, 0.15, 0.12, 0.1, 0.08, 0.06, 0.04]
+
+# (product, merchandise group code, group description, price per kg factor)
+PRODUCTS = [
+    ('FILE PEITO DESF TEMP', 'G101', 'AVES', 1.2),
+    ('COXA SOBRECOXA', 'G101', 'AVES', 0.7),
+    ('LINGUICA MINEIRA', 'G102', 'EMBUTIDOS', 0.9),
+    ('LINGUICA TOSCANA', 'G102', 'EMBUTIDOS', 0.9),
+    ('SALSICHA HOT DOG', 'G102', 'EMBUTIDOS', 0.6),
+    ('LASANHA A BOLONHESA', 'G103', 'MASSAS', 1.0),
+    ('NHOQUE BATATA', 'G103', 'MASSAS', 0.8),
+    ('PRESUNTO COZIDO FATIADO', 'G104', 'FRIOS', 1.4),
+    ('QUEIJO MUSSARELA', 'G105', 'LATICINIOS', 1.6),
+    ('REQUEIJAO CREMOSO', 'G105', 'LATICINIOS', 1.3),
+    ('CARNE MOIDA BOVINA', 'G106', 'BOVINOS', 1.8),
+    ('HAMBURGUER BOVINO', 'G106', 'BOVINOS', 1.5),
+    ('PERNIL SUINO', 'G107', 'SUINOS', 1.1),
+    ('BACON FATIADO', 'G107', 'SUINOS', 1.7),
+    ('BATATA PRE FRITA', 'G108', 'CONGELADOS', 0.5),
+    ('PAO DE QUEIJO', 'G108', 'CONGELADOS', 0.9),
+]
+PIECE_GRAMS = [200, 300, 400, 500, 600, 800, 1000, 2000, 4000, 5000]
+PIECES_PER_BOX = [4, 6, 8, 10, 12, 16, 20]
+UOMS = ['KG', 'CX', 'UN']
+UOM_WEIGHTS = [0.3, 0.5, 0.2]
+
+# Overpriced lines cost this many times the usual price
+OVERPRICING_RANGE = (1.5, 3.0)
+
+
+def _pack_text(grams):
+    if grams >= 1000:
+        kg = grams / 1000
+        return f'{kg:g}KG'.replace('.', ',')
+    return f'{grams:g}G'
+
+
+def make_catalog(skus, rng):
+    """One row per SKU: code, description, unit, group and prices."""
+    product = rng.integers(len(PRODUCTS), size=skus)
+    piece_g = rng.choice(PIECE_GRAMS, size=skus)
+    pieces = rng.choice(PIECES_PER_BOX, size=skus)
+    box_kg = piece_g * pieces / 1000
+    uom = rng.choice(len(UOMS), size=skus, p=UOM_WEIGHTS)
+    factor = np.array([PRODUCTS[p][3] for p in product])
+
+    codes = [f'00-{i // 1000:03d}.{i % 1000:03d}' for i in range(1, skus + 1)]
+    descriptions = [f'{8000 + i} {PRODUCTS[p][0]} {_pack_text(g)} CX {_pack_text(b * 1000)} UNI'
+                    for i, (p, g, b) in enumerate(zip(product, piece_g, box_kg))]
+    kg_per_uom = np.select([uom == 0, uom == 1], [1.0, box_kg], piece_g / 1000)
+    return pd.DataFrame({
+        'SKU': codes,
+        'Descrição': descriptions,
+        'UN': np.array(UOMS)[uom],
+        'Grp. Mercadoria': [PRODUCTS[p][1] for p in product],
+        'Descrição.1': [PRODUCTS[p][2] for p in product],
+        'price_per_kg': rng.lognormal(3.0, 0.4, skus) * factor,
+        'kg_per_uom': kg_per_uom,
+    })
+
+
+def _take(values, positions):
+    # Categorical columns keep the base small at tens of millions of rows
+    values = pd.Categorical(values)
+    return pd.Categorical.from_codes(values.codes[positions], values.categories)
+
+
+def generate_base(rows, seed=0, skus=None, suppliers=None, start='2022-01-01', days=730,
+                  overpriced_share=0.005, zipf=1.1):
+    """``(base, truth)``: purchase lines in ``BASE_COLUMNS`` and, aligned to
+    them, ``planted`` (overpriced on purpose) and ``expected_price`` (usual
+    price per purchase unit of the line's SKU at its Centro)."""
+    rng = np.random.default_rng(seed)
+    skus = skus or int(np.clip(rows // 50, 100, 200_000))
+    suppliers = suppliers or max(20, skus // 20)
+    catalog = make_catalog(skus, rng)
+
+    # Zipf-like SKU popularity, in a random order of SKU codes
+    weights = 1 / np.arange(1, skus + 1) ** zipf
+    rank = np.minimum(np.searchsorted(np.cumsum(weights / weights.sum()), rng.random(rows)), skus - 1)
+    sku = rng.permutation(skus)[rank]
+    centro = rng.choice(len(CENTROS), size=rows, p=CENTRO_WEIGHTS)
+    # Each SKU mostly comes from its usual supplier
+    usual_supplier = rng.integers(suppliers, size=skus)
+    supplier = np.where(rng.random(rows) < 0.7, usual_supplier[sku], rng.integers(suppliers, size=rows))
+
+    # Lines sorted by date, grouped into orders of a few items
+    date = np.sort(rng.integers(days, size=rows))
+    new_order = np.r_[True, rng.random(rows - 1) < 0.3] if rows else np.array([], dtype=bool)
+    order = np.cumsum(new_order) - 1
+    order_start = np.flatnonzero(new_order)
+    item = (np.arange(rows) - order_start[order] + 1) * 10
+
+    centro_factor = rng.lognormal(0, 0.05, len(CENTROS))
+    supplier_factor = rng.lognormal(0, 0.04, suppliers)
+    expected = catalog['price_per_kg'].to_numpy()[sku] * catalog['kg_per_uom'].to_numpy()[sku] * centro_factor[centro]
+    price = expected * supplier_factor[supplier] * rng.lognormal(0, 0.06, rows)
+    planted = rng.random(rows) < overpriced_share
+    price[planted] *= rng.uniform(*OVERPRICING_RANGE, size=planted.sum())
+
+    uom = catalog['UN'].to_numpy()[sku]
+    quantity = np.where(uom == 'KG', np.round(rng.lognormal(2.5, 0.8, rows), 3),
+                        rng.integers(1, 60, size=rows).astype(float))
+
+    base = pd.DataFrame({
+        'Nº Pedido': 4_500_000_000 + order,
+        'Item': item,
+        'Data Doc.': pd.Timestamp(start) + pd.to_timedelta(date, unit='D'),
+        'SKU': _take(catalog['SKU'], sku),
+        'Descrição': _take(catalog['Descrição'], sku),
+        'UN': pd.Categorical(uom, categories=UOMS),
+        'Centro': _take(CENTROS, centro),
+        'Quantidade': quantity,
+        'Valor Liquido': np.round(price * quantity, 2),
+        'Fornecedor': _take([f'FORNECEDOR {i:05d} LTDA' for i in range(suppliers)], supplier),
+        'Grp. Mercadoria': _take(catalog['Grp. Mercadoria'], sku),
+        'Descrição.1': _take(catalog['Descrição.1'], sku),
+    })
+    truth = pd.DataFrame({'planted': planted, 'expected_price': expected})
+    return base, truth
+
+
+def suspect_table(base):
+    """Suspects CSV contents for ``base``, as ``suspect_engine`` computes them."""
+    return SuspectEngine().update(prepare_base(base.copy())).suspects()
+
+
+def audit_frame(base):
+    """The base as an upload for the Django audit (``sku``, ``localidade``, ``data``, ``valor_compra``)."""
+    return pd.DataFrame({
+        'sku': base['SKU'],
+        'localidade': base['Centro'],
+        'data': base['Data Doc.'],
+        'valor_compra': (base['Valor Liquido'] / base['Quantidade']).round(2),
+    })
+
+
+def market_table(base, truth):
+    """Market price per (SKU, Centro) for the Django audit: the usual price, valid from the first day."""
+    table = pd.DataFrame({'sku': base['SKU'].astype(str), 'localidade': base['Centro'].astype(str),
+                          'valor_mercado': truth['expected_price'].round(2)})
+    table = table.drop_duplicates(['sku', 'localidade'])
+    table.insert(2, 'data_vigencia', base['Data Doc.'].min().strftime('%Y-%m-%d'))
+    return table
+
+
+def write_base(base, path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        base.to_parquet(path, index=False)
+    elif extension == '.csv':
+        base.to_csv(path, index=False)
+    elif extension == '.xlsx':
+        if len(base) >= 1_048_576:
+            raise ValueError('XLSX comporta no máximo 1.048.575 linhas de dados; use parquet ou csv')
+        base.to_excel(path, index=False)
+    else:
+        raise ValueError(f'Formato não suportado: {extension}')
+
+
+def write_dataset(rows, output_dir, seed=0, fmt='parquet', **options):
+    """Write the base and its companion files to ``output_dir``; returns their paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    base, truth = generate_base(rows, seed=seed, **options)
+    paths = {
+        'base': os.path.join(output_dir, f'base.{fmt}'),
+        'truth': os.path.join(output_dir, 'truth.parquet'),
+        'suspects': os.path.join(output_dir, 'suspeitos.csv'),
+        'audit': os.path.join(output_dir, 'auditoria.csv'),
+        'market': os.path.join(output_dir, 'precos_mercado.csv'),
+    }
+    write_base(base, paths['base'])
+    truth.to_parquet(paths['truth'], index=False)
+    suspect_table(base).to_csv(paths['suspects'], index=False)
+    audit_frame(base).to_csv(paths['audit'], index=False)
+    market_table(base, truth).to_csv(paths['market'], index=False)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--output-dir', required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['parquet', 'csv', 'xlsx'], default='parquet')
+    parser.add_argument('--skus', type=int, help='SKUs in the catalog (default: rows / 50)')
+    parser.add_argument('--overpriced-share', type=float, default=0.005)
+    args = parser.parse_args()
+
+    paths = write_dataset(args.rows, args.output_dir, seed=args.seed, fmt=args.format,
+                          skus=args.skus, overpriced_share=args.overpriced_share)
+    for name, path in paths.items():
+        print(f'{name:>9}: {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Server-side filtering, sorting and paging for the detailed-data DataTable.
+
+The table runs with ``page_action``/``sort_action``/``filter_action`` set to
+``'custom'``: the browser only sends its ``filter_query``, ``sort_by`` and
+page number. The filter and sort are resolved once per filter result into an
+array of row positions (cached by the caller), and every page is then a
+slice of that array, so a page costs the same whatever the result size.
+"""
+import hashlib
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+# One term of a DataTable filter query, e.g. ``{Centro} icontains cdf`` or
+# ``{Quantidade} >= 10``; operators may carry an s/i (case) prefix
+_TERM = re.compile(
+    r'^\{(?P<column>[^}]+)\}\s+'
+    r'(?P<op>[si]?(?:eq|ne|lt|le|gt|ge|contains|datestartswith)|>=|<=|!=|=|<|>)\s+'
+    r'(?P<value>.+)$'
+)
+_SYMBOLS = {'=': 'eq', '!=': 'ne', '<': 'lt', '<=': 'le', '>': 'gt', '>=': 'ge'}
+_COMPARISONS = {
+    'eq': np.equal, 'ne': np.not_equal,
+    'lt': np.less, 'le': np.less_equal,
+    'gt': np.greater, 'ge': np.greater_equal,
+}
+_OPERATORS = set(_COMPARISONS) | {'contains', 'datestartswith'}
+
+
+def view_key(filter_query, sort_by):
+    payload = json.dumps([filter_query or '', sort_by or []], sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def parse_filter(filter_query):
+    """``[(column, operator, value, case_sensitive)]``; malformed terms are skipped."""
+    terms = []
+    for part in (filter_query or '').split(' && '):
+        match = _TERM.match(part.strip())
+        if not match:
+            continue
+        op = _SYMBOLS.get(match['op'], match['op'])
+        case_sensitive = True
+        if op[0] in 'si' and op[1:] in _OPERATORS:
+            case_sensitive, op = op[0] == 's', op[1:]
+        value = match['value'].strip()
+        if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'`':
+            value = value[1:-1]
+        terms.append((match['column'], op, value, case_sensitive))
+    return terms
+
+
+def _text_mask(column, predicate):
+    # Categoricals are tested once per category instead of once per row
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        per_category = np.append(predicate(pd.Series(column.cat.categories.astype(str))).to_numpy(bool), False)
+        return per_category[column.cat.codes.to_numpy()]
+    return (predicate(column.astype(str)) & column.notna()).to_numpy(bool)
+
+
+def _date_prefix_range(value):
+    """``2023``, ``2023-05`` or ``2023-05-17`` -> [start, end) of that year/month/day."""
+    start = pd.Timestamp(value)
+    digits = len(value.strip())
+    if digits <= 4:
+        return start, start + pd.DateOffset(years=1)
+    if digits <= 7:
+        return start, start + pd.DateOffset(months=1)
+    return start, start + pd.Timedelta(days=1)
+
+
+def _term_mask(column, op, value, case_sensitive):
+    if op == 'contains':
+        return _text_mask(column, lambda text: text.str.contains(value, case=case_sensitive, regex=False))
+    if op == 'datestartswith':
+        start, end = _date_prefix_range(value)
+        return ((column >= start) & (column < end)).to_numpy(bool)
+
+    compare = _COMPARISONS[op]
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return compare(column, pd.Timestamp(value)).to_numpy(bool)
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        return compare(column, float(value)).to_numpy(bool)
+    if not case_sensitive:
+        return _text_mask(column, lambda text: compare(text.str.lower(), value.lower()))
+    return _text_mask(column, lambda text: compare(text, value))
+
+
+def filter_mask(df, filter_query):
+    """Rows of ``df`` matching ``filter_query``, or ``None`` when it selects everything.
+
+    Terms on unknown columns or with values that do not fit the column type
+    are ignored, like an empty filter cell.
+    """
+    mask = None
+    for column, op, value, case_sensitive in parse_filter(filter_query):
+        if column not in df.columns:
+            continue
+        try:
+            term = _term_mask(df[column], op, value, case_sensitive)
+        except (TypeError, ValueError):
+            continue
+        mask = term if mask is None else mask & term
+    return mask
+
+
+def view_positions(df, filter_query, sort_by):
+    """Row positions of ``df`` after the table filter and sort, or ``None`` for
+    the unfiltered, unsorted result (pages are then plain slices)."""
+    mask = filter_mask(df, filter_query)
+    sort_by = [item for item in sort_by or [] if item['column_id'] in df.columns]
+    if mask is None and not sort_by:
+        return None
+
+    positions = np.arange(len(df)) if mask is None else np.flatnonzero(mask)
+    if sort_by:
+        columns = [item['column_id'] for item in sort_by]
+        keys = df[columns].take(positions).reset_index(drop=True)
+        order = keys.sort_values(columns, ascending=[item['direction'] == 'asc' for item in sort_by],
+                                 kind='stable', na_position='last').index.to_numpy()
+        positions = positions[order]
+    return positions
+
+
+def page(df, positions, page_current, page_size):
+    """Rows of one page and the page count; the page is clamped to the last one."""
+    total = len(df) if positions is None else len(positions)
+    page_count = max(1, -(-total // page_size))
+    page_current = min(page_current or 0, page_count - 1)
+    start, stop = page_current * page_size, (page_current + 1) * page_size
+    rows = df.iloc[start:stop] if positions is None else df.take(positions[start:stop])
+    return rows, page_count, total
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The dashboard modules live at the top of dashboard_complete/, like for the benchmarks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def base():
+    """A few thousand purchase lines with the columns the indexes and the cube read."""
+    rng = np.random.default_rng(0)
+    n = 3000
+    dates = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 365, n), unit='D')
+    df = pd.DataFrame({
+        'SKU': rng.choice([f'00-{i:03d}' for i in range(40)], n),
+        'Centro': pd.Categorical(rng.choice(['CDF2', 'CDUA', 'CDMG', 'CDSP'], n)),
+        'Fornecedor': rng.choice([f'FORNECEDOR {i}' for i in range(15)] + [None], n),
+        'Grp. Mercadoria': rng.choice(['G101', 'G102', 'G103'], n),
+        'Data Doc.': dates,
+        'Valor Liquido': rng.lognormal(5, 1, n).round(2),
+        'Preco_Unitario': rng.lognormal(3, 0.5, n).round(2),
+    })
+    return df.sort_values('Data Doc.', kind='stable').reset_index(drop=True)
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The dashboard app, loaded once (eagerly) from a small synthetic base."""
+    from synthetic_data import write_dataset
+
+    paths = write_dataset(5000, str(tmp_path_factory.mktemp('data')), seed=1)
+    os.environ.update({
+        'BASE_FILE': paths['base'],
+        'SUSPECT_FILE': paths['suspects'],
+        'DATA_LOAD': 'eager',
+        'FIGURE_CACHE_WARM': '0',
+    })
+    import app
+    return app
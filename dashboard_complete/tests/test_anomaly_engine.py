@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_engine import DETECTORS, MIN_GROUP_SIZE, detect, flagged_by
+from pair_key import KEY_COLUMN
+
+
+def purchases(groups):
+    """One row per price; ``groups`` maps a key to (prices, suppliers)."""
+    rows = [(key, price, supplier) for key, (prices, suppliers) in groups.items()
+            for price, supplier in zip(prices, suppliers)]
+    return pd.DataFrame(rows, columns=[KEY_COLUMN, 'Preco_Unitario', 'Fornecedor'])
+
+
+def test_known_outlier_is_flagged():
+    prices = [10.0, 10.2, 9.9, 10.1, 10.3, 9.8, 10.0, 10.4, 30.0]
+    df = purchases({0: (prices, ['A'] * len(prices))})
+    result = detect(df)
+    outlier = result.iloc[-1]
+    assert outlier['flag_iqr'] and outlier['flag_robust_z'] and outlier['flag_median_pct']
+    assert outlier['anomaly_flags'] == 3
+    assert outlier['anomaly_score'] > 1
+    assert flagged_by(result).iloc[-1] == 'IQR, Z robusto (MAD), Desvio da mediana (%)'
+    assert not result.iloc[:-1]['anomaly_flags'].any()
+
+
+def test_outlying_supplier_is_flagged():
+    prices = [10.0] * 6 + [14.0] * 3
+    df = purchases({0: (prices, ['A'] * 6 + ['B'] * 3)})
+    result = detect(df, detectors=['supplier_spread'])
+    assert result['flag_supplier_spread'].tolist() == [False] * 6 + [True] * 3
+
+
+def test_zero_iqr_falls_back_to_the_mean_deviation():
+    # More than half of the group at one price: IQR and MAD are both zero
+    prices = [10.0] * 8 + [10.5, 50.0]
+    df = purchases({0: (prices, ['A'] * len(prices))})
+    result = detect(df)
+    # Scored against the mean absolute deviation: only the far price is flagged
+    assert result['score_iqr'].max() < 10
+    assert result['flag_iqr'].tolist() == [False] * 9 + [True]
+    assert result['anomaly_score'].max() < 10
+
+
+def test_rows_without_price_do_not_fill_the_group():
+    prices = [10.0, 10.0, 10.0, 10.0, 50.0] + [np.nan] * 5
+    small = [10.0, 10.0, 10.0, 50.0] + [np.nan] * 6
+    df = purchases({0: (prices, ['A'] * 10), 1: (small, ['A'] * 10)})
+    result = detect(df)
+    assert result['anomaly_flags'].iloc[4] > 0
+    # Four priced rows: below MIN_GROUP_SIZE, nothing is scored
+    assert MIN_GROUP_SIZE > 4
+    assert not result.iloc[10:]['anomaly_flags'].any()
+    assert (result.iloc[10:]['anomaly_score'] == 0).all()
+
+
+def test_partitioned_run_matches_in_process(base):
+    df = base.assign(**{KEY_COLUMN: base.groupby(['SKU', 'Centro']).ngroup()})
+    pd.testing.assert_frame_equal(detect(df, workers=2), detect(df, workers=1))
+
+
+@pytest.mark.parametrize('name', list(DETECTORS))
+def test_every_detector_yields_score_and_flag(base, name):
+    df = base.assign(**{KEY_COLUMN: base.groupby(['SKU', 'Centro']).ngroup()})
+    result = detect(df, detectors=[name])
+    assert list(result.columns) == [f'score_{name}', f'flag_{name}', 'anomaly_score', 'anomaly_flags']
+    assert (result[f'flag_{name}'] == (result[f'score_{name}'] > DETECTORS[name].threshold)).all()
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from box_stats import box_stats, outlier_mask
+
+
+def prices_by_key():
+    rng = np.random.default_rng(5)
+    keys = rng.integers(0, 25, 2000)
+    prices = rng.lognormal(3, 0.4, 2000)
+    prices[rng.choice(2000, 30, replace=False)] *= 5
+    return keys, prices
+
+
+def test_quartiles_and_whiskers_match_pandas():
+    keys, prices = prices_by_key()
+    stats = box_stats(keys, prices)
+    grouped = pd.Series(prices).groupby(keys)
+    np.testing.assert_allclose(stats['q1'], grouped.quantile(0.25))
+    np.testing.assert_allclose(stats['median'], grouped.median())
+    np.testing.assert_allclose(stats['q3'], grouped.quantile(0.75))
+    assert (stats['count'] == grouped.size()).all()
+
+    for key, group in grouped:
+        row = stats.loc[key]
+        iqr = row['q3'] - row['q1']
+        inside = group[(group >= row['q1'] - 1.5 * iqr) & (group <= row['q3'] + 1.5 * iqr)]
+        assert row['lowerfence'] == inside.min() and row['upperfence'] == inside.max()
+
+
+def test_outlier_mask_is_outside_the_fences():
+    keys, prices = prices_by_key()
+    stats = box_stats(keys, prices)
+    mask = outlier_mask(stats, keys, prices)
+    low = stats['fence_low'].reindex(keys).to_numpy()
+    high = stats['fence_high'].reindex(keys).to_numpy()
+    np.testing.assert_array_equal(mask, (prices < low) | (prices > high))
+    assert mask.sum() >= 30
+    # Keys missing from the table are never outliers
+    assert not outlier_mask(stats, [999], [1e9]).any()
+
+
+def test_outlier_details_reuse_the_box_stats(app):
+    data = app.filter_data(1, None, None, None, None, None, None, None, 'no')
+    stats = app.get_box_stats(data)
+    details = app.update_outlier_details(data)
+    tables = [child for section in details.children for child in section.children
+              if type(child).__name__ == 'DataTable']
+    assert tables
+    df = app.get_filtered(data)
+    for table in tables:
+        for row in table.data:
+            line = df[(df['Nº Pedido'] == row['Nº Pedido']) & (df['Preco_Unitario'] == row['Preco_Unitario'])].iloc[0]
+            fences = stats.loc[line[app.KEY_COLUMN]]
+            outside = not fences['fence_low'] <= line['Preco_Unitario'] <= fences['fence_high']
+            assert row['outside_box'] == ('Sim' if outside else 'Não')
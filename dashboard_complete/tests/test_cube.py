@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import MONTH_COLUMN, AggregateCube, build_cube
+from filter_index import FilterIndex
+from pair_key import KEY_COLUMN, PairKey
+
+
+@pytest.fixture
+def indexed(base):
+    key = PairKey.from_frame(base)
+    return base.assign(**{KEY_COLUMN: key.encode(base['SKU'], base['Centro'])}), key
+
+
+def normalized(cube):
+    columns = [KEY_COLUMN, 'Fornecedor', MONTH_COLUMN]
+    cube = cube.assign(Fornecedor=cube['Fornecedor'].fillna(''))
+    return cube.sort_values(columns).reset_index(drop=True)[
+        columns + ['Valor Liquido', 'count', 'price_sum', 'price_sq_sum']]
+
+
+@pytest.mark.parametrize('state, rows', [
+    ({}, lambda df: pd.Series(True, index=df.index)),
+    ({'centros': ['CDUA', 'CDMG']}, lambda df: df['Centro'].isin(['CDUA', 'CDMG'])),
+    ({'skus': ['00-004'], 'fornecedores': ['FORNECEDOR 2']},
+     lambda df: (df['SKU'] == '00-004') & (df['Fornecedor'] == 'FORNECEDOR 2')),
+    # Whole months only: February to April
+    ({'start_date': '2023-02-01', 'end_date': '2023-04-30'},
+     lambda df: (df['Data Doc.'] >= '2023-02-01') & (df['Data Doc.'] <= '2023-04-30')),
+])
+def test_slice_matches_build_cube(indexed, state, rows):
+    df, _ = indexed
+    sliced = AggregateCube(df).slice(state)
+    expected = build_cube(df[rows(df).to_numpy()])
+    pd.testing.assert_frame_equal(normalized(sliced), normalized(expected), check_dtype=False,
+                                  check_categorical=False)
+
+
+def test_slice_of_suspects(indexed):
+    df, key = indexed
+    suspects = key.encode(pd.Series(['00-001', '00-002']), pd.Series(['CDUA', 'CDSP']))
+    sliced = AggregateCube(df).slice({'only_suspects': 'yes'}, suspect_keys=key.key_set(suspects))
+    expected = build_cube(df[np.isin(df[KEY_COLUMN], suspects)])
+    pd.testing.assert_frame_equal(normalized(sliced), normalized(expected), check_dtype=False,
+                                  check_categorical=False)
+
+
+def test_slice_declines_what_the_cube_cannot_answer(indexed):
+    cube = AggregateCube(indexed[0])
+    # A range that cuts through a month, and a filter on a dimension outside the cube
+    assert cube.slice({'start_date': '2023-02-10', 'end_date': '2023-04-30'}) is None
+    assert cube.slice({'grupos': ['G101']}) is None
+
+
+def test_slice_converts_dropdown_strings_to_numeric_codes(indexed):
+    # Supplier codes as a numeric categorical; the dropdowns send them as strings
+    df, _ = indexed
+    codes = df['Fornecedor'].str.removeprefix('FORNECEDOR ').astype(float) + 100000
+    df = df.assign(Fornecedor=pd.Categorical(codes))
+    state = {'fornecedores': ['100003', '100007']}
+
+    sliced = AggregateCube(df).slice(state)
+    expected = build_cube(df[df['Fornecedor'].isin([100003, 100007]).to_numpy()])
+    assert len(sliced) > 0
+    pd.testing.assert_frame_equal(normalized(sliced), normalized(expected), check_dtype=False,
+                                  check_categorical=False)
+    positions = FilterIndex(df, {'fornecedores': 'Fornecedor'}).select(state)
+    assert sliced['count'].sum() == len(positions)
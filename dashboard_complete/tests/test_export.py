@@ -0,0 +1,51 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import export
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'SKU': ['00-001', '00-002', 'AÇÚCAR; "CRISTAL"', '00-004', '00-005'],
+        'Data Doc.': pd.to_datetime(['2023-01-01', '2023-01-02', '2023-02-01', '2023-03-01', '2023-03-05']),
+        'Valor Liquido': [10.5, 20.0, None, 7.25, 1e6],
+        'Quantidade': [1, 2, 3, 4, 5],
+    })
+
+
+def read(fmt, body):
+    if fmt == 'csv':
+        return pd.read_csv(io.BytesIO(body), encoding='utf-8-sig', parse_dates=['Data Doc.'])
+    return pd.read_parquet(io.BytesIO(body))
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+@pytest.mark.parametrize('positions', [None, [4, 0, 2], []])
+def test_stream_round_trip(frame, fmt, positions):
+    chunks = export.iter_chunks(frame, positions, chunk_rows=2)
+    result = read(fmt, b''.join(export.stream(fmt, chunks)))
+    expected = frame if positions is None else frame.take(positions)
+    pd.testing.assert_frame_equal(result, expected.reset_index(drop=True), check_dtype=False)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_download_matches_the_filter(app, fmt):
+    state = {'centros': [str(app.df_orig['Centro'].iloc[0])], 'only_suspects': 'no'}
+    response = app.server.test_client().get(f'/export/{fmt}', query_string={'state': json.dumps(state)})
+    assert response.status_code == 200
+    result = read(fmt, response.data)
+    expected = app.apply_filters(app.normalize_state(state))[app.export_columns]
+    assert len(result) == len(expected) > 0
+    assert result['SKU'].astype(str).tolist() == expected['SKU'].astype(str).tolist()
+
+
+@pytest.mark.parametrize('state', [
+    '[1]', '{"skus": "abc"}', '{"centros": [["CD01"]]}', '{"skus": {"a": 1}}', 'not json',
+])
+def test_download_rejects_malformed_states(app, state):
+    response = app.server.test_client().get('/export/csv', query_string={'state': state})
+    assert response.status_code == 400
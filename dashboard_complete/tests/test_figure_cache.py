@@ -0,0 +1,83 @@
+import metrics
+from figure_cache import FigureCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def cached(cache, name='chart'):
+    builds = []
+
+    @cache.memoize(name)
+    def build(data, resolution='auto'):
+        builds.append((data['key'], resolution))
+        return {'key': data['key'], 'resolution': resolution}
+
+    return build, builds
+
+
+def test_memoize_builds_once_per_key_and_arguments():
+    build, builds = cached(FigureCache())
+    a, b = {'key': 'a', 'state': {}}, {'key': 'b', 'state': {}}
+    assert build(a) == build(a) == {'key': 'a', 'resolution': 'auto'}
+    build(a, 'monthly')
+    build(b)
+    assert builds == [('a', 'auto'), ('a', 'monthly'), ('b', 'auto')]
+
+
+def test_least_recently_used_entries_are_dropped():
+    cache = FigureCache(max_entries=2)
+    build, builds = cached(cache)
+    for key in ['a', 'b', 'a', 'c', 'a', 'b']:
+        build({'key': key})
+    # "b" was the least recently used when "c" came in
+    assert builds == [('a', 'auto'), ('b', 'auto'), ('c', 'auto'), ('b', 'auto')]
+    assert len(cache) == 2
+
+
+def test_entries_do_not_expire_without_ttl():
+    clock = Clock()
+    build, builds = cached(FigureCache(clock=clock))
+    build({'key': 'a'})
+    clock.now += 10 ** 6
+    build({'key': 'a'})
+    assert len(builds) == 1
+
+
+def test_entries_expire_after_ttl_when_set():
+    clock = Clock()
+    build, builds = cached(FigureCache(ttl=60, clock=clock))
+    build({'key': 'a'})
+    clock.now += 30
+    build({'key': 'a'})
+    clock.now += 61
+    build({'key': 'a'})
+    assert len(builds) == 2
+
+
+def test_new_generation_drops_figures_of_the_previous_data():
+    cache = FigureCache()
+    build, builds = cached(cache)
+    build({'key': 'a'})
+    cache.new_generation()
+    assert len(cache) == 0
+    build({'key': 'a'})
+    build({'key': 'a'})
+    assert len(builds) == 2
+
+
+def test_hits_and_misses_are_published_in_metrics():
+    cache = FigureCache()
+    build, _ = cached(cache, name='test_published_chart')
+    for key in ['a', 'a', 'a', 'b']:
+        build({'key': key})
+    assert cache.stats()['hits'] == {'test_published_chart': 2}
+    assert cache.stats()['misses'] == {'test_published_chart': 2}
+    rendered = metrics.REGISTRY.render()
+    assert 'dash_figure_cache_lookups_total{figure="test_published_chart",result="hit"} 2' in rendered
+    assert 'dash_figure_cache_lookups_total{figure="test_published_chart",result="miss"} 2' in rendered
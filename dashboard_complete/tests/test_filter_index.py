@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import FilterIndex
+
+DIMENSIONS = {'skus': 'SKU', 'centros': 'Centro', 'fornecedores': 'Fornecedor', 'grupos': 'Grp. Mercadoria'}
+
+
+def scan(df, filters, start_date, end_date):
+    mask = np.ones(len(df), dtype=bool)
+    for name, values in filters.items():
+        if values:
+            mask &= df[DIMENSIONS[name]].isin(values).to_numpy()
+    if start_date and end_date:
+        mask &= ((df['Data Doc.'] >= start_date) & (df['Data Doc.'] <= end_date)).to_numpy()
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize('filters, start_date, end_date', [
+    ({'skus': ['00-001']}, None, None),
+    ({'skus': ['00-001', '00-007'], 'centros': ['CDUA']}, None, None),
+    ({'centros': ['CDMG', 'CDSP'], 'fornecedores': ['FORNECEDOR 3']}, '2023-03-01', '2023-05-31'),
+    ({'grupos': ['G102']}, '2023-12-31', '2023-12-31'),
+    ({}, '2023-06-15', '2023-06-20'),
+    ({'skus': ['00-001', 'NAO EXISTE']}, None, None),
+])
+def test_select_matches_a_scan(base, filters, start_date, end_date):
+    index = FilterIndex(base, DIMENSIONS, date_column='Data Doc.')
+    positions = index.select(filters, start_date=start_date, end_date=end_date)
+    np.testing.assert_array_equal(positions, scan(base, filters, start_date, end_date))
+    pd.testing.assert_frame_equal(index.take(positions), base.take(positions))
+
+
+def test_no_filters_selects_everything(base):
+    index = FilterIndex(base, DIMENSIONS, date_column='Data Doc.')
+    assert index.select({'skus': [], 'centros': None}) is None
+    assert index.take(None) is base
+
+
+def test_unknown_value_selects_nothing(base):
+    index = FilterIndex(base, DIMENSIONS, date_column='Data Doc.')
+    assert len(index.select({'skus': ['NAO EXISTE']})) == 0
@@ -0,0 +1,55 @@
+import os
+
+import pandas as pd
+import pytest
+
+import ingest
+from synthetic_data import generate_base, write_base
+
+
+@pytest.fixture
+def source(tmp_path):
+    base, _ = generate_base(500, seed=2)
+    path = str(tmp_path / 'base.csv')
+    write_base(base, path)
+    return path
+
+
+def arrow_files(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith('.arrow'))
+
+
+def test_cache_matches_a_fresh_parse(source, tmp_path):
+    cached = ingest.load_base(source, cache_dir=str(tmp_path / 'cache'))
+    fresh = ingest.prepare_base(ingest.read_source(source))
+    pd.testing.assert_frame_equal(cached, fresh, check_categorical=False)
+    for column in ingest.CATEGORICAL_COLUMNS:
+        assert isinstance(cached[column].dtype, pd.CategoricalDtype)
+
+
+def test_unchanged_source_is_not_parsed_again(source, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    first = ingest.load_base(source, cache_dir=cache_dir)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('source parsed again')
+    monkeypatch.setattr(ingest, 'read_source', fail)
+    pd.testing.assert_frame_equal(ingest.load_base(source, cache_dir=cache_dir), first)
+
+    # Touched but identical: found through the content hash, the stat is refreshed
+    os.utime(source, ns=(0, 0))
+    pd.testing.assert_frame_equal(ingest.load_base(source, cache_dir=cache_dir), first)
+    assert ingest._read_meta(ingest._cache_paths(source, cache_dir)[1])['mtime_ns'] == 0
+
+
+def test_changed_source_replaces_the_cache(source, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    first = ingest.load_base(source, cache_dir=cache_dir)
+    old_files = arrow_files(cache_dir)
+
+    raw = pd.read_csv(source)
+    write_base(raw.iloc[:300], source)
+    second = ingest.load_base(source, cache_dir=cache_dir)
+    assert len(second) < len(first)
+    assert len(arrow_files(cache_dir)) == 1
+    assert arrow_files(cache_dir) != old_files
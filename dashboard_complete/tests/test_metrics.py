@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+from flask import Flask
+
+import metrics
+from metrics_core import Registry
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Profile every request, without ever writing a profile
+    monkeypatch.setattr(metrics, 'PROFILE_SLOW_MS', 1e9)
+    server = Flask(__name__)
+    server.before_request(metrics.start_request)
+    server.after_request(metrics.record_response)
+    server.teardown_request(metrics.finish_request)
+
+    @server.route('/ok')
+    def ok():
+        metrics.count_rows(42)
+        return 'x' * 10
+
+    @server.route('/fails')
+    def fails():
+        raise RuntimeError('callback failed')
+
+    return server.test_client()
+
+
+def count(histogram, **labels):
+    series = histogram._series.get(tuple(str(labels[name]) for name in histogram.labels))
+    return 0 if series is None else series[2]
+
+
+def profilers():
+    return [thread for thread in threading.enumerate() if thread.name == 'sampling-profiler']
+
+
+def test_request_is_recorded(client):
+    before = count(metrics.REQUEST_SECONDS, callback='/ok')
+    assert client.get('/ok').status_code == 200
+    assert count(metrics.REQUEST_SECONDS, callback='/ok') == before + 1
+    assert count(metrics.PAYLOAD_BYTES, callback='/ok', direction='out') >= 1
+    assert count(metrics.CALLBACK_ROWS, callback='/ok') >= 1
+    assert not profilers()
+
+
+def test_request_that_raises_is_recorded_and_stops_its_profiler(client):
+    before = count(metrics.REQUEST_SECONDS, callback='/fails')
+    assert client.get('/fails').status_code == 500
+    assert count(metrics.REQUEST_SECONDS, callback='/fails') == before + 1
+    assert not profilers()
+
+
+def test_render_in_prometheus_text_format():
+    registry = Registry()
+    histogram = registry.histogram('latency_seconds', 'Latency.', (0.1, 1), ['route'])
+    for value in [0.05, 0.1, 0.5, 3]:
+        histogram.observe(value, route='/a"b')
+    registry.register([('latency_seconds', 0.2, {'route': '/a"b'})])
+    assert registry.render().splitlines() == [
+        '# HELP latency_seconds Latency.',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{route="/a\\"b",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a\\"b",le="1.0"} 4',
+        'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 5',
+        'latency_seconds_sum{route="/a\\"b"} 3.85',
+        'latency_seconds_count{route="/a\\"b"} 5',
+    ]
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pair_key
+from pair_key import PairKey
+
+
+@pytest.fixture
+def keys(base):
+    key = PairKey.from_frame(base)
+    return key, key.encode(base['SKU'], base['Centro'])
+
+
+@pytest.fixture(params=['table', 'sorted keys'])
+def key_space(request, monkeypatch):
+    # Both membership strategies: dense table and, above the size limit, np.isin
+    if request.param == 'sorted keys':
+        monkeypatch.setattr(pair_key, '_MAX_TABLE_SIZE', 0)
+
+
+def test_encode_decode_round_trip(base, keys):
+    key, codes = keys
+    skus, centros = key.decode(codes)
+    assert list(skus) == list(base['SKU'])
+    assert list(centros) == list(base['Centro'])
+
+
+def test_unknown_pairs_are_minus_one(keys):
+    key, _ = keys
+    codes = key.encode(pd.Series(['00-001', 'NAO EXISTE']), pd.Series(['NAO EXISTE', 'CDUA']))
+    assert codes.tolist() == [-1, -1]
+
+
+def test_semi_join_matches_isin(base, keys, key_space):
+    key, codes = keys
+    suspects = pd.DataFrame({'SKU': ['00-001', '00-002', '00-003', 'NAO EXISTE'],
+                             'Centro': ['CDUA', 'CDMG', 'NAO EXISTE', 'CDSP']})
+    suspect_codes = key.encode(suspects['SKU'], suspects['Centro'])
+
+    pairs = list(zip(base['SKU'], base['Centro']))
+    expected = np.array([pair in set(zip(suspects['SKU'], suspects['Centro'])) for pair in pairs])
+    np.testing.assert_array_equal(key.semi_join(codes, suspect_codes), expected)
+    np.testing.assert_array_equal(key.semi_join(codes, key.key_set(suspect_codes)), expected)
+    np.testing.assert_array_equal(key.semi_join(codes, suspect_codes), np.isin(codes, suspect_codes[suspect_codes >= 0]))
+
+
+def test_minus_one_never_joins(keys, key_space):
+    key, codes = keys
+    assert not key.key_set(np.array([-1, codes[0]])).contains(np.array([-1])).any()
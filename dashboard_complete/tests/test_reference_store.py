@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from reference_store import ReferenceStore, _top_k
+
+
+def dense_top_k(dense, k, offset):
+    rows = []
+    for query, row in enumerate(dense):
+        nonzero = np.flatnonzero(row)
+        best = nonzero[np.argsort(-row[nonzero], kind='stable')][:k]
+        rows += [(query + offset, reference, row[reference], rank) for rank, reference in enumerate(best)]
+    return pd.DataFrame(rows, columns=['query', 'reference', 'score', 'rank'])
+
+
+@pytest.mark.parametrize('k', [1, 3, 10])
+def test_top_k_matches_a_dense_sort(k):
+    similarity = sparse.random(50, 40, density=0.15, format='lil', random_state=0)
+    # An empty row and a row with fewer entries than k
+    similarity[7] = 0
+    similarity[8] = 0
+    similarity[8, 3] = 0.5
+    similarity = similarity.tocsr()
+
+    result = pd.concat(_top_k(similarity, k, offset=100), ignore_index=True)
+    result = result.sort_values(['query', 'rank']).reset_index(drop=True)
+    expected = dense_top_k(similarity.toarray(), k, offset=100)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_match_finds_the_quote_with_the_same_product():
+    store = ReferenceStore(pd.DataFrame({
+        'Descrição': ['LINGUICA TOSCANA 5KG', 'QUEIJO MUSSARELA FATIADO 1KG', 'PRESUNTO COZIDO 3,5KG'],
+        'Preço': [90.0, 45.0, 70.0],
+    }))
+    best = store.best_matches(pd.Series(['QUEIJO MUSSARELA FAT 1 KG', 'LINGUICA TOSCANA CX 5KG'],
+                                        index=[10, 20]), min_score=0.2)
+    assert best.loc[10, 'Descrição'] == 'QUEIJO MUSSARELA FATIADO 1KG'
+    assert best.loc[20, 'Descrição'] == 'LINGUICA TOSCANA 5KG'
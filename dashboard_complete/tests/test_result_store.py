@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from result_store import ResultStore, frame_nbytes, normalize_state, state_key
+
+
+def frame(rows):
+    return pd.DataFrame({'value': np.zeros(rows)})
+
+
+def test_state_key_ignores_order_empty_filters_and_time_of_day():
+    a = {'skus': ['B', 'A'], 'centros': [], 'fornecedores': None, 'start_date': '2023-01-01T00:00:00'}
+    b = {'start_date': '2023-01-01', 'skus': ['A', 'B']}
+    assert normalize_state(a) == {'skus': ['A', 'B'], 'start_date': '2023-01-01'}
+    assert state_key(a) == state_key(b)
+    assert state_key(a) != state_key({'skus': ['A']})
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    store = ResultStore(max_entries=2)
+    store.put('a', frame(1))
+    store.put('b', frame(1))
+    store.get('a')
+    store.put('c', frame(1))
+    assert 'a' in store and 'c' in store and 'b' not in store
+    assert store.get('b') is None
+
+
+def test_bytes_bound_keeps_at_least_the_newest_entry():
+    size = frame_nbytes(frame(100))
+    store = ResultStore(max_entries=10, max_bytes=2 * size)
+    for key in 'abc':
+        store.put(key, frame(100))
+    assert len(store) == 2 and store.nbytes == 2 * size
+    assert 'a' not in store
+
+    big = frame(1000)
+    store.put('big', big)
+    assert len(store) == 1 and store.get('big') is big
+    assert store.nbytes == frame_nbytes(big)
+
+
+def test_replacing_a_key_updates_the_size():
+    store = ResultStore()
+    store.put('a', frame(10))
+    store.put('a', np.zeros(5))
+    assert len(store) == 1 and store.nbytes == np.zeros(5).nbytes
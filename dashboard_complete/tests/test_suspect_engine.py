@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from suspect_engine import KEYS, SUSPECT_COLUMNS, SuspectEngine
+
+
+@pytest.fixture
+def lines():
+    rng = np.random.default_rng(3)
+    n = 4000
+    df = pd.DataFrame({
+        'SKU': rng.choice([f'00-{i:03d}' for i in range(30)], n),
+        'Centro': rng.choice(['CDF2', 'CDUA'], n),
+        'Preco_Unitario': rng.lognormal(3, 0.3, n).round(2),
+        'Descrição': 'PRODUTO',
+    })
+    df.loc[rng.choice(n, 40, replace=False), 'Preco_Unitario'] *= 4
+    return df
+
+
+def expected_summary(df):
+    grouped = df.dropna(subset=['Preco_Unitario']).groupby(KEYS)['Preco_Unitario']
+    q1, q3 = grouped.quantile(0.25), grouped.quantile(0.75)
+    fences = pd.DataFrame({'lower': q1 - 1.5 * (q3 - q1), 'upper': q3 + 1.5 * (q3 - q1)})
+    rows = df.dropna(subset=['Preco_Unitario']).join(fences, on=KEYS)
+    outside = (rows['Preco_Unitario'] < rows['lower']) | (rows['Preco_Unitario'] > rows['upper'])
+    return pd.DataFrame({
+        'Num_Compras': grouped.count(),
+        'Preco_Medio': grouped.mean(),
+        'Preco_Min': grouped.min(),
+        'Preco_Max': grouped.max(),
+        'CV_Percent': grouped.std() / grouped.mean() * 100,
+        'Num_Outliers_IQR': outside.groupby([rows[k] for k in KEYS]).sum(),
+    }).reset_index()
+
+
+def summary_of(engine):
+    columns = KEYS + ['Num_Compras', 'Preco_Medio', 'Preco_Min', 'Preco_Max', 'CV_Percent', 'Num_Outliers_IQR']
+    return engine.summary()[columns].sort_values(KEYS).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('batches', [1, 7])
+def test_summary_matches_the_whole_history(lines, batches):
+    engine = SuspectEngine(sketch_capacity=1000)
+    for batch in np.array_split(np.arange(len(lines)), batches):
+        engine.update(lines.iloc[batch])
+    pd.testing.assert_frame_equal(summary_of(engine), expected_summary(lines), check_dtype=False)
+
+
+def test_rows_without_price_are_ignored(lines):
+    with_gaps = lines.copy()
+    with_gaps.loc[::5, 'Preco_Unitario'] = np.nan
+    engine = SuspectEngine(sketch_capacity=1000)
+    for batch in np.array_split(np.arange(len(with_gaps)), 4):
+        engine.update(with_gaps.iloc[batch])
+    pd.testing.assert_frame_equal(summary_of(engine), expected_summary(with_gaps), check_dtype=False)
+
+
+def test_sketch_stays_bounded_and_close(lines):
+    engine = SuspectEngine(sketch_capacity=20)
+    for batch in np.array_split(np.arange(len(lines)), 10):
+        engine.update(lines.iloc[batch])
+    sizes = engine.centroids.groupby(KEYS).size()
+    assert sizes.max() <= 20
+    weights = engine.centroids.groupby(KEYS)['weight'].sum()
+    counts = lines.groupby(KEYS).size()
+    pd.testing.assert_series_equal(weights, counts.astype(float), check_names=False)
+    # Moments stay exact; outlier counts are approximate once compressed
+    result, expected = summary_of(engine), expected_summary(lines)
+    np.testing.assert_allclose(result['CV_Percent'], expected['CV_Percent'])
+    assert abs(result['Num_Outliers_IQR'].sum() - expected['Num_Outliers_IQR'].sum()) <= 0.2 * expected[
+        'Num_Outliers_IQR'].sum()
+
+
+def test_suspects_schema_and_reasons():
+    steady = pd.DataFrame({'SKU': 'A', 'Centro': 'C1', 'Preco_Unitario': [10.0, 10.1, 9.9, 10.0, 10.2, 9.8]})
+    volatile = pd.DataFrame({'SKU': 'B', 'Centro': 'C1', 'Preco_Unitario': [5.0, 20.0, 8.0, 30.0, 12.0, 3.0]})
+    spike = pd.DataFrame({'SKU': 'C', 'Centro': 'C1', 'Preco_Unitario': [10.0, 10.0, 10.1, 9.9, 10.0, 40.0]})
+    few = pd.DataFrame({'SKU': 'D', 'Centro': 'C1', 'Preco_Unitario': [1.0, 100.0]})
+    engine = SuspectEngine().update(pd.concat([steady, volatile, spike, few]).assign(**{'Descrição': 'X'}))
+    suspects = engine.suspects()
+    assert list(suspects.columns) == SUSPECT_COLUMNS
+    reasons = dict(zip(suspects['SKU'], suspects['Motivo_Suspeita']))
+    assert set(reasons) == {'B', 'C'}
+    assert reasons['B'].startswith('CV alto')
+    assert reasons['C'].endswith('1 outliers IQR')
+
+
+def test_state_round_trip(lines, tmp_path):
+    engine = SuspectEngine().update(lines.iloc[:2000])
+    engine.save(tmp_path / 'state.pkl')
+    restored = SuspectEngine.load(tmp_path / 'state.pkl').update(lines.iloc[2000:])
+    pd.testing.assert_frame_equal(summary_of(restored), summary_of(SuspectEngine().update(lines)))
+
+
+def test_app_detects_suspects_in_process_without_a_file(app, tmp_path):
+    suspects = app.load_suspects(str(tmp_path / 'missing.csv'), app.df_orig)
+    pd.testing.assert_frame_equal(suspects, SuspectEngine().update(app.df_orig).suspects())
+    assert len(suspects) > 0
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from table_view import filter_mask, page, parse_filter, view_positions
+
+
+def test_parse_filter_terms():
+    assert parse_filter('{Centro} icontains cdf && {Quantidade} >= 10 && {SKU} seq "00-001" && junk') == [
+        ('Centro', 'contains', 'cdf', False),
+        ('Quantidade', 'ge', '10', True),
+        ('SKU', 'eq', '00-001', True),
+    ]
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('{Centro} icontains cdf', lambda df: df['Centro'].astype(str).str.lower().str.contains('cdf')),
+    ('{Centro} scontains cdf', lambda df: df['Centro'].astype(str).str.contains('cdf')),
+    ('{Preco_Unitario} > 20', lambda df: df['Preco_Unitario'] > 20),
+    ('{Fornecedor} = FORNECEDOR 3', lambda df: df['Fornecedor'] == 'FORNECEDOR 3'),
+    ('{Data Doc.} datestartswith 2023-05', lambda df: df['Data Doc.'].dt.strftime('%Y-%m') == '2023-05'),
+    ('{SKU} contains 00-01 && {Preco_Unitario} <= 20',
+     lambda df: df['SKU'].str.contains('00-01') & (df['Preco_Unitario'] <= 20)),
+])
+def test_filter_matches_pandas(base, query, expected):
+    np.testing.assert_array_equal(filter_mask(base, query), expected(base).to_numpy(bool))
+
+
+def test_unusable_terms_are_ignored(base):
+    assert filter_mask(base, '') is None
+    assert filter_mask(base, '{Missing} = 1 && {Preco_Unitario} > abc') is None
+
+
+def test_pages_of_a_filtered_sorted_view(base):
+    sort_by = [{'column_id': 'Centro', 'direction': 'asc'}, {'column_id': 'Preco_Unitario', 'direction': 'desc'}]
+    positions = view_positions(base, '{Preco_Unitario} > 20', sort_by)
+    expected = base[base['Preco_Unitario'] > 20].sort_values(
+        ['Centro', 'Preco_Unitario'], ascending=[True, False], kind='stable')
+
+    pages = []
+    page_current = 0
+    while True:
+        rows, page_count, total = page(base, positions, page_current, 100)
+        pages.append(rows)
+        page_current += 1
+        if page_current == page_count:
+            break
+    assert total == len(expected)
+    pd.testing.assert_frame_equal(pd.concat(pages), expected)
+
+    # Past the end: the last page again
+    last, _, _ = page(base, positions, page_count + 5, 100)
+    pd.testing.assert_frame_equal(last, pages[-1])
+
+
+def test_unfiltered_unsorted_view_is_a_slice(base):
+    assert view_positions(base, None, [{'column_id': 'Missing', 'direction': 'asc'}]) is None
+    rows, page_count, total = page(base, None, 2, 250)
+    pd.testing.assert_frame_equal(rows, base.iloc[500:750])
+    assert (page_count, total) == (12, len(base))
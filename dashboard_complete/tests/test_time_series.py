@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pair_key import KEY_COLUMN
+from time_series import DAY, MONTH, WEEK, aggregate_rows, downsample, lttb, pick_resolution
+
+
+@pytest.mark.parametrize('n, n_out', [(1000, 50), (101, 3), (5000, 500)])
+def test_lttb_keeps_the_ends_and_returns_n_out_points(n, n_out):
+    rng = np.random.default_rng(n)
+    x = np.sort(rng.uniform(0, 100, n))
+    y = rng.normal(size=n)
+    keep = lttb(x, y, n_out)
+    assert len(keep) == n_out
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[437] = 50.0
+    assert 437 in lttb(x, y, 20)
+
+
+def test_short_series_are_left_alone():
+    assert list(lttb(np.arange(10), np.arange(10), 20)) == list(range(10))
+    dates = pd.date_range('2023-01-01', periods=600, freq='D')
+    x, y = downsample(dates, np.arange(600.0), max_points=100)
+    assert len(x) == 100 and x[0] == dates[0] and x[-1] == dates[-1]
+
+
+def test_resolution_follows_the_range():
+    assert pick_resolution('2023-01-01', '2023-02-01') == DAY
+    assert pick_resolution('2023-01-01', '2024-01-01') == WEEK
+    assert pick_resolution('2020-01-01', '2024-01-01') == MONTH
+
+
+def test_weekly_means_start_on_monday():
+    rows = pd.DataFrame({
+        KEY_COLUMN: 1,
+        'Data Doc.': pd.to_datetime(['2023-01-02', '2023-01-08', '2023-01-09']),
+        'Preco_Unitario': [10.0, 20.0, 40.0],
+    })
+    weekly = aggregate_rows(rows, WEEK)
+    assert list(weekly['period']) == list(pd.to_datetime(['2023-01-02', '2023-01-09']))
+    assert list(weekly['price_mean']) == [15.0, 40.0]
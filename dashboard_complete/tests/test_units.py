@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from units import parse_pack
+
+
+@pytest.mark.parametrize('description, expected', [
+    # Piece and box weights
+    ('LINGUICA MINEIRA 0,8KG CX 6,4 KG', (0.8, 6.4, 8)),
+    # Units glued to the box marker
+    ('FILE PEITO DESF TEMP 400GCX12KG', (0.4, 12, 30)),
+    # Multipack: pieces x piece weight
+    ('PAO DE QUEIJO 2X500G', (0.5, 1.0, 2)),
+    # Box given as a number of pieces
+    ('BACON 200G CX C/ 12 UN', (0.2, 2.4, 12)),
+    ('lasanha 600g cx 4,8kg', (0.6, 4.8, 8)),
+])
+def test_parse_pack(description, expected):
+    np.testing.assert_allclose(parse_pack(description), expected)
+
+
+def test_parse_pack_without_sizes():
+    assert np.isnan(parse_pack('ALFACE CRESPA')).all()
+    # A box size alone leaves the piece unknown
+    piece_kg, box_kg, pieces = parse_pack('QUEIJO MUSSARELA CX 10KG')
+    assert np.isnan(piece_kg) and box_kg == 10 and np.isnan(pieces)
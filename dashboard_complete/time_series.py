@@ -0,0 +1,90 @@
+"""Price time series at a resolution that suits the selected date range.
+
+Monthly points come straight from the aggregate cube. Daily and weekly ones
+are aggregated from the rows of the plotted SKU/Centro pairs only. Individual
+purchases ("raw" resolution) and any series longer than ``MAX_POINTS`` are
+reduced with Largest-Triangle-Three-Buckets, which keeps the shape of the
+series (peaks included) in a bounded number of points, so the figure payload
+no longer grows with the length of the history.
+"""
+import numpy as np
+import pandas as pd
+
+from pair_key import KEY_COLUMN
+
+AUTO, RAW, DAY, WEEK, MONTH = 'auto', 'raw', 'D', 'W', 'M'
+RESOLUTION_LABELS = {
+    AUTO: 'Automática',
+    DAY: 'Diária',
+    WEEK: 'Semanal',
+    MONTH: 'Mensal',
+    RAW: 'Compras individuais',
+}
+AXIS_TITLES = {DAY: 'Dia', WEEK: 'Semana', MONTH: 'Mês', RAW: 'Data'}
+
+# Longest range (in days) still plotted per day / per week in automatic mode
+MAX_DAILY_SPAN = 92
+MAX_WEEKLY_SPAN = 731
+
+MAX_POINTS = 500
+
+
+def pick_resolution(start, end):
+    span = (pd.Timestamp(end) - pd.Timestamp(start)).days
+    if span <= MAX_DAILY_SPAN:
+        return DAY
+    if span <= MAX_WEEKLY_SPAN:
+        return WEEK
+    return MONTH
+
+
+def period_start(dates, resolution):
+    """First day of the day/week (Monday)/month containing each date."""
+    days = dates.dt.normalize()
+    if resolution == DAY:
+        return days
+    if resolution == WEEK:
+        return days - pd.to_timedelta(days.dt.dayofweek, unit='D')
+    return pd.Series(dates.to_numpy().astype('datetime64[M]'), index=dates.index)
+
+
+def aggregate_rows(rows, resolution):
+    """Mean unit price per (pair key, period) from individual purchase rows."""
+    periods = period_start(rows['Data Doc.'], resolution).rename('period')
+    series = rows['Preco_Unitario'].groupby([rows[KEY_COLUMN], periods], observed=True).mean()
+    return series.rename('price_mean').reset_index().sort_values('period', kind='stable')
+
+
+def lttb(x, y, threshold):
+    """Indices of the ``threshold`` points kept by Largest-Triangle-Three-Buckets.
+
+    ``x`` must be sorted. The first and last points are always kept; every
+    bucket in between contributes the point forming the largest triangle with
+    the previously kept point and the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(x, y, max_points=MAX_POINTS):
+    """``x`` (datetimes) and ``y`` reduced to at most ``max_points`` points."""
+    x, y = pd.Series(x), pd.Series(y)
+    keep = lttb(x.to_numpy().astype('datetime64[ns]').astype(np.int64), y.to_numpy(), max_points)
+    return x.iloc[keep].to_numpy(), y.iloc[keep].to_numpy()
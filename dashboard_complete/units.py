@@ -0,0 +1,109 @@
+"""Unit-of-measure and pack-size normalization of unit prices.
+
+``Preco_Unitario`` is the price per purchase unit (``UN``: KG, CX, UN...), so
+the same product bought by the box and by the piece gives prices that cannot
+be compared. Pack sizes are written in the description, e.g.
+"LINGUICA MINEIRA 0,8KG CX 6,4 KG" (0.8 kg piece, 6.4 kg box) or
+"FILE PEITO DESF TEMP 400GCX12KG" (400 g piece, 12 kg box). They are parsed
+with precompiled patterns once per distinct description, and the prices per
+kg and per piece are then derived with vectorized lookups.
+"""
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+# Mass units -> kg
+MASS_UNITS = {'KG': 1.0, 'G': 0.001, 'GR': 0.001, 'GRS': 0.001, 'MG': 1e-6}
+# Purchase units (UN column) measured by weight, by box or by piece
+UOM_KG = {'KG': 1.0, 'G': 0.001}
+BOX_UOMS = {'CX', 'CXA', 'FD', 'FDO'}
+PIECE_UOMS = {'UN', 'UND', 'UNID', 'PC', 'PCT', 'PT'}
+
+_NUMBER = r'(\d+(?:[.,]\d+)?)'
+# A unit is followed by a non-letter, the end, or a glued "CX" ("400GCX12KG")
+_END = r'(?=CX|[^A-Z]|$)'
+_WEIGHT = re.compile(_NUMBER + r'\s*(KG|GRS|GR|G|MG)' + _END)
+_MULTIPACK = re.compile(r'(\d+)\s*X\s*' + _NUMBER + r'\s*(KG|GRS|GR|G|MG)' + _END)
+_BOX = re.compile(r'CX\s*(?:C/\s*)?' + _NUMBER + r'\s*(KG|GRS|GR|G|MG|UNID|UND|UN|PCT|PC)?(?=[^A-Z]|$)')
+
+
+def _number(text):
+    return float(text.replace(',', '.'))
+
+
+@functools.lru_cache(maxsize=None)
+def parse_pack(description):
+    """``(piece_kg, box_kg, pieces_per_box)`` from a description; NaN where unknown."""
+    text = str(description).upper()
+    piece_kg = box_kg = pieces = np.nan
+
+    before_box = text
+    box = _BOX.search(text)
+    if box:
+        value, unit = _number(box[1]), box[2]
+        if unit in MASS_UNITS:
+            box_kg = value * MASS_UNITS[unit]
+        else:
+            pieces = value
+        before_box = text[:box.start()]
+
+    multipack = _MULTIPACK.search(text)
+    if multipack:
+        pieces = float(multipack[1])
+        piece_kg = _number(multipack[2]) * MASS_UNITS[multipack[3]]
+    else:
+        weight = _WEIGHT.search(before_box)
+        if weight:
+            piece_kg = _number(weight[1]) * MASS_UNITS[weight[2]]
+
+    if np.isnan(box_kg) and not np.isnan(pieces) and not np.isnan(piece_kg):
+        box_kg = pieces * piece_kg
+    if np.isnan(pieces) and not np.isnan(box_kg) and piece_kg > 0:
+        pieces = box_kg / piece_kg
+    return piece_kg, box_kg, pieces
+
+
+def pack_sizes(descriptions, uoms):
+    """Kg and pieces per purchase unit for each row (NaN where unknown).
+
+    Descriptions and units are factorized first, so each distinct string is
+    parsed once; rows only index into the per-value results.
+    """
+    desc_codes, desc_values = pd.factorize(pd.Series(descriptions).astype(str))
+    parsed = np.array([parse_pack(value) for value in desc_values], dtype=float).reshape(-1, 3)
+    piece_kg, box_kg, pieces = (parsed[desc_codes, i] for i in range(3))
+
+    uom_codes, uom_values = pd.factorize(pd.Series(uoms).astype(str).str.strip().str.upper())
+    uom_values = pd.Index(uom_values)
+    per_weight = np.array([UOM_KG.get(uom, np.nan) for uom in uom_values])[uom_codes]
+    is_box = uom_values.isin(BOX_UOMS)[uom_codes]
+    is_piece = uom_values.isin(PIECE_UOMS)[uom_codes]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kg = np.where(is_box, box_kg, np.where(is_piece, piece_kg, per_weight))
+        units = np.where(is_box, pieces, np.where(is_piece, 1.0, per_weight / piece_kg))
+    return kg, units
+
+
+def normalize_prices(df):
+    """``Preco_Por_Kg`` and ``Preco_Por_Unidade`` (per piece) for the rows of ``df``."""
+    kg, units = pack_sizes(df['Descrição'], df['UN'])
+    value = df['Valor Liquido'].to_numpy(dtype=float)
+    quantity = df['Quantidade'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_kg = value / (quantity * kg)
+        per_unit = value / (quantity * units)
+    return pd.DataFrame({
+        'Preco_Por_Kg': np.where(np.isfinite(per_kg), per_kg, np.nan),
+        'Preco_Por_Unidade': np.where(np.isfinite(per_unit), per_unit, np.nan),
+    }, index=df.index)
+
+
+def comparable_price(df, keys=('SKU', 'Centro')):
+    """Price to compare within each group: per kg where every row of the group
+    has it, otherwise the original ``Preco_Unitario``."""
+    has_kg = df['Preco_Por_Kg'].notna()
+    all_kg = has_kg.groupby([df[key] for key in keys], observed=True).transform('all')
+    return df['Preco_Por_Kg'].where(all_kg, df['Preco_Unitario'])